@@ -1,9 +1,43 @@
-from flask import Flask
+from flask import Flask, Request
+import io
+import os
 import logging
+import tempfile
+
+
+class SharedLoopFlask(Flask):
+    """
+    Executa as views assíncronas no event loop compartilhado do processo,
+    em vez de criar um loop novo a cada requisição.
+    """
+
+    def async_to_sync(self, func):
+        from .services.event_loop import run_coroutine
+
+        def wrapper(*args, **kwargs):
+            return run_coroutine(func(*args, **kwargs))
+        return wrapper
+
+
+class SpoolingRequest(Request):
+    """
+    Mantém os arquivos enviados em memória e só os despeja em disco quando
+    passam de `upload_spool_threshold` bytes.
+    """
+    upload_spool_threshold = 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= self.upload_spool_threshold:
+            return io.BytesIO()
+        return tempfile.SpooledTemporaryFile(max_size=self.upload_spool_threshold, mode="rb+")
 
 
 def create_app():
-    app = Flask(__name__)
+    app = SharedLoopFlask(__name__)
+    app.request_class = SpoolingRequest
+    app.config["MAX_CONTENT_LENGTH"] = int(float(os.getenv("MAX_UPLOAD_SIZE_MB", 20)) * 1024 * 1024)
+    SpoolingRequest.upload_spool_threshold = int(float(os.getenv("UPLOAD_SPOOL_THRESHOLD_KB", 1024)) * 1024)
+
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s %(levelname)s: %(message)s [in %(filename)s:%(lineno)d]'
@@ -12,5 +46,24 @@ def create_app():
     from .api.main_routes import api_bp
 
     app.register_blueprint(api_bp)
+
+    # Definido pelo supervisor de main.py nos processos servidores: a validação do IPCA
+    # e o monitor do registro de cálculos rodam uma única vez, no próprio supervisor.
+    supervised_worker = os.getenv("WEB_SUPERVISED_WORKER") == "1"
+
+    # Carrega e valida o IPCA antes de /api/ready responder que a aplicação está pronta
+    from .services.warmup import start_warmup, mark_ready_without_warmup
+
+    if os.getenv("IPCA_WARMUP", "true").lower() not in ("false", "0", "no"):
+        start_warmup(load_ipca=not supervised_worker)
+    else:
+        mark_ready_without_warmup()
+
+    # Atualiza os cálculos registrados quando a série do IPCA ganha meses novos
+    from .services.repricing_ledger import start_repricing_monitor
+
+    if not supervised_worker:
+        start_repricing_monitor()
+
     app.logger.info("Aplicação backend iniciada.")
     return app
\ No newline at end of file
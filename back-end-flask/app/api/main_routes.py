@@ -1,29 +1,150 @@
-from flask import Blueprint, request, jsonify
-import tempfile
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, g
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
+import io
+import asyncio
+import json
 import logging
-from app.services.pdf_parser import extract_data_from_pdf
+import threading
+import time
+import zipfile
+import zlib
+from pydantic import ValidationError
+from app.schemas.schemasPydantic import DadosRequisicaoSchema
+from app.services.pdf_worker_pool import extract_data_isolated, PdfProcessingError
 from app.services.value_calculator import ValueCalculator
-from app.services.email_service import send_calculation_email
+from app.services.email_queue import get_email_queue, STATUS_FAILED
+from app.services.result_cache import get_result_cache
+from app.services.calculation_pipeline import process_calculation
+from app.services.csv_repricing import CsvRepricing, CsvFormatError
+from app.services.job_manager import get_job_manager, check_callback_url, CallbackUrlError
+from app.services import admission
+from app.services import metrics
+from app.services import profiling
+from app.services.warmup import get_readiness, STATUS_READY
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 50000))
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", 500))
+# Vazio: o mesmo limite de um upload (MAX_UPLOAD_SIZE_MB)
+BULK_MAX_TOTAL_MB = os.getenv("BULK_MAX_TOTAL_MB", "")
+BULK_PARSE_WORKERS = int(os.getenv("BULK_PARSE_WORKERS", os.cpu_count() or 4))
+CSV_MAX_UPLOAD_MB = float(os.getenv("CSV_MAX_UPLOAD_MB", 200))
+
+_bulk_executor = None
+_bulk_executor_lock = threading.Lock()
+
+
+def _get_bulk_executor() -> ThreadPoolExecutor:
+    """Pool de threads compartilhado pelas requisições de /api/calculate/bulk."""
+    global _bulk_executor
+    with _bulk_executor_lock:
+        if _bulk_executor is None:
+            _bulk_executor = ThreadPoolExecutor(max_workers=BULK_PARSE_WORKERS, thread_name_prefix="bulk-pdf")
+        return _bulk_executor
+
+
+@api_bp.app_errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    max_size_mb = current_app.config["MAX_CONTENT_LENGTH"] / (1024 * 1024)
+    logging.warning("Requisição recusada por exceder o tamanho máximo de upload.")
+    return jsonify({"error": f"O envio excede o tamanho máximo de {max_size_mb:g} MB."}), 413
+
+
+@api_bp.app_errorhandler(admission.ServerBusyError)
+def server_busy(e):
+    return (
+        jsonify({"error": "O servidor está ocupado. Tente novamente em instantes."}),
+        503,
+        {"Retry-After": str(e.retry_after)}
+    )
+
+
+@api_bp.before_app_request
+def start_request_metrics():
+    g.request_started_at = time.perf_counter()
+    g.request_timings = metrics.start_request_timings()
+    if request.endpoint == 'api.calculate':
+        reason = profiling.should_profile(request.headers)
+        if reason:
+            g.request_profile = profiling.start_request_profile(reason)
+
+
+@api_bp.after_app_request
+def add_server_timing(response):
+    """Registra a duração da requisição e expõe as etapas medidas no cabeçalho Server-Timing."""
+    started_at = g.get('request_started_at')
+    if started_at is None:
+        return response
+    elapsed = time.perf_counter() - started_at
+    endpoint = request.url_rule.rule if request.url_rule else "desconhecido"
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint, str(response.status_code))
+    response.headers["Server-Timing"] = metrics.server_timing_header(g.request_timings, elapsed)
+
+    request_profile = g.get('request_profile')
+    if request_profile is not None:
+        saved = profiling.save_request_profile(
+            request_profile, endpoint, response.status_code, elapsed, g.request_timings, _uploaded_pdf_size()
+        )
+        if saved:
+            response.headers["X-Profile-Id"] = request_profile.id
+    return response
+
+
+@api_bp.teardown_app_request
+def stop_request_profile(e):
+    request_profile = g.get('request_profile')
+    if request_profile is not None:
+        profiling.stop_request_profile(request_profile)
+
+
+def _load_uploaded_files():
+    """Arquivos do multipart; chamada via asyncio.to_thread, que leva junto o contexto da requisição."""
+    return request.files
+
+
+def _uploaded_pdf_size():
+    upload = request.files.get('pdf_file')
+    if upload is None:
+        return None
+    position = upload.stream.tell()
+    size = upload.stream.seek(0, os.SEEK_END)
+    upload.stream.seek(position)
+    return size
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def export_metrics():
+    return Response(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+
 
 @api_bp.route('/ping', methods=['GET'])
 def ping():
     return jsonify({"message": "Pong!"})
 
 
+@api_bp.route('/ready', methods=['GET'])
+def ready():
+    """Prontidão para receber tráfego: 200 só depois do aquecimento (série do IPCA carregada e validada)."""
+    readiness = get_readiness()
+    return jsonify(readiness), 200 if readiness["status"] == STATUS_READY else 503
+
+
 @api_bp.route('/calculate', methods=['POST'])
 async def calculate():
-    logging.info(f"Recebida nova requisição para /api/calculate.")
+    logging.info("Recebida nova requisição para /api/calculate.")
 
-    # 1. Validação dos dados de entrada
-    if 'pdf_file' not in request.files:
+    # 1. Validação dos dados de entrada. A primeira leitura de `files` recebe e
+    # interpreta o multipart (e pode gravá-lo em disco): roda fora do event loop.
+    with metrics.stage("upload"):
+        uploaded_files = await asyncio.to_thread(_load_uploaded_files)
+    if 'pdf_file' not in uploaded_files:
         logging.warning("Requisição recebida sem 'pdf_file'.")
         return jsonify({"error": "Nenhum arquivo PDF foi enviado."}), 400
 
-    pdf_file = request.files['pdf_file']
+    pdf_file = uploaded_files['pdf_file']
     if pdf_file.filename == '':
         logging.warning("Requisição recebida com nome de arquivo vazio.")
         return jsonify({"error": "Nenhum arquivo selecionado."}), 400
@@ -33,53 +154,274 @@ async def calculate():
         logging.warning("Requisição recebida sem 'recipient_email'.")
         return jsonify({"error": "O e-mail do destinatário não foi fornecido."}), 400
 
-    try:
-        # 2. Processamento do PDF
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = os.path.join(temp_dir, pdf_file.filename)
-            pdf_file.save(temp_path)
+    # 2. Modo assíncrono: aceita o upload e processa em segundo plano
+    if request.args.get('mode') == 'async' or 'respond-async' in request.headers.get('Prefer', ''):
+        callback_url = request.form.get('callback_url')
+        if callback_url:
+            try:
+                await asyncio.to_thread(check_callback_url, callback_url)
+            except CallbackUrlError as e:
+                logging.warning(f"Requisição recebida com 'callback_url' recusado: {e}")
+                return jsonify({"error": str(e)}), 400
+
+        job = await asyncio.to_thread(get_job_manager().submit, pdf_file.stream, recipient_email, callback_url)
+        if job is None:
+            admission.reject("jobs", "queue_full")
+        logging.info(f"Job {job['id']} aceito para processamento em segundo plano.")
+        return jsonify(job), 202, {"Location": f"/api/jobs/{job['id']}"}
+
+    # 3. Modo síncrono: extração, cálculo e e-mail dentro da requisição. Com o servidor
+    # saturado, a requisição é recusada (503 com Retry-After) em vez de ficar na fila.
+    admission.fail_fast()
+    admission.check_email_queue()
+    response_data, status_code = await process_calculation(pdf_file.stream, recipient_email)
+    return jsonify(response_data), status_code
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado."}), 404
+    return jsonify(job), 200
 
-            logging.info("Iniciando extração de dados do PDF...")
-            extracted_data = extract_data_from_pdf(temp_path)
-            if not extracted_data.valor_bruto or not extracted_data.data_base_calculo:
-                logging.error("Dados essenciais (valor_bruto, data_base_calculo) não encontrados no PDF.")
-                return jsonify({"error": "Não foi possível extrair 'valor_bruto' ou 'data_base_calculo' do PDF."}), 400
-            logging.info("Dados do PDF extraídos com sucesso.")
 
-        # 3. Cálculo dos valores
-        logging.info("Iniciando cálculo de valores...")
+@api_bp.route('/emails/<email_id>', methods=['GET'])
+def email_status(email_id):
+    status = get_email_queue().get_status(email_id)
+    if status is None:
+        return jsonify({"error": "Envio de e-mail não encontrado."}), 404
+    return jsonify(status), 200
+
+
+@api_bp.route('/calculate/batch', methods=['POST'])
+async def calculate_batch():
+    logging.info("Recebida nova requisição para /api/calculate/batch.")
+
+    # 1. Validação dos dados de entrada
+    payload = request.get_json(silent=True)
+    items = payload.get('items') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        logging.warning("Requisição de lote recebida sem a lista 'items'.")
+        return jsonify({"error": "Envie um JSON com a lista 'items' a calcular."}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"O lote excede o limite de {BATCH_MAX_ITEMS} itens."}), 413
+
+    pairs = []
+    for position, item in enumerate(items):
+        try:
+            data = DadosRequisicaoSchema(**item)
+        except (TypeError, ValidationError):
+            return jsonify({"error": f"Item {position} do lote é inválido."}), 400
+        if not data.valor_bruto or not data.data_base_calculo:
+            return jsonify({"error": f"Item {position} do lote sem 'valor_bruto' ou 'data_base_calculo'."}), 400
+        pairs.append((data.valor_bruto, data.data_base_calculo))
+
+    try:
+        # 2. Cálculo dos valores
         calculator = await ValueCalculator.create()
-        calculation_results = calculator.calculate_values(
-            gross_value=extracted_data.valor_bruto,
-            base_date_str=extracted_data.data_base_calculo
-        )
-        logging.info("Cálculo de valores finalizado com sucesso.")
+        try:
+            results = await asyncio.to_thread(calculator.calculate_values_batch, pairs)
+        except ValueError:
+            logging.warning("Lote recebido com 'data_base_calculo' fora do formato DD/MM/AAAA.")
+            return jsonify({"error": "Todas as datas base devem estar no formato DD/MM/AAAA."}), 400
 
-        # 4. Envio de E-mail
+        logging.info(f"Cálculo em lote de {len(results)} itens finalizado com sucesso.")
+        return jsonify({"status": "success", "results": results}), 200
+
+    except Exception as e:
+        logging.error(f"Ocorreu uma falha inesperada no servidor durante o cálculo em lote: {repr(e)}")
+        return jsonify({"error": "Ocorreu uma falha inesperada no servidor."}), 500
+
+
+class BulkLimitExceeded(Exception):
+    """O envio em lote excede o limite de arquivos ou de tamanho descompactado."""
+
+
+# Falhas ao descompactar uma entrada: criptografada (RuntimeError), compressão não suportada
+# (NotImplementedError) ou conteúdo corrompido (BadZipFile, zlib.error, EOFError)
+_ZIP_ENTRY_ERRORS = (RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error, EOFError)
+
+
+def _collect_bulk_pdfs(uploads) -> tuple:
+    """
+    Lê os arquivos enviados. Arquivos ZIP são expandidos e apenas os PDFs
+    contidos neles são considerados; cada PDF descompactado respeita o mesmo
+    limite de tamanho de um upload. Retorna a lista de (nome, bytes) e a
+    lista de resultados de erro das entradas que não puderam ser
+    descompactadas, que viram linhas de erro no NDJSON.
+
+    Os limites de quantidade (BULK_MAX_FILES) e de tamanho total
+    descompactado (BULK_MAX_TOTAL_MB, por padrão o mesmo de um upload) são
+    conferidos antes de descompactar cada entrada, pelo tamanho declarado no
+    ZIP (o zipfile não lê além dele): um ZIP pequeno e muito compressível
+    não ocupa mais memória que um upload comum.
+    """
+    max_upload_size = current_app.config["MAX_CONTENT_LENGTH"]
+    max_total_size = int(float(BULK_MAX_TOTAL_MB) * 1024 * 1024) if BULK_MAX_TOTAL_MB else max_upload_size
+    documents, failures = [], []
+    total_size = 0
+
+    def add(size: int):
+        nonlocal total_size
+        if len(documents) + len(failures) >= BULK_MAX_FILES:
+            raise BulkLimitExceeded(f"O envio excede o limite de {BULK_MAX_FILES} arquivos.")
+        total_size += size
+        if max_total_size and total_size > max_total_size:
+            raise BulkLimitExceeded(
+                f"Os PDFs enviados excedem o total de {max_total_size / (1024 * 1024):g} MB descompactados."
+            )
+
+    for upload in uploads:
+        if upload.filename == '':
+            continue
+        data = upload.read()
+        if zipfile.is_zipfile(io.BytesIO(data)):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for entry in archive.infolist():
+                    if not entry.is_dir() and entry.filename.lower().endswith('.pdf'):
+                        if max_upload_size and entry.file_size > max_upload_size:
+                            raise RequestEntityTooLarge()
+                        add(entry.file_size)
+                        try:
+                            documents.append((entry.filename, archive.read(entry)))
+                        except _ZIP_ENTRY_ERRORS as e:
+                            logging.warning(f"Falha ao descompactar '{entry.filename}' do lote: {repr(e)}")
+                            failures.append({"file": entry.filename, "status": "error",
+                                             "error": "Não foi possível descompactar o arquivo do ZIP."})
+        else:
+            add(len(data))
+            documents.append((upload.filename, data))
+    return documents, failures
+
+
+def _process_bulk_document(filename: str, pdf_bytes: bytes, calculator: ValueCalculator, recipient_email: str) -> dict:
+    """Extrai, calcula e (opcionalmente) envia o e-mail de um único PDF do lote."""
+    result_cache = get_result_cache()
+    ipca_version = calculator.ipca_table.version
+    pdf_digest = result_cache.make_digest(pdf_bytes)
+    cached_result = result_cache.get(pdf_digest, ipca_version)
+
+    if cached_result:
+        input_data, calculation_results = cached_result["input_data"], cached_result["result"]
+    else:
         try:
-            send_calculation_email(
-                recipient_email=recipient_email,
-                input_data=extracted_data.dict(),
-                calculation_results=calculation_results
+            extracted_data = extract_data_isolated(pdf_bytes)
+            if not extracted_data.valor_bruto or not extracted_data.data_base_calculo:
+                return {"file": filename, "status": "error",
+                        "error": "Não foi possível extrair 'valor_bruto' ou 'data_base_calculo' do PDF."}
+
+            calculation_results = calculator.calculate_values(
+                gross_value=extracted_data.valor_bruto,
+                base_date_str=extracted_data.data_base_calculo
             )
+        except PdfProcessingError as e:
+            logging.error(f"Falha na extração de '{filename}' no lote: {repr(e)}")
+            return {"file": filename, "status": "error", "error": str(e)}
         except Exception as e:
-            logging.error(f"Cálculo bem-sucedido, mas o envio de e-mail falhou: {repr(e)}")
-            response_data = {
-                "status": "success_with_email_failure",
-                "message": f"Cálculo realizado, mas falha ao enviar e-mail: {repr(e)}",
-                "input_data": extracted_data.dict(),
-                "result": calculation_results
-            }
-            return jsonify(response_data), 200
-
-        logging.info("Processo finalizado com sucesso (cálculo e e-mail).")
-        response_data = {
-            "status": "success",
-            "input_data": extracted_data.dict(),
-            "result": calculation_results
-        }
-        return jsonify(response_data), 200
+            logging.error(f"Falha ao processar '{filename}' no lote: {repr(e)}")
+            return {"file": filename, "status": "error", "error": "Falha ao processar o PDF."}
+        input_data = extracted_data.dict()
+        result_cache.put(pdf_digest, ipca_version, {"input_data": input_data, "result": calculation_results})
+
+    response_data = {
+        "file": filename,
+        "status": "success",
+        "input_data": input_data,
+        "result": calculation_results,
+        "cached": bool(cached_result)
+    }
+    if recipient_email:
+        email_status = get_email_queue().submit(
+            recipient_email=recipient_email,
+            input_data=input_data,
+            calculation_results=calculation_results
+        )
+        response_data["email"] = email_status
+        if email_status["status"] == STATUS_FAILED:
+            response_data["status"] = "success_with_email_failure"
+            response_data["message"] = f"Cálculo realizado, mas falha ao enviar e-mail: {email_status['error']}"
+    return response_data
+
 
+@api_bp.route('/calculate/bulk', methods=['POST'])
+async def calculate_bulk():
+    """
+    Recebe vários PDFs (várias partes 'pdf_file' ou um único ZIP) e devolve,
+    em NDJSON, uma linha por requisitório assim que cada um fica pronto.
+    O envio de e-mail é opcional: só ocorre se 'recipient_email' for informado.
+    """
+    logging.info("Recebida nova requisição para /api/calculate/bulk.")
+
+    # 1. Validação dos dados de entrada (multipart e ZIP lidos fora do event loop)
+    uploads = (await asyncio.to_thread(_load_uploaded_files)).getlist('pdf_file')
+    if not uploads:
+        logging.warning("Requisição de lote recebida sem 'pdf_file'.")
+        return jsonify({"error": "Nenhum arquivo PDF foi enviado."}), 400
+
+    try:
+        documents, failures = await asyncio.to_thread(_collect_bulk_pdfs, uploads)
+    except zipfile.BadZipFile:
+        return jsonify({"error": "O arquivo ZIP enviado é inválido."}), 400
+    except BulkLimitExceeded as e:
+        logging.warning(f"Lote recusado: {e}")
+        return jsonify({"error": str(e)}), 413
+    if not documents and not failures:
+        return jsonify({"error": "Nenhum arquivo PDF foi encontrado no envio."}), 400
+
+    recipient_email = request.form.get('recipient_email')
+
+    try:
+        calculator = await ValueCalculator.create()
+    except Exception as e:
+        logging.error(f"Falha ao preparar a calculadora para o lote: {repr(e)}")
+        return jsonify({"error": "Ocorreu uma falha inesperada no servidor."}), 500
+
+    # 2. Processamento paralelo, com cada resultado enviado assim que fica pronto
+    def generate():
+        executor = _get_bulk_executor()
+        futures = [
+            executor.submit(_process_bulk_document, filename, pdf_bytes, calculator, recipient_email)
+            for filename, pdf_bytes in documents
+        ]
+        for failure in failures:
+            yield json.dumps(failure, ensure_ascii=False) + "\n"
+        for future in as_completed(futures):
+            yield json.dumps(future.result(), ensure_ascii=False) + "\n"
+        logging.info(f"Lote de {len(documents) + len(failures)} PDFs finalizado.")
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@api_bp.route('/calculate/csv', methods=['POST'])
+async def calculate_csv():
+    """
+    Recebe no corpo da requisição (Content-Type: text/csv) um CSV com
+    numero_oficio, valor_bruto, data_base_calculo e cpf e devolve o mesmo CSV
+    com as colunas do resultado, gerado à medida que as linhas são lidas e
+    corrigidas. Linhas inválidas vêm com status "erro" e a descrição no campo
+    "erro". O corpo não passa pelo parser de multipart, que guardaria o
+    arquivo inteiro antes do processamento.
+    """
+    logging.info("Recebida nova requisição para /api/calculate/csv.")
+    request.max_content_length = int(CSV_MAX_UPLOAD_MB * 1024 * 1024)
+
+    # 1. Validação do cabeçalho
+    try:
+        repricing = CsvRepricing(io.TextIOWrapper(request.stream, encoding='utf-8-sig', errors='replace', newline=''))
+    except CsvFormatError as e:
+        logging.warning(f"CSV recusado: {e}")
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        calculator = await ValueCalculator.create()
     except Exception as e:
-        logging.error(f"Ocorreu uma falha inesperada no servidor durante o cálculo: {repr(e)}")
-        return jsonify({"error": f"Ocorreu uma falha inesperada no servidor."}), 500
\ No newline at end of file
+        logging.error(f"Falha ao preparar a calculadora para o CSV: {repr(e)}")
+        return jsonify({"error": "Ocorreu uma falha inesperada no servidor."}), 500
+
+    # 2. Correção em blocos, com cada bloco enviado assim que fica pronto
+    return Response(
+        stream_with_context(repricing.iter_csv(calculator)),
+        mimetype='text/csv',
+        headers={"Content-Disposition": "attachment; filename=requisitorios_corrigidos.csv"}
+    )
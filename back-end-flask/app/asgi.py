@@ -0,0 +1,98 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from .services.event_loop import use_running_loop, close_http_client
+
+
+class _ThreadedWsgiInstance(WsgiToAsgiInstance):
+    """
+    Executa cada requisição WSGI em um pool de threads próprio. O adaptador
+    padrão do asgiref serializa todas as requisições em uma única thread.
+
+    Depende de atributos internos de WsgiToAsgiInstance (build_environ,
+    start_response, sync_send, response_*) e de `duplicate_header_limit`;
+    por isso o asgiref tem versão exata no requirements.txt, e
+    tests/test_asgi.py cobre o adaptador antes de qualquer atualização.
+    """
+    executor: ThreadPoolExecutor = None
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._run_wsgi_app_sync, thread_sensitive=False, executor=self.executor)(body)
+
+    def _run_wsgi_app_sync(self, body):
+        """
+        Roda a aplicação WSGI na thread do pool (start_response é chamado na
+        mesma thread) e repassa a resposta ao servidor ASGI por `sync_send`.
+        """
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Cabeçalhos duplicados além de `duplicate_header_limit`
+            self.sync_send({"type": "http.response.start", "status": 400, "headers": [(b"content-type", b"text/plain")]})
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request: Too many duplicate headers"})
+            return
+
+        bytes_sent = 0
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                # Nunca envia mais bytes do que o Content-Length informado
+                if self.response_content_length is not None:
+                    output = output[:self.response_content_length - bytes_sent]
+                self.sync_send({"type": "http.response.body", "body": output, "more_body": True})
+                bytes_sent += len(output)
+                if bytes_sent == self.response_content_length:
+                    break
+        finally:
+            # Exigido pelo WSGI; é o que dispara o teardown das requisições no Flask
+            if hasattr(response, "close"):
+                response.close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
+
+
+class AsgiApp(WsgiToAsgi):
+    """
+    Serve a aplicação Flask em um servidor ASGI (Uvicorn). O loop do servidor
+    passa a ser o event loop compartilhado: as views assíncronas e o cliente
+    HTTP do IPCA rodam nele, enquanto cada requisição WSGI ocupa uma thread
+    do pool `ASGI_THREADS`, separado do pool de trabalho bloqueante.
+    """
+
+    def __init__(self, wsgi_application, threads: int = 32):
+        super().__init__(wsgi_application)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi-request")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        instance = _ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)
+        instance.executor = self._executor
+        await instance(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                use_running_loop()
+                logging.info("Servidor ASGI iniciado com event loop compartilhado.")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await close_http_client()
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(flask_app) -> AsgiApp:
+    return AsgiApp(flask_app, threads=int(os.getenv("ASGI_THREADS", 32)))
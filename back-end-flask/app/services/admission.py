@@ -0,0 +1,125 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict
+
+from app.services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTS
+
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 5))
+# Rajada esperada: quantas requisições podem aguardar uma extração de PDF além das que estão em
+# andamento. O padrão cobre as threads de um processo (WEB_THREADS, Waitress) com folga; a espera
+# de cada uma continua limitada por PDF_PARSE_QUEUE_TIMEOUT_SECONDS.
+PDF_PARSE_DEFAULT_QUEUE_SIZE = 32
+
+# Requisições que devem ser recusadas (503) em vez de esperar indefinidamente por uma vaga
+_fail_fast: ContextVar[bool] = ContextVar("admission_fail_fast", default=False)
+
+
+class ServerBusyError(Exception):
+    """O servidor está saturado; a requisição deve ser repetida depois de `retry_after` segundos."""
+
+    def __init__(self, stage: str, reason: str, retry_after: int = ADMISSION_RETRY_AFTER_SECONDS):
+        super().__init__(f"Etapa '{stage}' saturada ({reason}).")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def reject(stage: str, reason: str):
+    """Contabiliza a recusa e levanta ServerBusyError."""
+    ADMISSION_REJECTS.inc(stage, reason)
+    logging.warning(f"Requisição recusada por sobrecarga na etapa '{stage}' ({reason}).")
+    raise ServerBusyError(stage, reason)
+
+
+def fail_fast():
+    """
+    Marca a requisição atual (e as threads e corrotinas iniciadas por ela)
+    para ser recusada quando uma etapa estiver saturada. Sem isso, como nos
+    jobs em segundo plano, a espera pela vaga não tem limite.
+    """
+    _fail_fast.set(True)
+
+
+class StageLimiter:
+    """
+    Limita a `limit` execuções simultâneas de uma etapa. Quem chega com a
+    etapa cheia aguarda uma vaga; requisições marcadas com `fail_fast` só
+    esperam se houver menos de `max_waiting` na fila, e no máximo
+    `wait_timeout` segundos.
+    """
+
+    def __init__(self, stage: str, limit: int, max_waiting: int, wait_timeout: float):
+        self.stage = stage
+        self.limit = limit
+        self._max_waiting = max_waiting
+        self._wait_timeout = wait_timeout
+        self._slots = threading.Semaphore(limit)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        self._acquire()
+        ADMISSION_IN_FLIGHT.inc(self.stage)
+        try:
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.dec(self.stage)
+            self._slots.release()
+
+    def _acquire(self):
+        if self._slots.acquire(blocking=False):
+            return
+        fail_fast_request = _fail_fast.get()
+        with self._lock:
+            if fail_fast_request and self._waiting >= self._max_waiting:
+                reject(self.stage, "queue_full")
+            self._waiting += 1
+            ADMISSION_QUEUE_DEPTH.set(self._waiting, self.stage)
+        try:
+            acquired = self._slots.acquire(timeout=self._wait_timeout if fail_fast_request else None)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                ADMISSION_QUEUE_DEPTH.set(self._waiting, self.stage)
+        if not acquired:
+            reject(self.stage, "timeout")
+
+
+def _create_limiter(stage: str) -> StageLimiter:
+    if stage == "pdf_parse":
+        configured = os.getenv("PDF_PARSE_MAX_CONCURRENT") or os.getenv("PDF_POOL_WORKERS")
+        limit = int(configured or 0) or os.cpu_count() or 1
+        return StageLimiter(
+            stage, limit,
+            max_waiting=int(os.getenv("PDF_PARSE_QUEUE_SIZE") or max(PDF_PARSE_DEFAULT_QUEUE_SIZE, 2 * limit)),
+            wait_timeout=float(os.getenv("PDF_PARSE_QUEUE_TIMEOUT_SECONDS", 10))
+        )
+    if stage == "smtp_send":
+        # Os envios partem da fila de e-mails, em segundo plano, e sempre aguardam a vaga;
+        # a pressão sobre as requisições vem da fila cheia (veja `check_email_queue`).
+        return StageLimiter(stage, int(os.getenv("SMTP_MAX_CONCURRENT", 2)), max_waiting=0, wait_timeout=0)
+    raise KeyError(stage)
+
+
+_limiters: Dict[str, StageLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_stage_limiter(stage: str) -> StageLimiter:
+    """Retorna o limitador da etapa ("pdf_parse" ou "smtp_send"), criando-o no primeiro uso."""
+    with _limiters_lock:
+        if stage not in _limiters:
+            _limiters[stage] = _create_limiter(stage)
+        return _limiters[stage]
+
+
+def check_email_queue():
+    """Recusa a requisição de imediato se a fila de e-mails não comporta mais um envio."""
+    from app.services.email_queue import get_email_queue
+
+    if get_email_queue().is_full():
+        reject("email", "queue_full")
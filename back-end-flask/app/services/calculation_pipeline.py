@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Optional, Tuple
+from app.services.pdf_parser import PdfSource
+from app.services.pdf_worker_pool import extract_data_isolated, PdfProcessingError
+from app.services.value_calculator import ValueCalculator
+from app.services.email_queue import get_email_queue, STATUS_FAILED
+from app.services.result_cache import get_result_cache
+from app.services.repricing_ledger import get_repricing_ledger
+from app.services.profiling import profiled
+from app.services.admission import ServerBusyError
+
+
+@profiled()
+def _extract_and_calculate(pdf_source: PdfSource, calculator: ValueCalculator) -> Tuple[dict, Optional[dict], bool]:
+    """
+    Parte bloqueante do fluxo (hash, pypdf, cálculo e cache), executada fora
+    do event loop. Retorna (dados de entrada, resultados, veio do cache); os
+    resultados são None quando o PDF não tem os dados essenciais.
+    """
+    # 1. Resultado já calculado para o mesmo PDF e a mesma série do IPCA
+    result_cache = get_result_cache()
+    ipca_version = calculator.ipca_table.version
+    pdf_digest = result_cache.make_digest(pdf_source)
+    cached_result = result_cache.get(pdf_digest, ipca_version)
+
+    if cached_result:
+        logging.info("Resultado encontrado no cache; extração e cálculo dispensados.")
+        return cached_result["input_data"], cached_result["result"], True
+
+    # 2. Processamento do PDF em um processo isolado, com tempo e memória limitados
+    logging.info("Iniciando extração de dados do PDF...")
+    extracted_data = extract_data_isolated(pdf_source)
+    if not extracted_data.valor_bruto or not extracted_data.data_base_calculo:
+        return extracted_data.dict(), None, False
+    logging.info("Dados do PDF extraídos com sucesso.")
+    input_data = extracted_data.dict()
+
+    # 3. Cálculo dos valores
+    logging.info("Iniciando cálculo de valores...")
+    calculation_results = calculator.calculate_values(
+        gross_value=extracted_data.valor_bruto,
+        base_date_str=extracted_data.data_base_calculo
+    )
+    logging.info("Cálculo de valores finalizado com sucesso.")
+    result_cache.put(pdf_digest, ipca_version, {"input_data": input_data, "result": calculation_results})
+    return input_data, calculation_results, False
+
+
+async def process_calculation(pdf_source: PdfSource, recipient_email: str) -> Tuple[dict, int]:
+    """
+    Executa o fluxo completo de um requisitório: extração dos dados do PDF,
+    cálculo dos valores e envio do e-mail. Retorna o corpo da resposta e o
+    status HTTP correspondente, tanto para a rota síncrona quanto para os jobs.
+    O trabalho bloqueante roda no pool de threads do event loop.
+    """
+    try:
+        calculator = await ValueCalculator.create()
+        input_data, calculation_results, cached_result = await asyncio.to_thread(
+            _extract_and_calculate, pdf_source, calculator
+        )
+        if calculation_results is None:
+            logging.error("Dados essenciais (valor_bruto, data_base_calculo) não encontrados no PDF.")
+            return {"error": "Não foi possível extrair 'valor_bruto' ou 'data_base_calculo' do PDF."}, 400
+
+        # 4. Registro do cálculo, para as atualizações mensais seguintes
+        ledger = get_repricing_ledger()
+        if ledger is not None:
+            try:
+                await asyncio.to_thread(ledger.record, recipient_email, input_data, calculator.ipca_table)
+            except Exception as e:
+                logging.error(f"Falha ao gravar o cálculo no registro: {repr(e)}")
+
+        # 5. Envio de E-mail, enfileirado para não segurar a resposta
+        email_status = get_email_queue().submit(
+            recipient_email=recipient_email,
+            input_data=input_data,
+            calculation_results=calculation_results
+        )
+        if email_status["status"] == STATUS_FAILED:
+            logging.error(f"Cálculo bem-sucedido, mas o e-mail não pôde ser enfileirado: {email_status['error']}")
+            response_data = {
+                "status": "success_with_email_failure",
+                "message": f"Cálculo realizado, mas falha ao enviar e-mail: {email_status['error']}",
+                "input_data": input_data,
+                "result": calculation_results,
+                "email": email_status,
+                "cached": bool(cached_result)
+            }
+            return response_data, 200
+
+        logging.info("Processo finalizado com sucesso (cálculo concluído e e-mail enfileirado).")
+        response_data = {
+            "status": "success",
+            "input_data": input_data,
+            "result": calculation_results,
+            "email": email_status,
+            "cached": bool(cached_result)
+        }
+        return response_data, 200
+
+    except PdfProcessingError as e:
+        logging.error(f"Falha na extração do PDF: {repr(e)}")
+        return {"error": str(e)}, 422
+
+    except ServerBusyError:
+        raise
+
+    except Exception as e:
+        logging.error(f"Ocorreu uma falha inesperada no servidor durante o cálculo: {repr(e)}")
+        return {"error": "Ocorreu uma falha inesperada no servidor."}, 500
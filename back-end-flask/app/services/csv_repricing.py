@@ -0,0 +1,161 @@
+import io
+import os
+import re
+import csv
+import logging
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.schemasPydantic import DadosRequisicaoSchema
+from app.services.value_calculator import ValueCalculator
+
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 1000))
+
+REQUIRED_COLUMNS = ("numero_oficio", "valor_bruto", "data_base_calculo", "cpf")
+# Valor com vírgula decimal: só o formato brasileiro, com o ponto (opcional) como separador de milhar
+BRAZILIAN_AMOUNT = re.compile(r"-?(\d{1,3}(\.\d{3})+|\d+),\d{1,2}")
+RESULT_COLUMNS = ("valor_bruto_corrigido", "valor_liquido_final_ir", "ultimo_mes_corrigido", "status", "erro")
+
+
+class CsvFormatError(ValueError):
+    """O CSV enviado não tem o cabeçalho esperado."""
+
+
+class CsvRepricing:
+    """
+    Correção em massa de um CSV com os dados já extraídos dos requisitórios.
+
+    As linhas são lidas do arquivo à medida que são processadas, validadas
+    com `DadosRequisicaoSchema` e corrigidas em blocos de `chunk_rows` com
+    `ValueCalculator.calculate_values_batch`; cada bloco é devolvido como CSV
+    assim que fica pronto. O uso de memória depende só do tamanho do bloco.
+    """
+
+    def __init__(self, text_stream: TextIO, chunk_rows: int = CSV_CHUNK_ROWS):
+        header_line = text_stream.readline()
+        # Planilhas em português costumam usar ponto e vírgula como separador
+        self.delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+        header = next(csv.reader([header_line], delimiter=self.delimiter), [])
+        self.fieldnames = [name.strip() for name in header]
+        missing = [column for column in REQUIRED_COLUMNS if column not in self.fieldnames]
+        if missing:
+            raise CsvFormatError(f"Colunas obrigatórias ausentes no CSV: {', '.join(missing)}.")
+        self._rows = csv.DictReader(text_stream, fieldnames=self.fieldnames, delimiter=self.delimiter)
+        self._chunk_rows = max(chunk_rows, 1)
+        self.output_columns = self.fieldnames + [column for column in RESULT_COLUMNS if column not in self.fieldnames]
+
+    def iter_csv(self, calculator: ValueCalculator) -> Iterator[str]:
+        """Gera o CSV de saída (cabeçalho e depois um trecho por bloco de linhas)."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.output_columns, delimiter=self.delimiter,
+                                extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        total = errors = 0
+        for chunk in _chunks(self._rows, self._chunk_rows):
+            for row in self._process_chunk(chunk, calculator):
+                writer.writerow(row)
+                errors += row["status"] == "erro"
+            total += len(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        logging.info(f"CSV processado: {total} linha(s), {errors} com erro.")
+
+    def _process_chunk(self, chunk: List[dict], calculator: ValueCalculator) -> List[dict]:
+        pairs, positions = [], []
+        for position, row in enumerate(chunk):
+            pair, error = _validate_row(row)
+            if error:
+                row.update(status="erro", erro=error)
+            else:
+                pairs.append(pair)
+                positions.append(position)
+
+        for position, result in zip(positions, calculator.calculate_values_batch(pairs)):
+            chunk[position].update(result, status="ok", erro="")
+        return chunk
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_amount(raw: Optional[str]) -> Optional[str]:
+    """
+    Aceita '650266.04' e o formato brasileiro 'R$ 650.266,04'. Valores com
+    vírgula fora desse formato ('1,234.56', '1,234') são ambíguos e geram
+    ValueError em vez de serem lidos com a ordem de grandeza errada.
+    """
+    amount = (raw or "").replace("R$", "").strip()
+    if "," in amount:
+        if not BRAZILIAN_AMOUNT.fullmatch(amount):
+            raise ValueError("'valor_bruto' ambíguo; use 650266.04 ou 650.266,04.")
+        amount = amount.replace(".", "").replace(",", ".")
+    return amount or None
+
+
+def _validate_row(row: dict) -> Tuple[Optional[Tuple[float, str]], Optional[str]]:
+    """Valida uma linha do CSV; retorna (valor bruto, data base) ou a descrição do erro."""
+    try:
+        amount = _parse_amount(row.get("valor_bruto"))
+    except ValueError as e:
+        return None, str(e)
+    try:
+        data = DadosRequisicaoSchema(
+            numero_oficio=(row.get("numero_oficio") or "").strip() or None,
+            cpf_beneficiario=(row.get("cpf") or "").strip() or None,
+            valor_bruto=amount,
+            data_base_calculo=(row.get("data_base_calculo") or "").strip() or None,
+        )
+    except ValidationError:
+        return None, "'valor_bruto' inválido."
+    if not data.valor_bruto or not data.data_base_calculo:
+        return None, "Linha sem 'valor_bruto' ou 'data_base_calculo'."
+    try:
+        datetime.strptime(data.data_base_calculo, '%d/%m/%Y')
+    except ValueError:
+        return None, "'data_base_calculo' fora do formato DD/MM/AAAA."
+    return (data.valor_bruto, data.data_base_calculo), None
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from contextlib import redirect_stdout
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from app.services.event_loop import run_coroutine
+
+    parser = argparse.ArgumentParser(
+        description="Corrige pelo IPCA um CSV com numero_oficio, valor_bruto, data_base_calculo e cpf."
+    )
+    parser.add_argument("entrada", help="CSV de entrada ('-' para a entrada padrão).")
+    parser.add_argument("saida", help="CSV de saída ('-' para a saída padrão).")
+    parser.add_argument("--bloco", type=int, default=CSV_CHUNK_ROWS, help="Linhas corrigidas por bloco.")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8-sig", newline="")
+    target = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8", newline="")
+    with source, target:
+        try:
+            repricing = CsvRepricing(source, args.bloco)
+        except CsvFormatError as e:
+            raise SystemExit(str(e))
+        # Mensagens da busca do IPCA vão para stderr, para não se misturarem ao CSV em stdout
+        with redirect_stdout(sys.stderr):
+            calculator = run_coroutine(ValueCalculator.create())
+        for text in repricing.iter_csv(calculator):
+            target.write(text)
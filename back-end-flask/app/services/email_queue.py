@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from app.services.email_service import send_calculation_emails
+from app.services.metrics import ADMISSION_QUEUE_DEPTH, EMAIL_DELIVERIES
+
+STATUS_QUEUED = "queued"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    Erros que uma nova tentativa não resolve: configuração ausente (ValueError),
+    credenciais recusadas e respostas SMTP 5xx, inclusive destinatários
+    recusados com 5xx. Quedas de conexão e respostas 4xx são temporárias.
+    """
+    import smtplib
+
+    if isinstance(error, (ValueError, smtplib.SMTPAuthenticationError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+class EmailDeliveryQueue:
+    """
+    Fila limitada de envios de e-mail, processada por threads em segundo
+    plano, com novas tentativas e intervalo crescente entre elas para erros
+    temporários (erros permanentes falham na primeira tentativa). Cada
+    worker retira até `batch_size` envios de uma vez e os entrega juntos,
+    pela mesma sessão SMTP.
+
+    Cada envio recebe um ID; o status (queued/sent/failed) pode ser
+    consultado depois com `get_status`. Apenas os `history_size` envios mais
+    recentes são mantidos em memória.
+    """
+
+    def __init__(self, send_batch_func: Callable[[list], List[Optional[Exception]]], max_size: int = 1000,
+                 workers: int = 2, max_attempts: int = 3, backoff_seconds: float = 2, batch_size: int = 20,
+                 history_size: int = 10000):
+        self._send_batch_func = send_batch_func
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._backoff = backoff_seconds
+        self._history_size = history_size
+        self._queue = queue.Queue(maxsize=max_size)
+        self._statuses = OrderedDict()
+        self._lock = threading.Lock()
+        for number in range(workers):
+            threading.Thread(target=self._worker, name=f"email-worker-{number}", daemon=True).start()
+
+    def submit(self, recipient_email: str, input_data: dict, calculation_results: dict) -> dict:
+        """Enfileira um envio e retorna seu status inicial."""
+        email_id = uuid.uuid4().hex
+        self._set_status(email_id, STATUS_QUEUED)
+        try:
+            self._queue.put_nowait((email_id, recipient_email, input_data, calculation_results))
+        except queue.Full:
+            logging.error("Fila de e-mails cheia; envio descartado.")
+            EMAIL_DELIVERIES.inc("failed")
+            self._set_status(email_id, STATUS_FAILED, error="Fila de envio de e-mails cheia.")
+        ADMISSION_QUEUE_DEPTH.set(self._queue.qsize(), "email")
+        return self.get_status(email_id)
+
+    def is_full(self) -> bool:
+        return self._queue.full()
+
+    def get_status(self, email_id: str) -> Optional[dict]:
+        with self._lock:
+            status = self._statuses.get(email_id)
+            return dict(status) if status else None
+
+    def _set_status(self, email_id: str, status: str, attempts: int = 0, error: Optional[str] = None):
+        with self._lock:
+            self._statuses[email_id] = {"id": email_id, "status": status, "attempts": attempts, "error": error}
+            self._statuses.move_to_end(email_id)
+            while len(self._statuses) > self._history_size:
+                self._statuses.popitem(last=False)
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            ADMISSION_QUEUE_DEPTH.set(self._queue.qsize(), "email")
+            try:
+                self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, batch: list):
+        pending = batch
+        for attempt in range(1, self._max_attempts + 1):
+            deliveries = [(recipient_email, input_data, results) for _, recipient_email, input_data, results in pending]
+            try:
+                errors = self._send_batch_func(deliveries)
+            except Exception as e:
+                errors = [e] * len(pending)
+
+            retry = []
+            for item, error in zip(pending, errors):
+                email_id = item[0]
+                if error is None:
+                    EMAIL_DELIVERIES.inc("sent")
+                    self._set_status(email_id, STATUS_SENT, attempts=attempt)
+                elif _is_permanent(error):
+                    EMAIL_DELIVERIES.inc("failed")
+                    self._set_status(email_id, STATUS_FAILED, attempts=attempt,
+                                     error=str(error) if isinstance(error, ValueError) else repr(error))
+                elif attempt == self._max_attempts:
+                    EMAIL_DELIVERIES.inc("failed")
+                    self._set_status(email_id, STATUS_FAILED, attempts=attempt, error=repr(error))
+                else:
+                    EMAIL_DELIVERIES.inc("retry")
+                    logging.warning(f"Tentativa {attempt} de envio do e-mail {email_id} falhou: {repr(error)}")
+                    self._set_status(email_id, STATUS_QUEUED, attempts=attempt, error=repr(error))
+                    retry.append(item)
+
+            if not retry:
+                return
+            time.sleep(self._backoff * 2 ** (attempt - 1))
+            pending = retry
+
+
+_email_queue = None
+_email_queue_lock = threading.Lock()
+
+
+def get_email_queue() -> EmailDeliveryQueue:
+    """Retorna a fila de e-mails do processo, criando-a no primeiro uso."""
+    global _email_queue
+    with _email_queue_lock:
+        if _email_queue is None:
+            _email_queue = EmailDeliveryQueue(
+                send_calculation_emails,
+                max_size=int(os.getenv("EMAIL_QUEUE_SIZE", 1000)),
+                workers=int(os.getenv("EMAIL_WORKERS", 2)),
+                max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", 3)),
+                backoff_seconds=float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", 2)),
+                batch_size=int(os.getenv("EMAIL_BATCH_SIZE", 20))
+            )
+        return _email_queue
@@ -1,45 +1,26 @@
-import smtplib
-import ssl
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import time
+from contextlib import contextmanager
+from string import Template
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 import logging
 
-def send_calculation_email(recipient_email: str, input_data: dict, calculation_results: dict):
-    """
-    Monta e envia um e-mail formatado com os resultados do cálculo.
-    """
-    # Carrega as credenciais das variáveis de ambiente
-    sender_email = os.getenv("MAIL_USERNAME")
-    password = os.getenv("MAIL_PASSWORD")
-    smtp_server = os.getenv("MAIL_SERVER")
-    port = int(os.getenv("MAIL_PORT", 465))
-
-    if not all([sender_email, password, smtp_server]):
-        raise ValueError("Credenciais de e-mail não configuradas nas variáveis de ambiente.")
+# smtplib, ssl e email.mime só são importados no primeiro envio, para acelerar a inicialização
+if TYPE_CHECKING:
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
 
-    # Cria a mensagem do e-mail
-    message = MIMEMultipart("alternative")
-    message["Subject"] = f"Ofício Nº {input_data.get('numero_oficio', 'N/A')}"
-    message["From"] = sender_email
-    message["To"] = recipient_email
-
-    valor_bruto_corrigido_fmt = f"R$ {calculation_results.get('valor_bruto_corrigido', 0):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    valor_liquido_final_fmt = f"R$ {calculation_results.get('valor_liquido_final_ir', 0):,.2f}".replace(",","X").replace(".", ",").replace("X", ".")
-    valor_bruto_original_fmt = f"R$ {input_data.get('valor_bruto', 0):,.2f}".replace(",", "X").replace(".",",").replace("X",".")
-
-    cpf = input_data.get('cpf_beneficiario')
-    cpf_fmt = cpf
-    if cpf and isinstance(cpf, str) and len(cpf) == 11:
-        cpf_fmt = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+from app.services.admission import get_stage_limiter
+from app.services.metrics import stage
 
-    # Cria o corpo do e-mail em HTML para uma formatação melhor
-    html_body = f"""
+# Corpo do e-mail em HTML, compilado uma única vez
+_HTML_TEMPLATE = Template("""
         <html>
       <body>
         <h2>Resultado do Cálculo de Correção </h2>
         <p>Olá,</p>
-        <p>Segue o resultado do cálculo solicitado para o Ofício Nº {input_data.get('numero_oficio', 'N/A')}.</p>
+        <p>Segue o resultado do cálculo solicitado para o Ofício Nº $numero_oficio.</p>
 
         <h3>Resumo do Cálculo</h3>
         <table border="1" cellpadding="5" cellspacing="0" style="border-collapse: collapse; width: 100%;">
@@ -49,23 +30,23 @@ def send_calculation_email(recipient_email: str, input_data: dict, calculation_r
           </tr>
           <tr>
             <td>Valor Bruto Original</td>
-            <td style="text-align: right;">{valor_bruto_original_fmt}</td>
+            <td style="text-align: right;">$valor_bruto_original</td>
           </tr>
           <tr>
             <td>Data Base do Cálculo</td>
-            <td style="text-align: right;">{input_data.get('data_base_calculo')}</td>
+            <td style="text-align: right;">$data_base_calculo</td>
           </tr>
           <tr>
             <td>Corrigido até (Último IPCA)</td>
-            <td style="text-align: right;">{calculation_results.get('ultimo_mes_corrigido')}</td>
+            <td style="text-align: right;">$ultimo_mes_corrigido</td>
           </tr>
           <tr>
             <td>Valor Bruto Corrigido</td>
-            <td style="text-align: right;">{valor_bruto_corrigido_fmt}</td>
+            <td style="text-align: right;">$valor_bruto_corrigido</td>
           </tr>
           <tr style="font-weight: bold; background-color: #e8f5e9;">
             <td>Valor Líquido Final (com 3% IR)</td>
-            <td style="text-align: right;">{valor_liquido_final_fmt}</td>
+            <td style="text-align: right;">$valor_liquido_final</td>
           </tr>
         </table>
         <br>
@@ -77,37 +58,235 @@ def send_calculation_email(recipient_email: str, input_data: dict, calculation_r
             </tr>
             <tr>
                 <td>Número do Ofício</td>
-                <td>{input_data.get('numero_oficio', 'N/A')}</td>
+                <td>$numero_oficio</td>
             </tr>
             <tr>
                 <td>Nome do Beneficiário</td>
-                <td>{input_data.get('nome_beneficiario', 'N/A')}</td>
+                <td>$nome_beneficiario</td>
             </tr>
             <tr>
                 <td>CPF do Beneficiário</td>
-                <td>{cpf_fmt}</td>
+                <td>$cpf</td>
             </tr>
         </table>
         <br>
         <p>Atenciosamente,<br>Calculadora de Correção </p>
       </body>
     </html>
-        """
+        """)
+
+# Troca os separadores do padrão americano (1,234.56) pelos do brasileiro (1.234,56)
+_BRL_SEPARATORS = str.maketrans({",": ".", ".": ","})
+
+
+def _format_brl(value: float) -> str:
+    return f"R$ {value:,.2f}".translate(_BRL_SEPARATORS)
+
+
+def _format_cpf(cpf):
+    if cpf and isinstance(cpf, str) and len(cpf) == 11:
+        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+    return cpf
+
+
+def build_calculation_message(sender_email: str, recipient_email: str, input_data: dict,
+                              calculation_results: dict) -> "MIMEMultipart":
+    """Monta a mensagem formatada com os resultados do cálculo."""
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    message = MIMEMultipart("alternative")
+    message["Subject"] = f"Ofício Nº {input_data.get('numero_oficio', 'N/A')}"
+    message["From"] = sender_email
+    message["To"] = recipient_email
+
+    html_body = _HTML_TEMPLATE.substitute(
+        numero_oficio=input_data.get('numero_oficio', 'N/A'),
+        valor_bruto_original=_format_brl(input_data.get('valor_bruto', 0)),
+        data_base_calculo=input_data.get('data_base_calculo'),
+        ultimo_mes_corrigido=calculation_results.get('ultimo_mes_corrigido'),
+        valor_bruto_corrigido=_format_brl(calculation_results.get('valor_bruto_corrigido', 0)),
+        valor_liquido_final=_format_brl(calculation_results.get('valor_liquido_final_ir', 0)),
+        nome_beneficiario=input_data.get('nome_beneficiario', 'N/A'),
+        cpf=_format_cpf(input_data.get('cpf_beneficiario'))
+    )
 
     message.attach(MIMEText(html_body, "html"))
+    return message
 
-    # Envia o e-mail
-    try:
-        context = ssl._create_unverified_context()
 
-        logging.info(f"Conectando ao servidor SMTP para enviar e-mail para {recipient_email}...")
+class SmtpConnectionPool:
+    """
+    Mantém sessões SMTP_SSL já autenticadas para reaproveitá-las entre
+    envios, evitando um novo handshake TLS e login a cada e-mail.
 
-        with smtplib.SMTP_SSL(smtp_server, port, context=context) as server:
-            server.login(sender_email, password)
-            server.sendmail(sender_email, recipient_email, message.as_string())
+    Sessões ociosas há mais de `noop_after_seconds` são verificadas com NOOP
+    antes do uso; as que não respondem são descartadas e recriadas. Com
+    `use_ssl=False` a conexão é SMTP simples (ex.: relay local de testes).
+    """
 
-        logging.info("E-mail enviado com sucesso!")
+    def __init__(self, server: str, port: int, username: str, password: str,
+                 max_idle: int = 2, noop_after_seconds: float = 10, use_ssl: bool = True):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self._use_ssl = use_ssl
+        self._max_idle = max_idle
+        self._noop_after = noop_after_seconds
+        self._idle: List[Tuple["smtplib.SMTP", float]] = []
+        self._lock = threading.Lock()
+        self._context = None
 
+    def _connect(self) -> "smtplib.SMTP":
+        import smtplib
+
+        logging.info("Abrindo nova sessão SMTP...")
+        if self._use_ssl:
+            import ssl
+
+            if self._context is None:
+                self._context = ssl._create_unverified_context()
+            connection = smtplib.SMTP_SSL(self.server, self.port, context=self._context)
+        else:
+            connection = smtplib.SMTP(self.server, self.port)
+        connection.login(self.username, self.password)
+        return connection
+
+    @staticmethod
+    def _close(connection: "smtplib.SMTP"):
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def _is_alive(self, connection: "smtplib.SMTP") -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except OSError:
+            return False
+
+    def _acquire(self) -> "smtplib.SMTP":
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, released_at = self._idle.pop()
+            if time.monotonic() - released_at < self._noop_after or self._is_alive(connection):
+                return connection
+            self._close(connection)
+        return self._connect()
+
+    def _release(self, connection: "smtplib.SMTP"):
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self._close(connection)
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma sessão autenticada; sessões que falham não voltam ao pool."""
+        connection = self._acquire()
+        try:
+            yield connection
+        except Exception:
+            self._close(connection)
+            raise
+        self._release(connection)
+
+    def send_messages(self, messages: List[Tuple[str, "MIMEMultipart"]]) -> List[Optional[Exception]]:
+        """
+        Envia várias mensagens (destinatário, mensagem) pela mesma sessão.
+        Se a sessão cair no meio do lote, reconecta uma vez e continua; outros
+        erros (autenticação, remetente recusado...) não se resolvem com uma
+        nova conexão e encerram o lote. Retorna, para cada mensagem, None em
+        caso de sucesso ou o erro.
+        """
+        import smtplib
+        import socket
+
+        errors: List[Optional[Exception]] = [None] * len(messages)
+        position = 0
+        reconnected = False
+        while position < len(messages):
+            try:
+                with self.connection() as connection:
+                    while position < len(messages):
+                        recipient_email, message = messages[position]
+                        try:
+                            connection.sendmail(self.username, recipient_email, message.as_string())
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                            errors[position] = e
+                        position += 1
+            except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout) as e:
+                if reconnected:
+                    errors[position:] = [e] * (len(messages) - position)
+                    break
+                logging.warning(f"Sessão SMTP perdida durante o envio, reconectando: {repr(e)}")
+                reconnected = True
+            except OSError as e:
+                # Demais erros SMTP e de rede: uma nova conexão não resolveria
+                errors[position:] = [e] * (len(messages) - position)
+                break
+        return errors
+
+
+_smtp_pool = None
+_smtp_pool_lock = threading.Lock()
+
+
+def _get_smtp_pool() -> SmtpConnectionPool:
+    """Retorna o pool SMTP do processo, criando-o a partir das variáveis de ambiente."""
+    global _smtp_pool
+    sender_email = os.getenv("MAIL_USERNAME")
+    password = os.getenv("MAIL_PASSWORD")
+    smtp_server = os.getenv("MAIL_SERVER")
+    port = int(os.getenv("MAIL_PORT", 465))
+
+    if not all([sender_email, password, smtp_server]):
+        raise ValueError("Credenciais de e-mail não configuradas nas variáveis de ambiente.")
+
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            _smtp_pool = SmtpConnectionPool(
+                smtp_server, port, sender_email, password,
+                max_idle=int(os.getenv("SMTP_POOL_SIZE", 2)),
+                use_ssl=os.getenv("MAIL_USE_SSL", "true").lower() not in ("false", "0", "no")
+            )
+        return _smtp_pool
+
+
+def send_calculation_emails(deliveries: Iterable[Tuple[str, dict, dict]]) -> List[Optional[Exception]]:
+    """
+    Envia vários e-mails de resultado (destinatário, dados de entrada,
+    resultados) reaproveitando uma única sessão SMTP. Retorna, para cada
+    envio, None em caso de sucesso ou o erro ocorrido.
+    """
+    pool = _get_smtp_pool()
+    messages = [
+        (recipient_email, build_calculation_message(pool.username, recipient_email, input_data, calculation_results))
+        for recipient_email, input_data, calculation_results in deliveries
+    ]
+    logging.info(f"Enviando {len(messages)} e-mail(s) pela sessão SMTP compartilhada...")
+    try:
+        with get_stage_limiter("smtp_send").slot(), stage("smtp_send"):
+            errors = pool.send_messages(messages)
     except Exception as e:
         logging.error(f"Falha ao enviar e-mail: {repr(e)}")
-        raise
+        return [e] * len(messages)
+
+    for error in errors:
+        if error is not None:
+            logging.error(f"Falha ao enviar e-mail: {repr(error)}")
+    return errors
+
+
+def send_calculation_email(recipient_email: str, input_data: dict, calculation_results: dict):
+    """
+    Monta e envia um e-mail formatado com os resultados do cálculo.
+    """
+    error = send_calculation_emails([(recipient_email, input_data, calculation_results)])[0]
+    if error is not None:
+        raise error
+    logging.info("E-mail enviado com sucesso!")
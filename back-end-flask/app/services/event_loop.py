@@ -0,0 +1,80 @@
+import os
+import asyncio
+import threading
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", 16))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+# Um cliente por event loop: as conexões do httpx ficam presas ao loop em que foram abertas
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _configure(loop: asyncio.AbstractEventLoop):
+    """Define o pool usado por asyncio.to_thread para o trabalho bloqueante (pypdf, SMTP, disco)."""
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking"))
+
+
+def use_running_loop():
+    """
+    Adota o event loop em execução (o do servidor ASGI) como o loop
+    compartilhado da aplicação. Deve ser chamado na inicialização do servidor.
+    """
+    global _loop
+    loop = asyncio.get_running_loop()
+    with _loop_lock:
+        _configure(loop)
+        _loop = loop
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retorna o event loop de longa duração do processo. Sob WSGI (Waitress),
+    ele é criado no primeiro uso e roda em uma thread dedicada.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            _configure(loop)
+            threading.Thread(target=loop.run_forever, name="shared-event-loop", daemon=True).start()
+            _loop = loop
+            logging.info("Event loop compartilhado iniciado.")
+        return _loop
+
+
+def run_coroutine(coro):
+    """Executa a corrotina no loop compartilhado e aguarda o resultado (a partir de código síncrono)."""
+    loop = get_event_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coro.close()
+        raise RuntimeError("run_coroutine não pode ser chamado de dentro do loop compartilhado.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Cliente HTTP compartilhado, com conexões keep-alive, do event loop em
+    execução (normalmente o loop compartilhado).
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = _http_clients[loop] = httpx.AsyncClient(verify=False, timeout=30)
+    return client
+
+
+async def close_http_client():
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
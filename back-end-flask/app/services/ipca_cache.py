@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+from app.services.event_loop import get_event_loop
+from app.services.metrics import IPCA_CACHE_REQUESTS
+
+
+class IpcaCache:
+    """
+    Cache em memória, compartilhado por todo o processo, da série do IPCA.
+
+    Enquanto os dados estiverem dentro do TTL, são devolvidos sem nenhuma
+    chamada ao BACEN. Depois de expirados, os dados antigos continuam sendo
+    servidos enquanto uma atualização roda em segundo plano
+    (stale-while-revalidate). Requisições concorrentes compartilham uma
+    única busca em andamento, executada no event loop compartilhado.
+
+    `initial_data` permite iniciar o cache já populado (ex.: com a série
+    salva localmente); esses dados são servidos de imediato, mas tratados
+    como expirados, de forma que a primeira leitura dispara uma atualização.
+    """
+
+    def __init__(self, fetcher: Callable[[], Awaitable[dict]], ttl_seconds: float, retry_seconds: float = 30,
+                 initial_data: Optional[dict] = None):
+        self._fetcher = fetcher
+        self._ttl = ttl_seconds
+        self._retry = retry_seconds
+        self._lock = threading.Lock()
+        self._data: dict = initial_data or {}
+        self._loaded_at: Optional[float] = None
+        self._inflight: Optional[Future] = None
+
+    async def get(self) -> dict:
+        """
+        Retorna a série do IPCA. Só aguarda o BACEN quando ainda não há
+        nenhum dado carregado no processo.
+        """
+        with self._lock:
+            data = self._data
+            if data and not self._is_expired():
+                IPCA_CACHE_REQUESTS.inc("hit")
+                return data
+            future = self._start_refresh()
+
+        if data:
+            IPCA_CACHE_REQUESTS.inc("stale")
+            return data
+        IPCA_CACHE_REQUESTS.inc("miss")
+        return await asyncio.wrap_future(future)
+
+    def invalidate(self):
+        """Marca os dados atuais como expirados, forçando uma nova busca."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _is_expired(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self._ttl
+
+    def _start_refresh(self) -> Future:
+        """Dispara a atualização em segundo plano, se ainda não houver uma. Exige o lock."""
+        if self._inflight is None:
+            self._inflight = asyncio.run_coroutine_threadsafe(self._refresh(), get_event_loop())
+        return self._inflight
+
+    async def _refresh(self) -> dict:
+        try:
+            data = await self._fetcher()
+        except Exception as e:
+            logging.error(f"Falha ao atualizar o cache do IPCA: {repr(e)}")
+            data = {}
+
+        with self._lock:
+            if data:
+                self._data = data
+                self._loaded_at = time.monotonic()
+            elif self._data:
+                # Mantém os dados antigos e só tenta de novo após o intervalo de retentativa.
+                logging.warning("Atualização do IPCA falhou; mantendo os dados em cache.")
+                self._loaded_at = time.monotonic() - self._ttl + self._retry
+            self._inflight = None
+            return self._data
@@ -0,0 +1,119 @@
+import os
+import mmap
+import time
+import struct
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from app.services.ipca_table import IpcaTable
+
+# Cabeçalho do arquivo: assinatura, número de meses, denominador e versão da série.
+# Em seguida vêm os ordinais e os fatores, ambos inteiros de 64 bits (little-endian).
+_MAGIC = b"IPCATBL1"
+_HEADER = struct.Struct("<8sqq64s")
+_POINTER_NAME = "ipca_table.current"
+_FILE_PREFIX = "ipca_table-"
+
+
+def write_shared_table(directory: Path, table: IpcaTable) -> Path:
+    """
+    Publica a tabela do IPCA em `directory` para os demais processos.
+
+    Cada versão vai para um arquivo próprio, nunca alterado depois de
+    escrito; a versão atual é indicada por um arquivo-ponteiro trocado
+    atomicamente com os.replace. Quem já mapeou uma versão anterior continua
+    lendo-a normalmente até abrir a nova.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    file_name = f"{_FILE_PREFIX}{table.version}.bin"
+    path = directory / file_name
+    if not path.exists():
+        temp_path = directory / f".{file_name}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, len(table), table.denominator, table.version.encode("ascii")))
+            file.write(struct.pack(f"<{len(table)}q", *table.ordinals))
+            file.write(struct.pack(f"<{len(table)}q", *table.factors))
+        os.replace(temp_path, path)
+
+    pointer_path = directory / _POINTER_NAME
+    if _read_pointer(pointer_path) != file_name:
+        temp_pointer = directory / f".{_POINTER_NAME}.{os.getpid()}.tmp"
+        temp_pointer.write_text(file_name, encoding="ascii")
+        os.replace(temp_pointer, pointer_path)
+        logging.info(f"Tabela do IPCA {table.version} publicada em {path}.")
+    _remove_old_versions(directory, file_name)
+    return path
+
+
+def _read_pointer(pointer_path: Path) -> Optional[str]:
+    try:
+        return pointer_path.read_text(encoding="ascii").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _remove_old_versions(directory: Path, current_name: str):
+    """Apaga as versões antigas. No Windows, arquivos ainda mapeados falham e ficam para a próxima vez."""
+    for old_path in directory.glob(f"{_FILE_PREFIX}*.bin"):
+        if old_path.name != current_name:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+
+
+def open_shared_table(path: Path) -> IpcaTable:
+    """
+    Mapeia o arquivo em memória, somente leitura, e monta uma IpcaTable cujos
+    arrays são views sobre o mapeamento: as páginas são compartilhadas por
+    todos os processos que abrirem a mesma versão.
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, count, denominator, version = _HEADER.unpack_from(mapped)
+    if magic != _MAGIC or len(mapped) != _HEADER.size + count * 16:
+        mapped.close()
+        raise ValueError(f"Arquivo da tabela do IPCA inválido: {path}")
+
+    # As views usam a ordem de bytes nativa, little-endian em todas as plataformas suportadas.
+    values = memoryview(mapped)[_HEADER.size:].cast("q")
+    table = IpcaTable(values[:count], values[count:], denominator)
+    table._version = version.rstrip(b"\0").decode("ascii")
+    return table
+
+
+class SharedIpcaTableReader:
+    """
+    Leitura, em um processo servidor, da tabela publicada por
+    `write_shared_table`. O arquivo-ponteiro é consultado no máximo a cada
+    `check_interval` segundos; ao mudar, a nova versão é mapeada e a antiga
+    é liberada quando a última requisição que a usa terminar.
+    """
+
+    def __init__(self, directory: Path, check_interval: float = 5):
+        self._pointer_path = directory / _POINTER_NAME
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._file_name: Optional[str] = None
+        self._table: Optional[IpcaTable] = None
+        self._checked_at = float("-inf")
+
+    def get(self) -> Optional[IpcaTable]:
+        """Tabela atual, ou None se nenhuma foi publicada ainda."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self._check_interval:
+                return self._table
+            self._checked_at = now
+
+            file_name = _read_pointer(self._pointer_path)
+            if file_name and file_name != self._file_name:
+                try:
+                    self._table = open_shared_table(self._pointer_path.with_name(file_name))
+                    self._file_name = file_name
+                    logging.info(f"Tabela do IPCA compartilhada {self._table.version} carregada.")
+                except (OSError, ValueError) as e:
+                    logging.error(f"Falha ao abrir a tabela do IPCA compartilhada: {repr(e)}")
+            return self._table
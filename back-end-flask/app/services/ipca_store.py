@@ -0,0 +1,68 @@
+import sqlite3
+import logging
+from contextlib import closing
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional
+
+
+class IpcaStore:
+    """
+    Guarda localmente, em um arquivo SQLite, a série do IPCA já baixada do
+    BACEN. Permite que a calculadora inicie sem rede e que as sincronizações
+    seguintes busquem apenas os meses novos.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ipca (data TEXT PRIMARY KEY, valor TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def load(self) -> dict:
+        """Carrega toda a série armazenada como {date: Decimal}."""
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute("SELECT data, valor FROM ipca").fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao ler a série local do IPCA: {repr(e)}")
+            return {}
+        return {date.fromisoformat(data): Decimal(valor) for data, valor in rows}
+
+    def last_date(self) -> Optional[date]:
+        """Retorna o mês mais recente armazenado, ou None se a série estiver vazia."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT MAX(data) FROM ipca").fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def save(self, ipca_data: dict):
+        """Insere ou atualiza os meses informados."""
+        if not ipca_data:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ipca (data, valor) VALUES (?, ?)",
+                [(data.isoformat(), str(valor)) for data, valor in ipca_data.items()]
+            )
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from app.services.event_loop import run_coroutine
+    from app.services.value_calculator import ValueCalculator
+
+    ipca_data = run_coroutine(ValueCalculator._load_ipca_data())
+    store = ValueCalculator._get_ipca_store()
+    if store:
+        print(f"Série local em '{store.db_path}': {len(ipca_data)} meses, último em {store.last_date()}.")
+    else:
+        print("IPCA_STORE_PATH está vazio; armazenamento local desativado.")
@@ -0,0 +1,106 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Tuple
+
+
+class IpcaTable:
+    """
+    Série do IPCA pré-ordenada e guardada em arrays, para aplicar a correção
+    mensal em aritmética inteira (centavos).
+
+    Cada mês é representado pelo ordinal da data e pelo numerador inteiro do
+    multiplicador (1 + índice/100), sobre um denominador comum. Os resultados
+    são idênticos aos da multiplicação com Decimal seguida de
+    quantize(ROUND_HALF_UP) a cada mês.
+    """
+
+    def __init__(self, ordinals: array, factors: array, denominator: int):
+        self.ordinals = ordinals
+        self.factors = factors
+        self.denominator = denominator
+        self._version = None
+
+    @classmethod
+    def from_dict(cls, ipca_data: dict) -> "IpcaTable":
+        """Monta a tabela a partir de um dicionário {date: Decimal} do IPCA."""
+        items = sorted(ipca_data.items())
+        decimals = max((-index.as_tuple().exponent for _, index in items), default=0)
+        decimals = max(decimals, 0)
+        ordinals = array('l', (month.toordinal() for month, _ in items))
+        factors = array('q', (int((index + 100).scaleb(decimals)) for _, index in items))
+        return cls(ordinals, factors, 10 ** (decimals + 2))
+
+    def to_dict(self) -> dict:
+        """Reconstrói o dicionário {date: Decimal} do IPCA a partir da tabela."""
+        decimals = len(str(self.denominator)) - 3
+        return {
+            date.fromordinal(ordinal): Decimal(factor).scaleb(-decimals) - 100
+            for ordinal, factor in zip(self.ordinals, self.factors)
+        }
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    @property
+    def last_date(self) -> Optional[date]:
+        """Mês mais recente da série."""
+        return date.fromordinal(self.ordinals[-1]) if self.ordinals else None
+
+    @property
+    def version(self) -> str:
+        """
+        Identificador da série: o último mês (AAAA-MM) seguido de um hash do
+        conteúdo. Muda sempre que um mês é publicado ou algum valor é revisto.
+        """
+        if self._version is None:
+            digest = hashlib.sha256(
+                self.ordinals.tobytes() + self.factors.tobytes() + str(self.denominator).encode()
+            ).hexdigest()[:16]
+            last_month = self.last_date.strftime('%Y-%m') if self.last_date else "0000-00"
+            self._version = f"{last_month}-{digest}"
+        return self._version
+
+    def start_index(self, base_date: date) -> int:
+        """Posição do primeiro mês da série igual ou posterior a `base_date`."""
+        return bisect_left(self.ordinals, base_date.toordinal())
+
+    def correct(self, value: Decimal, base_date: date) -> Tuple[Decimal, Optional[date]]:
+        """
+        Aplica o IPCA de cada mês a partir de `base_date`, arredondando para
+        centavos (meio para cima) a cada mês. Retorna o valor corrigido e o
+        último mês aplicado; se nenhum mês se aplica, devolve o valor intacto.
+        """
+        start = self.start_index(base_date)
+        if start >= len(self.ordinals):
+            return value, None
+
+        cents = self.apply_first_month(value, self.factors[start])
+        cents = self.apply_months(cents, start + 1)
+        return self.to_decimal(cents, value), self.last_date
+
+    def apply_first_month(self, value: Decimal, factor: int) -> int:
+        """
+        Aplica o primeiro mês sobre o valor original, que pode ter mais de
+        duas casas decimais, e retorna o resultado já em centavos.
+        """
+        exponent = value.as_tuple().exponent
+        scale = max(2, -exponent)
+        units = int(abs(value).scaleb(scale))
+        divisor = self.denominator * 10 ** (scale - 2)
+        return (units * factor * 2 + divisor) // (divisor * 2)
+
+    def apply_months(self, cents: int, start: int, stop: Optional[int] = None) -> int:
+        """Aplica, em centavos não negativos, os meses das posições [start, stop)."""
+        denominator = self.denominator
+        half = denominator // 2
+        for factor in self.factors[start:stop]:
+            cents = (cents * factor + half) // denominator
+        return cents
+
+    @staticmethod
+    def to_decimal(cents: int, original_value: Decimal) -> Decimal:
+        """Converte centavos de volta para Decimal, com o sinal do valor original."""
+        return Decimal(cents).scaleb(-2).copy_sign(original_value)
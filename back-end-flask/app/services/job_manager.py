@@ -0,0 +1,176 @@
+import os
+import time
+import uuid
+import shutil
+import socket
+import tempfile
+import ipaddress
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.services.calculation_pipeline import process_calculation
+from app.services.event_loop import run_coroutine
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Hosts aceitos como callback, separados por vírgula. Vazio: qualquer host que
+# resolva apenas para endereços públicos (nunca rede interna, loopback ou link-local).
+JOB_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+
+
+class CallbackUrlError(ValueError):
+    """O `callback_url` não pode ser usado; a mensagem é exibida ao cliente."""
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_callback_url(callback_url: str):
+    """
+    Valida o destino de um callback antes de aceitá-lo e novamente antes do
+    POST, já que o DNS pode mudar entre os dois momentos. Hosts listados em
+    JOB_CALLBACK_ALLOWED_HOSTS são confiáveis; sem a lista, todos os endereços
+    resolvidos precisam ser públicos, para que o servidor não seja usado para
+    alcançar a rede interna.
+    """
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise CallbackUrlError("O 'callback_url' deve ser uma URL http ou https.")
+
+    host = parsed.hostname.lower()
+    if JOB_CALLBACK_ALLOWED_HOSTS:
+        if host not in JOB_CALLBACK_ALLOWED_HOSTS:
+            raise CallbackUrlError("O host do 'callback_url' não está entre os permitidos.")
+        return
+
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (ValueError, OSError):
+        raise CallbackUrlError("Não foi possível resolver o host do 'callback_url'.")
+    if not all(_is_public_address(address) for address in addresses):
+        raise CallbackUrlError("O 'callback_url' deve apontar para um endereço público.")
+
+
+
+class JobManager:
+    """
+    Executa cálculos de /api/calculate em segundo plano, em um pool de
+    threads, desacoplando o recebimento do upload do processamento.
+
+    O resultado de cada job pode ser consultado pelo ID e, se informado um
+    `callback_url`, é enviado por POST (JSON) ao final. No máximo
+    `max_pending` jobs ficam aguardando ou em execução ao mesmo tempo; o PDF
+    de cada um espera em um arquivo temporário, não na memória.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 200, history_size: int = 10000,
+                 callback_timeout: float = 10):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calculate-job")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._history_size = history_size
+        self._callback_timeout = callback_timeout
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, pdf_stream: BinaryIO, recipient_email: str, callback_url: Optional[str] = None) -> Optional[dict]:
+        """Aceita um novo job e retorna seu estado inicial, ou None se a fila estiver cheia."""
+        if not self._slots.acquire(blocking=False):
+            return None
+
+        try:
+            spool = tempfile.TemporaryFile(prefix="ipca-job-")
+            shutil.copyfileobj(pdf_stream, spool)
+            spool.seek(0)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        job_id = uuid.uuid4().hex
+        self._update(job_id, status=JOB_QUEUED, created_at=time.time(), callback_url=callback_url)
+        self._executor.submit(self._run, job_id, spool, recipient_email, callback_url)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"id": job_id})
+            job.update(fields)
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self._history_size:
+                self._jobs.popitem(last=False)
+
+    def _run(self, job_id: str, pdf_spool: BinaryIO, recipient_email: str, callback_url: Optional[str]):
+        try:
+            self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+            response_data, status_code = run_coroutine(process_calculation(pdf_spool, recipient_email))
+            self._update(
+                job_id,
+                status=JOB_DONE if status_code == 200 else JOB_FAILED,
+                http_status=status_code,
+                response=response_data,
+                finished_at=time.time()
+            )
+        except Exception as e:
+            logging.error(f"Falha inesperada no job {job_id}: {repr(e)}")
+            self._update(job_id, status=JOB_FAILED, http_status=500,
+                         response={"error": "Ocorreu uma falha inesperada no servidor."}, finished_at=time.time())
+        finally:
+            pdf_spool.close()
+            self._slots.release()
+
+        if callback_url:
+            self._notify(job_id, callback_url)
+
+    def _notify(self, job_id: str, callback_url: str):
+        """Envia o estado final do job ao callback informado pelo cliente."""
+        try:
+            check_callback_url(callback_url)
+        except CallbackUrlError as e:
+            logging.warning(f"Callback do job {job_id} recusado: {e}")
+            self._update(job_id, callback_status="rejected")
+            return
+
+        try:
+            response = httpx.post(callback_url, json=self.get(job_id), timeout=self._callback_timeout)
+            response.raise_for_status()
+            self._update(job_id, callback_status="delivered")
+        except httpx.HTTPError as e:
+            logging.warning(f"Falha ao notificar o callback do job {job_id}: {repr(e)}")
+            self._update(job_id, callback_status="failed")
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Retorna o gerenciador de jobs do processo, criando-o no primeiro uso."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(
+                workers=int(os.getenv("JOB_WORKERS", 4)),
+                max_pending=int(os.getenv("JOB_MAX_PENDING", 200)),
+                callback_timeout=float(os.getenv("JOB_CALLBACK_TIMEOUT_SECONDS", 10))
+            )
+        return _job_manager
@@ -0,0 +1,220 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Contador monotônico, com rótulos, no formato do Prometheus."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Valor instantâneo (ex.: tamanho de uma fila), com rótulos, no formato do Prometheus."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histograma de durações (segundos), com rótulos, no formato do Prometheus."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de rótulos: [contagens por faixa (+Inf na última posição), soma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.label_names, label_values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "ipca_calc_stage_duration_seconds",
+    "Duração de cada etapa do processamento de um requisitório.",
+    ("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "ipca_calc_http_request_duration_seconds",
+    "Duração das requisições HTTP por rota e status.",
+    ("endpoint", "status")
+)
+IPCA_CACHE_REQUESTS = Counter(
+    "ipca_calc_ipca_cache_requests_total",
+    "Leituras do cache do IPCA por resultado (hit, stale ou miss).",
+    ("result",)
+)
+EMAIL_DELIVERIES = Counter(
+    "ipca_calc_email_deliveries_total",
+    "Tentativas de envio de e-mail por resultado (sent, retry ou failed).",
+    ("result",)
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "ipca_calc_admission_in_flight",
+    "Operações em execução em cada etapa com limite de concorrência (pdf_parse, smtp_send).",
+    ("stage",)
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "ipca_calc_admission_queue_depth",
+    "Operações aguardando vaga em cada etapa (pdf_parse, smtp_send) e e-mails na fila de envio (email).",
+    ("stage",)
+)
+ADMISSION_REJECTS = Counter(
+    "ipca_calc_admission_rejects_total",
+    "Requisições recusadas com 503 por sobrecarga, por etapa e motivo (queue_full ou timeout).",
+    ("stage", "reason")
+)
+
+_METRICS = (
+    STAGE_SECONDS, REQUEST_SECONDS, IPCA_CACHE_REQUESTS, EMAIL_DELIVERIES,
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTS
+)
+
+# Etapas registradas durante a requisição atual, usadas no cabeçalho Server-Timing
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(name: str, seconds: float):
+    """Registra a duração de uma etapa no histograma e na requisição em curso, se houver."""
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    """Mede o bloco como uma etapa do processamento."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started_at)
+
+
+@contextmanager
+def collect_timings():
+    """
+    Coleta as etapas medidas dentro do bloco (inclusive em threads e
+    corrotinas iniciadas a partir dele) e entrega a lista ao chamador.
+    """
+    timings: List[Tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Inicia a coleta das etapas da requisição atual."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total_seconds: float) -> str:
+    """Monta o cabeçalho Server-Timing, somando as etapas repetidas, em milissegundos."""
+    totals: Dict[str, float] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_metrics() -> str:
+    """Exporta todas as métricas no formato texto do Prometheus."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,22 +1,149 @@
+import io
 import re
-from pypdf import PdfReader
-from typing import Optional
+import time
+import threading
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, Optional, Union
 import pprint
 from pathlib import Path
 from app.schemas.schemasPydantic import DadosRequisicaoSchema
+from app.services.metrics import record_stage, stage
 
-def _extract_full_text(pdf_path: str) -> str:
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+FIELD_PATTERNS = {
+    "numero_oficio": re.compile(r"Definitivo OFÍCIO Nº:\s*([\d\./A-Z]+)", re.IGNORECASE),
+    "nome_beneficiario": re.compile(r"III - BENEFICIÁRIO\s+Nome:\s*([^\r\n]+)", re.IGNORECASE),
+    "cpf_beneficiario": re.compile(r"III - BENEFICIÁRIO\s+Nome:\s*[^\r\n]+\s+CPF:\s*(\d+)", re.IGNORECASE),
+    "valor_bruto": re.compile(r"Valor bruto da requisição:\s*R\$\s*([\d\.,]+)", re.IGNORECASE),
+    "data_base_calculo": re.compile(r"Data base do cálculo:\s*(\d{2}/\d{2}/\d{4})", re.IGNORECASE),
+}
+
+_DOCUMENT_TYPE_PATTERN = re.compile(r"OFÍCIO REQUISITÓRIO DE PAGAMENTO DE ([^\r\n]+)", re.IGNORECASE)
+
+
+class _PageHints:
+    """
+    Registra, por tipo de documento, em quais páginas cada campo costuma ser
+    encontrado. É usado para decidir a ordem de leitura das páginas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+
+    def record(self, document_type: str, field_pages: Dict[str, int]):
+        with self._lock:
+            for field, page in field_pages.items():
+                self._counts[document_type][field][page] += 1
+
+    def page_order(self, document_type: str, num_pages: int) -> List[int]:
+        """Páginas mais prováveis de cada campo primeiro; depois, as demais em ordem."""
+        with self._lock:
+            fields = self._counts.get(document_type, {})
+            hinted = {counts.most_common(1)[0][0] for counts in fields.values() if counts}
+        hinted = sorted(page for page in hinted if page < num_pages)
+        return hinted + [page for page in range(num_pages) if page not in hinted]
+
+    def snapshot(self) -> dict:
+        """Cópia das dicas registradas, no formato {tipo: {campo: {página: ocorrências}}}."""
+        with self._lock:
+            return {
+                document_type: {field: dict(counts) for field, counts in fields.items()}
+                for document_type, fields in self._counts.items()
+            }
+
+
+page_hints = _PageHints()
+
+PdfSource = Union[str, Path, bytes, BinaryIO]
+
+
+def _open_reader(pdf_source: PdfSource) -> "PdfReader":
+    """Abre o PDF a partir de um caminho, de bytes ou de um objeto de arquivo."""
+    from pypdf import PdfReader  # importado só no primeiro uso, para acelerar a inicialização
+
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        pdf_source = io.BytesIO(pdf_source)
+    return PdfReader(pdf_source)
+
+
+def _page_text(page) -> str:
+    return page.extract_text().replace('\xa0', ' ')
+
+
+def _extract_full_text(pdf_source: PdfSource) -> str:
     """Abre um PDF e extrai o texto completo de todas as páginas."""
-    reader = PdfReader(pdf_path)
-    full_text = ""
-    for page in reader.pages:
-        full_text += page.extract_text() + "\n"
-    return full_text
+    reader = _open_reader(pdf_source)
+    return "".join(page.extract_text() + "\n" for page in reader.pages)
 
 
-def _search_pattern(text: str, pattern: str) -> Optional[str]:
+def _detect_document_type(first_page_text: str) -> str:
+    """Identifica o tipo do ofício pelo título da primeira página."""
+    match = _DOCUMENT_TYPE_PATTERN.search(first_page_text)
+    return " ".join(match.group(1).split()).upper() if match else "DESCONHECIDO"
+
+
+def _extract_fields_early_exit(pdf_source: PdfSource) -> dict:
+    """
+    Lê as páginas uma a uma, na ordem sugerida pelas dicas do tipo de
+    documento, e para assim que todos os campos forem encontrados. Como na
+    extração tradicional, vale a primeira ocorrência no documento: um campo
+    só é dado como encontrado quando todas as páginas anteriores à da
+    ocorrência já foram lidas. Campos que não aparecem inteiros em uma única
+    página são buscados, ao final, no texto completo.
+    """
+    started_at = time.perf_counter()
+    regex_seconds = 0.0
+    reader = _open_reader(pdf_source)
+    num_pages = len(reader.pages)
+    if num_pages == 0:
+        record_stage("pdf_text", time.perf_counter() - started_at)
+        return {key: None for key in FIELD_PATTERNS}
+
+    page_texts = {0: _page_text(reader.pages[0])}
+    document_type = _detect_document_type(page_texts[0])
+
+    extracted_data_dict = {}
+    field_pages = {}
+    for page_number in page_hints.page_order(document_type, num_pages):
+        if page_number not in page_texts:
+            page_texts[page_number] = _page_text(reader.pages[page_number])
+        regex_started_at = time.perf_counter()
+        for key, pattern in FIELD_PATTERNS.items():
+            if field_pages.get(key, num_pages) < page_number:
+                continue
+            match = pattern.search(page_texts[page_number])
+            if match:
+                extracted_data_dict[key] = match.group(1).strip()
+                field_pages[key] = page_number
+        regex_seconds += time.perf_counter() - regex_started_at
+        if len(extracted_data_dict) == len(FIELD_PATTERNS) and all(
+            earlier_page in page_texts for earlier_page in range(max(field_pages.values()))
+        ):
+            break
+
+    missing = [key for key in FIELD_PATTERNS if key not in extracted_data_dict]
+    if missing:
+        full_text = "".join(
+            (page_texts[page_number] if page_number in page_texts else _page_text(reader.pages[page_number])) + "\n"
+            for page_number in range(num_pages)
+        )
+        regex_started_at = time.perf_counter()
+        for key in missing:
+            extracted_data_dict[key] = _search_pattern(full_text, FIELD_PATTERNS[key])
+        regex_seconds += time.perf_counter() - regex_started_at
+
+    page_hints.record(document_type, field_pages)
+    record_stage("pdf_text", time.perf_counter() - started_at - regex_seconds)
+    record_stage("pdf_regex", regex_seconds)
+    return extracted_data_dict
+
+
+def _search_pattern(text: str, pattern: re.Pattern) -> Optional[str]:
     """Busca um padrão de regex no texto e retorna o primeiro grupo de captura."""
-    match = re.search(pattern, text, re.IGNORECASE)
+    match = pattern.search(text)
     if match:
         return match.group(1).strip()
     return None
@@ -39,24 +166,27 @@ def _clean_cpf(cpf_str: Optional[str]) -> Optional[str]:
     return re.sub(r'[^\d]', '', cpf_str)
 
 
-def extract_data_from_pdf(pdf_path: str) -> DadosRequisicaoSchema:
+def extract_data_from_pdf(pdf_source: PdfSource, early_exit: bool = True) -> DadosRequisicaoSchema:
     """
     Função principal que orquestra a extração de dados de um PDF de requisição.
-    """
-    full_text = _extract_full_text(pdf_path)
-    full_text = full_text.replace('\xa0', ' ')
+    `pdf_source` pode ser um caminho, os bytes do PDF ou um objeto de arquivo
+    (ex.: o stream de um upload), sem necessidade de gravá-lo em disco.
 
-    patterns = {
-        "numero_oficio": r"Definitivo OFÍCIO Nº:\s*([\d\./A-Z]+)",
-        "nome_beneficiario": r"III - BENEFICIÁRIO\s+Nome:\s*([^\r\n]+)",
-        "cpf_beneficiario": r"III - BENEFICIÁRIO\s+Nome:\s*[^\r\n]+\s+CPF:\s*(\d+)",
-        "valor_bruto": r"Valor bruto da requisição:\s*R\$\s*([\d\.,]+)",
-        "data_base_calculo": r"Data base do cálculo:\s*(\d{2}/\d{2}/\d{4})",
-    }
-
-    extracted_data_dict = {}
-    for key, pattern in patterns.items():
-        extracted_data_dict[key] = _search_pattern(full_text, pattern)
+    Com `early_exit` (padrão), as páginas são lidas sob demanda e a leitura
+    termina assim que todos os campos são encontrados. Com `early_exit=False`,
+    o texto de todas as páginas é extraído antes da busca.
+    """
+    if early_exit:
+        extracted_data_dict = _extract_fields_early_exit(pdf_source)
+    else:
+        with stage("pdf_text"):
+            full_text = _extract_full_text(pdf_source)
+            full_text = full_text.replace('\xa0', ' ')
+
+        with stage("pdf_regex"):
+            extracted_data_dict = {}
+            for key, pattern in FIELD_PATTERNS.items():
+                extracted_data_dict[key] = _search_pattern(full_text, pattern)
 
     extracted_data_dict["valor_bruto"] = _clean_monetary_value(extracted_data_dict.get("valor_bruto"))
     extracted_data_dict["cpf_beneficiario"] = _clean_cpf(extracted_data_dict.get("cpf_beneficiario"))
@@ -81,5 +211,5 @@ if __name__ == '__main__':
         pprint.pprint(data)
 
     except FileNotFoundError:
-        print(f"\nErro: O arquivo de teste não foi encontrado.")
+        print("\nErro: O arquivo de teste não foi encontrado.")
         print("Verifique se 'Exemplo1.pdf' está na pasta 'back-end-flask'.")
\ No newline at end of file
@@ -0,0 +1,257 @@
+import os
+import atexit
+import cProfile
+import importlib
+import logging
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import List, Optional
+
+from app.schemas.schemasPydantic import DadosRequisicaoSchema
+from app.services.pdf_parser import extract_data_from_pdf, PdfSource
+from app.services.admission import get_stage_limiter
+from app.services.metrics import collect_timings, record_stage, stage
+from app.services.profiling import current_profile
+
+try:
+    import resource
+except ImportError:  # Windows: sem limite de memória por processo
+    resource = None
+
+
+class PdfProcessingError(Exception):
+    """Falha ao processar um PDF no pool de processos; a mensagem pode ser exibida ao cliente."""
+
+
+class PdfTimeoutError(PdfProcessingError):
+    pass
+
+
+class PdfWorkerCrashedError(PdfProcessingError):
+    pass
+
+
+def _worker_main(connection, max_memory_bytes: Optional[int]):
+    """
+    Laço de um processo de extração: recebe bytes de PDF (e se deve
+    perfilá-los) e devolve o status, os campos extraídos, as durações das
+    etapas medidas no processo e, se pedido, as estatísticas do cProfile.
+    """
+    if max_memory_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+    importlib.import_module("pypdf")  # carregado já na criação do processo, não no primeiro documento
+    connection.send(("ready",))
+
+    while True:
+        try:
+            pdf_bytes, profile = connection.recv()
+        except (EOFError, OSError, MemoryError):
+            return
+        profiler = cProfile.Profile() if profile else None
+        with collect_timings() as timings:
+            try:
+                if profiler:
+                    profiler.enable()
+                result = ("ok", extract_data_from_pdf(pdf_bytes).dict())
+            except MemoryError:
+                # O heap pode ter ficado inconsistente: avisa e encerra o processo.
+                connection.send(("memory", None, [], None))
+                return
+            except Exception as e:
+                result = ("error", repr(e))
+            finally:
+                if profiler:
+                    profiler.disable()
+        if profiler:
+            profiler.create_stats()
+        connection.send(result + (timings, profiler.stats if profiler else None))
+
+
+class _Worker:
+    def __init__(self, context, max_memory_bytes: Optional[int]):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_connection, max_memory_bytes), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.documents = 0
+        self.ready = False
+
+    def wait_ready(self, timeout: float = 60):
+        """Aguarda o processo terminar de carregar os módulos e ficar pronto para receber PDFs."""
+        if self.ready:
+            return
+        if not self.connection.poll(timeout):
+            raise TimeoutError("Processo de extração de PDF não iniciou a tempo.")
+        self.connection.recv()
+        self.ready = True
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        self.connection.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class PdfParsingPool:
+    """
+    Executa a extração dos PDFs em processos separados, fora do GIL das
+    threads do servidor, aproveitando todos os núcleos.
+
+    Cada documento tem um tempo máximo de `timeout_seconds`; ao estourar, o
+    processo é encerrado e substituído. Cada processo tem o espaço de
+    endereçamento limitado a `max_memory_mb` (onde o sistema permite) e é
+    reciclado depois de `max_documents` documentos.
+    """
+
+    def __init__(self, workers: int, timeout_seconds: float = 20, max_memory_mb: Optional[float] = 512,
+                 max_documents: int = 200):
+        self._context = multiprocessing.get_context("spawn")
+        self._timeout = timeout_seconds
+        self._max_memory_bytes = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        self._max_documents = max_documents
+        self._workers = workers
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        if self._max_memory_bytes and resource is None:
+            logging.warning("Limite de memória dos processos de PDF indisponível neste sistema operacional.")
+
+    def extract(self, pdf_source: PdfSource) -> DadosRequisicaoSchema:
+        """Extrai os dados do PDF em um processo do pool; mesmo retorno de `extract_data_from_pdf`."""
+        pdf_bytes = self._read_bytes(pdf_source)
+        profile = current_profile()
+        with stage("pdf_parse"), self._slots:
+            worker = None
+            try:
+                worker = self._acquire()
+                worker.connection.send((pdf_bytes, profile is not None))
+                if not worker.connection.poll(self._timeout):
+                    logging.error(f"Extração do PDF excedeu {self._timeout:g} s; processo {worker.process.pid} encerrado.")
+                    worker.stop(kill=True)
+                    worker = None
+                    raise PdfTimeoutError(
+                        f"O processamento do PDF excedeu o tempo limite de {self._timeout:g} segundos e foi interrompido."
+                    )
+                status, payload, timings, profile_stats = worker.connection.recv()
+                for name, seconds in timings:
+                    record_stage(name, seconds)
+                if profile_stats:
+                    profile.add_marshalled(profile_stats)
+                if status == "memory":
+                    worker.stop()
+                    worker = None
+            except (EOFError, OSError) as e:
+                logging.error(f"Processo de extração de PDF encerrado inesperadamente: {repr(e)}")
+                if worker is not None:
+                    worker.stop(kill=True)
+                    worker = None
+                raise PdfWorkerCrashedError(
+                    "O processamento do PDF foi interrompido por falha no leitor ou por exceder o limite de memória."
+                )
+            finally:
+                if worker is not None:
+                    self._release(worker)
+
+        if status == "ok":
+            return DadosRequisicaoSchema(**payload)
+        if status == "memory":
+            raise PdfWorkerCrashedError("O processamento do PDF foi interrompido por exceder o limite de memória.")
+        logging.error(f"Falha ao ler o PDF no processo de extração: {payload}")
+        raise PdfProcessingError("Não foi possível ler o PDF enviado; verifique se o arquivo não está corrompido.")
+
+    @staticmethod
+    def _read_bytes(pdf_source: PdfSource) -> bytes:
+        if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            return bytes(pdf_source)
+        if isinstance(pdf_source, (str, Path)):
+            return Path(pdf_source).read_bytes()
+        pdf_bytes = pdf_source.read()
+        pdf_source.seek(0)
+        return pdf_bytes
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.stop()
+        worker = _Worker(self._context, self._max_memory_bytes)
+        try:
+            worker.wait_ready()
+        except (EOFError, OSError):
+            worker.stop(kill=True)
+            raise
+        return worker
+
+    def _release(self, worker: _Worker):
+        worker.documents += 1
+        if not worker.process.is_alive() or worker.documents >= self._max_documents:
+            worker.stop()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def warm_up(self):
+        """Cria de antemão os processos do pool, para que as primeiras requisições não esperem por eles."""
+        with self._lock:
+            missing = self._workers - len(self._idle)
+        workers = [_Worker(self._context, self._max_memory_bytes) for _ in range(missing)]
+        for worker in workers:
+            try:
+                worker.wait_ready()
+            except (EOFError, OSError) as e:
+                logging.warning(f"Processo de extração de PDF não iniciou no aquecimento: {repr(e)}")
+                worker.stop(kill=True)
+                continue
+            with self._lock:
+                self._idle.append(worker)
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool() -> Optional[PdfParsingPool]:
+    """
+    Retorna o pool de extração do processo, criando-o no primeiro uso, ou
+    None se PDF_POOL_WORKERS=0 (extração na própria thread da requisição).
+    """
+    global _pdf_pool
+    workers = int(os.getenv("PDF_POOL_WORKERS", os.cpu_count() or 2))
+    if workers <= 0:
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = PdfParsingPool(
+                workers,
+                timeout_seconds=float(os.getenv("PDF_PARSE_TIMEOUT_SECONDS", 20)),
+                max_memory_mb=float(os.getenv("PDF_WORKER_MAX_MEMORY_MB", 512)),
+                max_documents=int(os.getenv("PDF_WORKER_MAX_DOCUMENTS", 200))
+            )
+            atexit.register(_pdf_pool.shutdown)
+        return _pdf_pool
+
+
+def extract_data_isolated(pdf_source: PdfSource) -> DadosRequisicaoSchema:
+    """
+    Extrai os dados do PDF no pool de processos, quando habilitado, dentro
+    do limite de extrações simultâneas (PDF_PARSE_MAX_CONCURRENT).
+    """
+    pool = get_pdf_pool()
+    with get_stage_limiter("pdf_parse").slot():
+        if pool is None:
+            return extract_data_from_pdf(pdf_source)
+        return pool.extract(pdf_source)
@@ -0,0 +1,165 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR") or str(Path(__file__).resolve().parents[2] / "data" / "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 500))
+
+# Cabeçalho que força o perfilamento da requisição; o valor deve ser igual a PROFILE_TOKEN
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class _MarshalledStats:
+    """Estatísticas já coletadas (ex.: recebidas de um processo de extração), no formato aceito por pstats."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RequestProfile:
+    """Perfis (cProfile) das etapas de uma requisição, somados em um único pstats."""
+
+    def __init__(self, reason: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.reason = reason
+        self._stats: Optional[pstats.Stats] = None
+        self.context_token = None
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def add_marshalled(self, stats: dict):
+        self.add(_MarshalledStats(stats))
+
+    def save(self, directory: Path, metadata: dict) -> Optional[Path]:
+        """Grava o .prof (pstats) e um .json com os metadados da requisição."""
+        with self._lock:
+            stats = self._stats
+        if stats is None:
+            return None
+        directory.mkdir(parents=True, exist_ok=True)
+        base_path = directory / f"{datetime.now():%Y%m%d-%H%M%S}-{self.id}"
+        stats.dump_stats(f"{base_path}.prof")
+        Path(f"{base_path}.json").write_text(
+            json.dumps({"id": self.id, "reason": self.reason, **metadata}, ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        return base_path
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def should_profile(headers) -> Optional[str]:
+    """
+    Decide se a requisição será perfilada. Retorna o motivo ("header" ou
+    "sample") ou None.
+    """
+    token = headers.get(PROFILE_HEADER)
+    if token and PROFILE_TOKEN and hmac.compare_digest(token, PROFILE_TOKEN):
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def start_request_profile(reason: str) -> RequestProfile:
+    """
+    Ativa o perfilamento para a requisição (e as threads e corrotinas
+    iniciadas por ela). Deve ser encerrado com `stop_request_profile`, senão
+    as próximas requisições atendidas pela mesma thread também são perfiladas.
+    """
+    profile = RequestProfile(reason)
+    profile.context_token = _current_profile.set(profile)
+    return profile
+
+
+def stop_request_profile(profile: RequestProfile):
+    """Desativa o perfilamento iniciado por `start_request_profile`."""
+    try:
+        _current_profile.reset(profile.context_token)
+    except ValueError:
+        # Token criado em outro contexto; basta desativar no contexto atual.
+        _current_profile.set(None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profiled():
+    """Perfila o bloco com cProfile, se a requisição atual estiver sendo perfilada."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Outro profiler já ativo (ex.: outra requisição perfilada em Python 3.12+).
+        logging.warning("Perfilamento ignorado: já há um profiler ativo.")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profile.add(profiler)
+
+
+def save_request_profile(profile: RequestProfile, endpoint: str, status: int, total_seconds: float,
+                         timings: List[Tuple[str, float]], document_bytes: Optional[int]) -> Optional[Path]:
+    """Grava o perfil da requisição com as durações das etapas e o tamanho do documento."""
+    stages = {}
+    for name, seconds in timings:
+        stages[name] = stages.get(name, 0) + seconds * 1000
+    metadata = {
+        "created_at": time.time(),
+        "endpoint": endpoint,
+        "status": status,
+        "document_bytes": document_bytes,
+        "total_ms": round(total_seconds * 1000, 1),
+        "stages_ms": {name: round(ms, 1) for name, ms in stages.items()},
+    }
+    directory = Path(PROFILE_DIR)
+    try:
+        base_path = profile.save(directory, metadata)
+        _prune(directory)
+    except OSError as e:
+        logging.warning(f"Falha ao gravar o perfil da requisição: {repr(e)}")
+        return None
+    if base_path:
+        logging.info(f"Perfil da requisição gravado em {base_path}.prof")
+    return base_path
+
+
+def _prune(directory: Path):
+    """Mantém apenas os PROFILE_MAX_FILES perfis mais recentes."""
+    profiles = sorted(directory.glob("*.prof"))
+    for old_profile in profiles[:max(len(profiles) - PROFILE_MAX_FILES, 0)]:
+        old_profile.unlink(missing_ok=True)
+        old_profile.with_suffix(".json").unlink(missing_ok=True)
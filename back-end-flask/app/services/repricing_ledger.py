@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from bisect import bisect_right
+from contextlib import closing
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.services.ipca_table import IpcaTable
+
+REPRICING_LEDGER_PATH = os.getenv("REPRICING_LEDGER_PATH", "")
+REPRICING_RESEND_EMAILS = os.getenv("REPRICING_RESEND_EMAILS", "false").lower() in ("true", "1", "yes")
+REPRICING_CHECK_SECONDS = float(os.getenv("REPRICING_CHECK_SECONDS", 3600))
+
+
+class RepricingLedger:
+    """
+    Registro local, em SQLite, dos cálculos concluídos. Para cada um guarda o
+    valor original, a data base, o último mês corrigido e o valor corrigido
+    em centavos, de forma que, quando o IPCA de um mês novo é publicado,
+    basta aplicar os meses novos sobre o valor guardado, com o mesmo
+    arredondamento mensal de `IpcaTable.correct`.
+
+    A série efetivamente aplicada também é guardada. Se o BACEN revisar um
+    mês já aplicado, os cálculos afetados são refeitos desde a data base.
+    """
+
+    def __init__(self, db_path: str, notify: bool = False):
+        self.db_path = Path(db_path)
+        self.notify = notify
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS calculos ("
+                " id INTEGER PRIMARY KEY,"
+                " chave TEXT NOT NULL UNIQUE,"
+                " destinatario TEXT NOT NULL,"
+                " dados_entrada TEXT NOT NULL,"
+                " valor_original TEXT NOT NULL,"
+                " data_base TEXT NOT NULL,"
+                " ultimo_mes TEXT,"
+                " centavos INTEGER,"
+                " reenvio_pendente INTEGER NOT NULL DEFAULT 0,"
+                " atualizado_em REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS calculos_ultimo_mes ON calculos (ultimo_mes)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS serie_aplicada ("
+                " mes TEXT PRIMARY KEY, fator INTEGER NOT NULL, denominador INTEGER NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _make_key(recipient_email: str, input_data: dict) -> str:
+        """Identifica o cálculo: o mesmo requisitório enviado ao mesmo destinatário é gravado uma única vez."""
+        identity = [recipient_email.strip().lower()] + [
+            input_data.get(field) for field in ("numero_oficio", "cpf_beneficiario", "valor_bruto", "data_base_calculo")
+        ]
+        return hashlib.sha256(json.dumps(identity, ensure_ascii=False).encode()).hexdigest()
+
+    def record(self, recipient_email: str, input_data: dict, table: IpcaTable):
+        """
+        Grava (ou atualiza) um cálculo concluído, corrigido pela série de
+        `table`. Só a linha nova é calculada: os cálculos já gravados são
+        levados à série nova por `advance`, no monitor, fora da requisição.
+        Uma linha gravada com série mais nova que a aplicada é recalculada
+        desde a data base se algum mês tiver sido revisto, e fica como está
+        caso contrário.
+        """
+        value = Decimal(str(input_data["valor_bruto"]))
+        base_date = datetime.strptime(input_data["data_base_calculo"], '%d/%m/%Y').date().replace(day=1)
+        cents, last_month = _correct_cents(table, value, base_date)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO calculos (chave, destinatario, dados_entrada, valor_original, data_base, ultimo_mes,"
+                " centavos, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (chave) DO UPDATE SET dados_entrada = excluded.dados_entrada,"
+                " ultimo_mes = excluded.ultimo_mes, centavos = excluded.centavos,"
+                " reenvio_pendente = 0, atualizado_em = excluded.atualizado_em",
+                (
+                    self._make_key(recipient_email, input_data), recipient_email,
+                    json.dumps(input_data, ensure_ascii=False), str(value), base_date.isoformat(),
+                    _iso(last_month), cents, time.time()
+                )
+            )
+
+    def advance(self, table: IpcaTable) -> int:
+        """
+        Leva todos os cálculos gravados até o último mês de `table`, aplicando
+        apenas os meses que ainda não foram aplicados a cada um. Retorna
+        quantos cálculos foram atualizados.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return self._advance(conn, table)
+
+    def _advance(self, conn: sqlite3.Connection, table: IpcaTable) -> int:
+        if not table:
+            return 0
+        applied = {
+            date.fromisoformat(month): (factor, denominator)
+            for month, factor, denominator in conn.execute("SELECT mes, fator, denominador FROM serie_aplicada")
+        }
+        if applied and table.last_date < max(applied):
+            # Série mais antiga que a já aplicada (ex.: requisição que começou antes da atualização)
+            return 0
+        current = {
+            date.fromordinal(ordinal): factor for ordinal, factor in zip(table.ordinals, table.factors)
+        }
+        revised = [
+            month for month, (factor, denominator) in applied.items()
+            if month not in current or current[month] * denominator != factor * table.denominator
+        ]
+        first_revised = min(revised, default=None)
+        if first_revised:
+            logging.warning(f"IPCA revisto a partir de {first_revised:%m/%Y}; cálculos afetados serão refeitos desde a data base.")
+        elif not applied:
+            # Sem série aplicada registrada não há como saber com que série cada linha foi gravada
+            first_revised = date.min
+
+        last_iso = table.last_date.isoformat()
+        revised_iso = first_revised.isoformat() if first_revised else "9999-12-31"
+        rows = conn.execute(
+            "SELECT id, valor_original, data_base, ultimo_mes, centavos FROM calculos"
+            " WHERE ultimo_mes IS NULL OR ultimo_mes < ? OR ultimo_mes >= ?",
+            (last_iso, revised_iso)
+        ).fetchall()
+
+        updates = []
+        for entry_id, original_value, base_date_iso, last_month_iso, cents in rows:
+            value = Decimal(original_value)
+            if last_month_iso is None or (first_revised and last_month_iso >= revised_iso):
+                new_cents, new_last_month = _correct_cents(table, value, date.fromisoformat(base_date_iso))
+            else:
+                # Só os meses posteriores ao último já aplicado
+                start = bisect_right(table.ordinals, date.fromisoformat(last_month_iso).toordinal())
+                new_cents, new_last_month = table.apply_months(cents, start), table.last_date
+            if new_cents != cents or _iso(new_last_month) != last_month_iso:
+                updates.append((new_cents, _iso(new_last_month), int(self.notify), time.time(), entry_id))
+
+        conn.executemany(
+            "UPDATE calculos SET centavos = ?, ultimo_mes = ?, reenvio_pendente = MAX(reenvio_pendente, ?),"
+            " atualizado_em = ? WHERE id = ?",
+            updates
+        )
+        if revised or len(applied) != len(current):
+            conn.execute("DELETE FROM serie_aplicada")
+            conn.executemany(
+                "INSERT INTO serie_aplicada (mes, fator, denominador) VALUES (?, ?, ?)",
+                [(month.isoformat(), factor, table.denominator) for month, factor in current.items()]
+            )
+        if updates:
+            logging.info(f"{len(updates)} cálculo(s) do registro atualizados até {table.last_date:%m/%Y}.")
+        return len(updates)
+
+    def claim_pending_notifications(self, limit: int = 500) -> List[Tuple[str, dict, dict]]:
+        """
+        Retira do registro até `limit` cálculos atualizados cujo e-mail ainda
+        não foi reenviado e devolve (destinatário, dados de entrada, resultados),
+        no formato aceito pela fila de e-mails.
+        """
+        from app.services.value_calculator import ValueCalculator
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, destinatario, dados_entrada, valor_original, ultimo_mes, centavos FROM calculos"
+                " WHERE reenvio_pendente = 1 LIMIT ?",
+                (limit,)
+            ).fetchall()
+            conn.executemany("UPDATE calculos SET reenvio_pendente = 0 WHERE id = ?", [(row[0],) for row in rows])
+
+        deliveries = []
+        for _, recipient_email, input_json, original_value, last_month_iso, cents in rows:
+            input_data = json.loads(input_json)
+            value = Decimal(original_value)
+            last_month = date.fromisoformat(last_month_iso) if last_month_iso else None
+            updated_value = IpcaTable.to_decimal(cents, value) if cents is not None else value
+            result = ValueCalculator._build_result(updated_value, last_month, input_data["data_base_calculo"])
+            deliveries.append((recipient_email, input_data, result))
+        return deliveries
+
+
+def _correct_cents(table: IpcaTable, value: Decimal, base_date: date) -> Tuple[Optional[int], Optional[date]]:
+    """Correção completa desde a data base, em centavos sem sinal; (None, None) se nenhum mês se aplica."""
+    start = table.start_index(base_date)
+    if start >= len(table):
+        return None, None
+    cents = table.apply_first_month(value, table.factors[start])
+    return table.apply_months(cents, start + 1), table.last_date
+
+
+def _iso(month: Optional[date]) -> Optional[str]:
+    return month.isoformat() if month else None
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_repricing_ledger() -> Optional[RepricingLedger]:
+    """Retorna o registro de cálculos do processo, ou None se REPRICING_LEDGER_PATH estiver vazio."""
+    global _ledger
+    if not REPRICING_LEDGER_PATH:
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = RepricingLedger(REPRICING_LEDGER_PATH, notify=REPRICING_RESEND_EMAILS)
+        return _ledger
+
+
+def _monitor():
+    from app.services.event_loop import run_coroutine
+    from app.services.email_queue import get_email_queue
+    from app.services.value_calculator import ValueCalculator
+
+    ledger = get_repricing_ledger()
+    while True:
+        try:
+            calculator = run_coroutine(ValueCalculator.create())
+            ledger.advance(calculator.ipca_table)
+            if ledger.notify:
+                for recipient_email, input_data, result in ledger.claim_pending_notifications():
+                    get_email_queue().submit(recipient_email, input_data, result)
+        except Exception as e:
+            logging.error(f"Falha ao atualizar o registro de cálculos: {repr(e)}")
+        time.sleep(REPRICING_CHECK_SECONDS)
+
+
+def start_repricing_monitor():
+    """
+    Com o registro ativo, verifica a cada REPRICING_CHECK_SECONDS se a série
+    do IPCA ganhou meses novos e atualiza os cálculos gravados (reenviando os
+    e-mails, se REPRICING_RESEND_EMAILS estiver ativo).
+    """
+    if get_repricing_ledger() is None:
+        return
+    threading.Thread(target=_monitor, name="repricing-ledger", daemon=True).start()
+
+
+if __name__ == '__main__':
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from app.services.event_loop import run_coroutine
+    from app.services.email_service import send_calculation_emails
+    from app.services.value_calculator import ValueCalculator
+
+    parser = argparse.ArgumentParser(description="Atualiza os cálculos do registro com os meses novos do IPCA.")
+    parser.add_argument("--reenviar-emails", action="store_true", help="Reenvia o e-mail de cada cálculo atualizado.")
+    args = parser.parse_args()
+
+    ledger = get_repricing_ledger()
+    if ledger is None:
+        raise SystemExit("REPRICING_LEDGER_PATH está vazio; registro de cálculos desativado.")
+    ledger.notify = ledger.notify or args.reenviar_emails
+    table = run_coroutine(ValueCalculator.create()).ipca_table
+    print(f"{ledger.advance(table)} cálculo(s) atualizados até {table.last_date:%m/%Y}.")
+    if args.reenviar_emails:
+        while deliveries := ledger.claim_pending_notifications():
+            errors = send_calculation_emails(deliveries)
+            print(f"{sum(error is None for error in errors)} de {len(deliveries)} e-mail(s) reenviados.")
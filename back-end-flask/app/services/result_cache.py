@@ -0,0 +1,152 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+# Subpastas criadas pelo cache: uma por versão da série do IPCA ("AAAA-MM-<hash>")
+_VERSION_DIR = re.compile(r"\d{4}-\d{2}-[0-9a-f]+")
+
+
+class ResultCache:
+    """
+    Cache de resultados endereçado pelo conteúdo do PDF (SHA-256) e pela
+    versão da série do IPCA usada no cálculo.
+
+    Mantém um LRU em memória limitado pelo tamanho total das entradas e,
+    opcionalmente, uma segunda camada em disco. Quando chega uma versão nova
+    do IPCA (um mês novo publicado), as entradas das versões anteriores são
+    descartadas nas duas camadas.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None):
+        self._max_bytes = max_bytes
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_digest(pdf_source) -> str:
+        """Calcula o SHA-256 de bytes ou de um arquivo aberto, que é rebobinado em seguida."""
+        if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(pdf_source).hexdigest()
+        digest = hashlib.file_digest(pdf_source, "sha256").hexdigest()
+        pdf_source.seek(0)
+        return digest
+
+    def get(self, digest: str, ipca_version: str) -> Optional[dict]:
+        with self._lock:
+            if not self._accept_version(ipca_version):
+                return None
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return json.loads(entry)
+
+        entry = self._read_disk(digest, ipca_version)
+        if entry is not None:
+            with self._lock:
+                if self._version == ipca_version:
+                    self._store(digest, entry)
+            return json.loads(entry)
+        return None
+
+    def put(self, digest: str, ipca_version: str, value: dict):
+        entry = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            if not self._accept_version(ipca_version):
+                return
+            self._store(digest, entry)
+        self._write_disk(digest, ipca_version, entry)
+
+    def _accept_version(self, ipca_version: str) -> bool:
+        """
+        Troca para a versão informada se ela for mais nova que a atual,
+        limpando o cache. Só o último mês (o prefixo AAAA-MM) define a ordem:
+        o hash não tem ordem, e um hash diferente no mesmo mês é uma revisão
+        do BACEN, tratada como mais nova. Versões de meses anteriores (de
+        requisições ainda em curso com a série anterior) são ignoradas.
+        Exige o lock.
+        """
+        if ipca_version == self._version:
+            return True
+        if self._version is not None and ipca_version[:7] < self._version[:7]:
+            return False
+        logging.info(f"Nova versão do IPCA ({ipca_version}); limpando o cache de resultados.")
+        self._version = ipca_version
+        self._entries.clear()
+        self._size = 0
+        self._purge_disk(ipca_version)
+        return True
+
+    def _store(self, digest: str, entry: str):
+        """Insere no LRU em memória, removendo os itens mais antigos se necessário. Exige o lock."""
+        previous = self._entries.pop(digest, None)
+        if previous is not None:
+            self._size -= len(previous)
+        if len(entry) > self._max_bytes:
+            return
+        self._entries[digest] = entry
+        self._size += len(entry)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _disk_path(self, digest: str, ipca_version: str) -> Path:
+        return self._disk_dir / ipca_version / f"{digest}.json"
+
+    def _read_disk(self, digest: str, ipca_version: str) -> Optional[str]:
+        if not self._disk_dir:
+            return None
+        try:
+            return self._disk_path(digest, ipca_version).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning(f"Falha ao ler o cache de resultados em disco: {repr(e)}")
+            return None
+
+    def _write_disk(self, digest: str, ipca_version: str, entry: str):
+        if not self._disk_dir:
+            return
+        path = self._disk_path(digest, ipca_version)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_path.write_text(entry, encoding="utf-8")
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"Falha ao gravar o cache de resultados em disco: {repr(e)}")
+
+    def _purge_disk(self, current_version: str):
+        if not self._disk_dir or not self._disk_dir.is_dir():
+            return
+        # Só remove as pastas de versão do próprio cache: RESULT_CACHE_DIR pode
+        # apontar para um diretório que também guarda outros dados.
+        for version_dir in self._disk_dir.iterdir():
+            if (version_dir.is_dir() and version_dir.name != current_version
+                    and _VERSION_DIR.fullmatch(version_dir.name)):
+                shutil.rmtree(version_dir, ignore_errors=True)
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Retorna o cache de resultados do processo, criando-o no primeiro uso."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(
+                max_bytes=int(float(os.getenv("RESULT_CACHE_MAX_MB", 16)) * 1024 * 1024),
+                disk_dir=os.getenv("RESULT_CACHE_DIR") or None
+            )
+        return _result_cache
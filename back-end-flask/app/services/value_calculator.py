@@ -1,8 +1,19 @@
 import httpx
 import asyncio
-from datetime import datetime
+from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
 import os
+import logging
+import threading
+from pathlib import Path
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+from app.services.ipca_cache import IpcaCache
+from app.services.ipca_store import IpcaStore
+from app.services.ipca_table import IpcaTable
+from app.services.ipca_shared_table import SharedIpcaTableReader
+from app.services.event_loop import get_http_client
+from app.services.metrics import stage
 
 class ValueCalculator:
     """
@@ -10,27 +21,127 @@ class ValueCalculator:
     de forma assíncrona.
     """
     IPCA_API_URL = os.getenv("IPCA_API_URL")
+    IPCA_CACHE_TTL_SECONDS = float(os.getenv("IPCA_CACHE_TTL_SECONDS", 3600))
+    IPCA_STORE_PATH = os.getenv("IPCA_STORE_PATH", str(Path(__file__).resolve().parents[2] / "data" / "ipca.sqlite3"))
+    # Definido pelo supervisor em main.py: a série vem da tabela mapeada publicada por ele
+    IPCA_SHARED_TABLE_DIR = os.getenv("IPCA_SHARED_TABLE_DIR")
 
-    def __init__(self, ipca_data: dict):
-        if not ipca_data:
+    _ipca_cache = None
+    _ipca_store = None
+    _ipca_table_memo = (None, None)
+    _shared_table_reader = None
+    _ipca_cache_lock = threading.Lock()
+
+    def __init__(self, ipca_data: Optional[dict], ipca_table: Optional[IpcaTable] = None):
+        if not ipca_data and not ipca_table:
             raise ValueError("Os dados do IPCA não podem estar vazios para inicializar a calculadora.")
-        self.ipca_data = ipca_data
+        self._ipca_data = ipca_data
+        self.ipca_table = ipca_table or IpcaTable.from_dict(ipca_data)
+
+    @property
+    def ipca_data(self) -> dict:
+        """Série {date: Decimal}; reconstruída da tabela quando a calculadora foi criada só com ela."""
+        if self._ipca_data is None:
+            self._ipca_data = self.ipca_table.to_dict()
+        return self._ipca_data
 
     @classmethod
     async def create(cls):
         """
         Cria e inicializa de forma assíncrona uma instância de ValueCalculator.
+        A série do IPCA vem do cache compartilhado do processo ou, no modo
+        multiprocesso, da tabela mapeada em memória publicada pelo supervisor.
+        """
+        reader = cls._get_shared_table_reader()
+        if reader is not None:
+            table = reader.get()
+            if table:
+                return cls(None, table)
+            logging.warning("Tabela do IPCA compartilhada indisponível; usando o cache do próprio processo.")
+
+        ipca_data = await cls._get_ipca_cache().get()
+        return cls(ipca_data, cls._get_ipca_table(ipca_data))
+
+    @classmethod
+    async def load_ipca_table(cls) -> IpcaTable:
+        """
+        Tabela do IPCA do cache do próprio processo, sem passar pela tabela
+        compartilhada. Usada pelo supervisor de main.py para publicá-la.
+        """
+        ipca_data = await cls._get_ipca_cache().get()
+        return cls._get_ipca_table(ipca_data)
+
+    @classmethod
+    def _get_shared_table_reader(cls) -> Optional[SharedIpcaTableReader]:
+        """Leitor da tabela compartilhada, ou None fora do modo multiprocesso."""
+        if cls._shared_table_reader is None and cls.IPCA_SHARED_TABLE_DIR:
+            with cls._ipca_cache_lock:
+                if cls._shared_table_reader is None:
+                    cls._shared_table_reader = SharedIpcaTableReader(Path(cls.IPCA_SHARED_TABLE_DIR))
+        return cls._shared_table_reader
+
+    @classmethod
+    def _get_ipca_table(cls, ipca_data: dict) -> IpcaTable:
+        """Reaproveita a IpcaTable enquanto o cache devolver a mesma série."""
+        source, table = cls._ipca_table_memo
+        if source is not ipca_data:
+            table = IpcaTable.from_dict(ipca_data)
+            cls._ipca_table_memo = (ipca_data, table)
+        return table
+
+    @classmethod
+    def _get_ipca_cache(cls) -> IpcaCache:
+        """Retorna o cache do IPCA do processo, criando-o no primeiro uso."""
+        with cls._ipca_cache_lock:
+            if cls._ipca_cache is None:
+                store = cls._get_ipca_store()
+                cls._ipca_cache = IpcaCache(
+                    cls._load_ipca_data,
+                    cls.IPCA_CACHE_TTL_SECONDS,
+                    initial_data=store.load() if store else None
+                )
+            return cls._ipca_cache
+
+    @classmethod
+    def _get_ipca_store(cls) -> Optional[IpcaStore]:
+        """Retorna a série local do IPCA, ou None se IPCA_STORE_PATH estiver vazio."""
+        if cls._ipca_store is None and cls.IPCA_STORE_PATH:
+            cls._ipca_store = IpcaStore(cls.IPCA_STORE_PATH)
+        return cls._ipca_store
+
+    @classmethod
+    async def _load_ipca_data(cls) -> dict:
+        """
+        Sincroniza a série local com o BACEN, baixando apenas a partir do
+        último mês armazenado, e retorna a série completa. Sem rede, retorna
+        o que já estiver salvo localmente.
         """
-        ipca_data = await cls._fetch_and_process_ipca_data()
-        return cls(ipca_data)
+        store = cls._get_ipca_store()
+        if store is None:
+            return await cls._fetch_and_process_ipca_data()
+
+        ipca_data = await asyncio.to_thread(store.load)
+        start_date = max(ipca_data) if ipca_data else None
+        new_data = await cls._fetch_and_process_ipca_data(start_date)
+        if new_data:
+            await asyncio.to_thread(store.save, new_data)
+            ipca_data.update(new_data)
+        return ipca_data
 
     @classmethod
-    async def _fetch_and_process_ipca_data(cls) -> dict:
-        """Busca os dados do IPCA da API do BACEN de forma assíncrona."""
+    async def _fetch_and_process_ipca_data(cls, start_date: Optional[date] = None) -> dict:
+        """
+        Busca os dados do IPCA da API do BACEN de forma assíncrona, pelo
+        cliente HTTP compartilhado (keep-alive). Se `start_date` for
+        informado, busca apenas os meses a partir dele.
+        """
         print("Buscando dados do IPCA de forma assíncrona...")
+        url = httpx.URL(cls.IPCA_API_URL)
+        if start_date:
+            url = url.copy_merge_params({"dataInicial": start_date.strftime('%d/%m/%Y')})
         try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.get(cls.IPCA_API_URL)
+            with stage("ipca_fetch"):
+                response = await get_http_client().get(url)
                 response.raise_for_status()
                 raw_data = response.json()
 
@@ -49,8 +160,75 @@ class ValueCalculator:
         Orquestra o cálculo e retorna um dicionário com o valor bruto
         atualizado e o valor líquido.
         """
-        updated_gross_value, last_update_date = self._calculate_updated_gross_value(gross_value, base_date_str)
+        with stage("calculate"):
+            updated_gross_value, last_update_date = self._calculate_updated_gross_value(gross_value, base_date_str)
+            return self._build_result(updated_gross_value, last_update_date, base_date_str)
+
+    def calculate_values_batch(self, items: Iterable[Tuple[float, str]]) -> List[dict]:
+        """
+        Calcula vários pares (valor bruto, data base) de uma só vez, com
+        resultados idênticos aos de `calculate_values`, na mesma ordem da
+        entrada.
+
+        As entradas são agrupadas pelo mês base e a série é percorrida uma
+        única vez, aplicando o fator de cada mês a todos os valores que já
+        estão sendo corrigidos. O custo continua proporcional a itens × meses:
+        como o valor é arredondado ao centavo a cada mês, a correção não é
+        linear e um fator acumulado por mês base não reproduziria o resultado
+        de `calculate_values`. O ganho em relação ao laço vem só de
+        interpretar cada data base uma vez e de dispensar o Decimal por item.
+        """
+        table = self.ipca_table
+        start_by_date_str = {}
+        groups = defaultdict(list)
+        results = []
+
+        for position, (gross_value, base_date_str) in enumerate(items):
+            if base_date_str not in start_by_date_str:
+                base_date = datetime.strptime(base_date_str, '%d/%m/%Y').date().replace(day=1)
+                start_by_date_str[base_date_str] = table.start_index(base_date)
+            start = start_by_date_str[base_date_str]
+            value = Decimal(str(gross_value))
+            results.append(None)
+            if start >= len(table):
+                results[position] = self._build_result(value, None, base_date_str)
+            else:
+                groups[start].append((position, value, base_date_str))
+
+        positions, negatives, cents = [], [], []
+        denominator = table.denominator
+        half = denominator // 2
+        first_start = min(groups, default=len(table))
+        for month in range(first_start, len(table)):
+            factor = table.factors[month]
+            cents = [(c * factor + half) // denominator for c in cents]
+            for position, value, base_date_str in groups.get(month, ()):
+                positions.append(position)
+                negatives.append(value.is_signed())
+                cents.append(table.apply_first_month(value, factor))
+
+        last_update_month = table.last_date.strftime('%m/%Y') if table.last_date else None
+        for position, negative, item_cents in zip(positions, negatives, cents):
+            results[position] = self._build_result_from_cents(item_cents, negative, last_update_month)
+        return results
 
+    @staticmethod
+    def _build_result_from_cents(cents: int, negative: bool, last_update_month: str) -> dict:
+        """
+        Equivalente a `_build_result` para um valor já corrigido em centavos:
+        o desconto de IR é arredondado (meio para cima) em aritmética inteira.
+        """
+        sign = -1 if negative else 1
+        net_cents = (cents * 97 + 50) // 100
+        return {
+            "valor_bruto_corrigido": sign * (cents / 100),
+            "valor_liquido_final_ir": sign * (net_cents / 100),
+            "ultimo_mes_corrigido": last_update_month
+        }
+
+    @staticmethod
+    def _build_result(updated_gross_value: Decimal, last_update_date: Optional[date], base_date_str: str) -> dict:
+        """Aplica o desconto de 3% de IR e monta o dicionário de resultado."""
         net_value = updated_gross_value * Decimal('0.97')
 
         penny = Decimal('0.01')
@@ -61,25 +239,35 @@ class ValueCalculator:
             "ultimo_mes_corrigido": last_update_date.strftime('%m/%Y') if last_update_date else base_date_str[3:]
         }
 
-    def _calculate_updated_gross_value(self, gross_value: float, base_date_str: str) -> Decimal:
+    def _calculate_updated_gross_value(self, gross_value: float, base_date_str: str) -> tuple:
+        """
+        Corrige o valor bruto mês a mês pelo IPCA, em aritmética inteira sobre
+        a IpcaTable. Produz exatamente o mesmo resultado que
+        `_calculate_updated_gross_value_decimal`.
+        """
+        current_value = Decimal(str(gross_value))
+        base_date = datetime.strptime(base_date_str, '%d/%m/%Y').date().replace(day=1)
+        return self.ipca_table.correct(current_value, base_date)
 
+    def _calculate_updated_gross_value_decimal(self, gross_value: float, base_date_str: str) -> tuple:
+        """Implementação de referência, em Decimal, da correção mês a mês."""
         current_value = Decimal(str(gross_value))
         base_date = datetime.strptime(base_date_str, '%d/%m/%Y').date().replace(day=1)
         relevant_ipca = {
-            date: value for date, value in self.ipca_data.items() if date >= base_date
+            month: value for month, value in self.ipca_data.items() if month >= base_date
         }
         if not relevant_ipca:
-            return current_value
+            return current_value, None
 
         penny = Decimal('0.01')
 
         last_update_date = None
 
-        for date, index in sorted(relevant_ipca.items()):
+        for month, index in sorted(relevant_ipca.items()):
             multiplier = Decimal('1') + (index / Decimal('100'))
             current_value *= multiplier
             current_value = current_value.quantize(penny, rounding=ROUND_HALF_UP)
-            last_update_date = date
+            last_update_date = month
         return current_value, last_update_date
 
 
@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+import threading
+from datetime import date
+from typing import Optional
+
+STATUS_PENDING = "pending"
+STATUS_WARMING_UP = "warming_up"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+IPCA_MAX_STALENESS_MONTHS = int(os.getenv("IPCA_MAX_STALENESS_MONTHS", 3))
+WARMUP_RETRY_SECONDS = float(os.getenv("IPCA_WARMUP_RETRY_SECONDS", 30))
+
+_state = {"status": STATUS_PENDING}
+_state_lock = threading.Lock()
+_started = False
+
+
+def _set_state(**fields):
+    with _state_lock:
+        _state.update(fields)
+
+
+def get_readiness() -> dict:
+    """Estado atual do aquecimento, exibido em /api/ready."""
+    with _state_lock:
+        return dict(_state)
+
+
+def mark_ready_without_warmup():
+    """Com o aquecimento desativado, a aplicação é considerada pronta desde o início."""
+    _set_state(status=STATUS_READY, warmup=False)
+
+
+def validate_ipca_series(ipca_data: dict) -> Optional[str]:
+    """
+    Confere a série do IPCA carregada: meses consecutivos e nenhuma variação
+    de -100% ou menos (que zeraria ou inverteria o valor corrigido). Não há
+    limite superior: a série 433 começa em 1980 e inclui os meses de
+    hiperinflação (ex.: 82,39% em 03/1990). Retorna a descrição do problema,
+    ou None se estiver válida. Uma série desatualizada gera apenas um aviso
+    no log.
+    """
+    months = sorted(ipca_data)
+    if not months:
+        return "Série do IPCA vazia."
+    for previous, current in zip(months, months[1:]):
+        if (current.year - previous.year) * 12 + current.month - previous.month != 1:
+            return f"Série do IPCA com lacuna entre {previous:%m/%Y} e {current:%m/%Y}."
+    for month, value in ipca_data.items():
+        if value <= -100:
+            return f"Valor do IPCA implausível em {month:%m/%Y}: {value}."
+
+    today = date.today()
+    age = (today.year - months[-1].year) * 12 + today.month - months[-1].month
+    if age > IPCA_MAX_STALENESS_MONTHS:
+        logging.warning(f"Série do IPCA desatualizada: último mês disponível é {months[-1]:%m/%Y}.")
+    return None
+
+
+def _warm_up(load_ipca: bool):
+    from app.services.event_loop import run_coroutine
+    from app.services.pdf_worker_pool import get_pdf_pool
+    from app.services.value_calculator import ValueCalculator
+
+    attempt = 0
+    while True:
+        attempt += 1
+        started_at = time.monotonic()
+        _set_state(status=STATUS_WARMING_UP, attempt=attempt)
+        try:
+            if load_ipca:
+                calculator = run_coroutine(ValueCalculator.create())
+                problem = validate_ipca_series(calculator.ipca_data)
+                table = calculator.ipca_table
+            else:
+                # O supervisor só publica a série depois de validá-la; basta esperar a publicação
+                reader = ValueCalculator._get_shared_table_reader()
+                table = reader.get() if reader else None
+                problem = None if table else "Tabela do IPCA compartilhada ainda não publicada pelo supervisor."
+            if problem is None:
+                pool = get_pdf_pool()
+                if pool is not None:
+                    pool.warm_up()
+                _set_state(
+                    status=STATUS_READY,
+                    warmup=True,
+                    error=None,
+                    ipca_last_month=table.last_date.strftime('%m/%Y'),
+                    ipca_version=table.version,
+                    warmup_seconds=round(time.monotonic() - started_at, 3)
+                )
+                logging.info(f"Aquecimento concluído em {time.monotonic() - started_at:.2f} s; aplicação pronta.")
+                return
+        except Exception as e:
+            problem = f"Falha ao carregar a série do IPCA: {repr(e)}"
+
+        logging.error(f"Aquecimento falhou (tentativa {attempt}): {problem}")
+        _set_state(status=STATUS_FAILED, error=problem)
+        time.sleep(WARMUP_RETRY_SECONDS)
+
+
+def start_warmup(load_ipca: bool = True):
+    """
+    Inicia, em segundo plano, o carregamento e a validação da série do IPCA
+    e a criação dos processos de extração de PDF. Até terminar, /api/ready
+    responde 503; em caso de falha, tenta de novo periodicamente. Com
+    `load_ipca=False` (servidores do modo multiprocesso), a série não é
+    buscada nem validada aqui: o processo espera a tabela que o supervisor
+    valida e publica.
+    """
+    global _started
+    with _state_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_warm_up, args=(load_ipca,), name="warmup", daemon=True).start()
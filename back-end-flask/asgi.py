@@ -0,0 +1,9 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app
+from app.asgi import create_asgi_app
+
+# uvicorn asgi:app --host 0.0.0.0 --port 5001
+app = create_asgi_app(create_app())
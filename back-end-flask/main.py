@@ -1,8 +1,125 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from pathlib import Path
+
 from app import create_app
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = create_app()
+# Modo multiprocesso (python main.py): um supervisor e WEB_WORKERS processos servidores
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", 5001))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS") or os.cpu_count() or 1)
+WEB_THREADS = int(os.getenv("WEB_THREADS", 8))
+IPCA_SHARED_REFRESH_SECONDS = float(os.getenv("IPCA_SHARED_REFRESH_SECONDS", 60))
+
+
+def _serve_worker(listen_socket: socket.socket, threads: int):
+    """Processo servidor: atende, com o Waitress, no socket aberto pelo supervisor."""
+    from waitress import serve
+    serve(create_app(), sockets=[listen_socket], threads=threads)
+
+
+def _publish_ipca_table(directory: Path) -> bool:
+    """
+    Carrega a série do IPCA (armazenamento local + BACEN), valida-a como no
+    aquecimento e publica a tabela para os servidores.
+    """
+    from app.services.event_loop import run_coroutine
+    from app.services.ipca_shared_table import write_shared_table
+    from app.services.value_calculator import ValueCalculator
+    from app.services.warmup import validate_ipca_series
+
+    try:
+        table = run_coroutine(ValueCalculator.load_ipca_table())
+        problem = validate_ipca_series(table.to_dict()) if table else "Série do IPCA vazia."
+        if problem:
+            logging.error(f"{problem} Tabela compartilhada não publicada.")
+            return False
+        write_shared_table(directory, table)
+        return True
+    except Exception as e:
+        logging.error(f"Falha ao publicar a tabela do IPCA compartilhada: {repr(e)}")
+        return False
+
+
+def _refresh_ipca_table(directory: Path, stop: threading.Event):
+    while not stop.wait(IPCA_SHARED_REFRESH_SECONDS):
+        _publish_ipca_table(directory)
+
+
+def _start_worker(context, listen_socket: socket.socket) -> multiprocessing.Process:
+    process = context.Process(target=_serve_worker, args=(listen_socket, WEB_THREADS), name="web-worker")
+    process.start()
+    logging.info(f"Processo servidor iniciado (pid {process.pid}).")
+    return process
+
+
+def run_multiprocess():
+    """
+    Sobe WEB_WORKERS processos, cada um com a aplicação completa, atendendo
+    no mesmo socket. Só o supervisor consulta o BACEN: ele publica a tabela
+    do IPCA em um arquivo mapeado em memória, somente leitura, que todos os
+    servidores compartilham, e a republica a cada IPCA_SHARED_REFRESH_SECONDS
+    (a busca em si segue o TTL de IPCA_CACHE_TTL_SECONDS). A validação da
+    série e o monitor do registro de cálculos também rodam só no supervisor.
+    Servidores que terminarem inesperadamente são substituídos.
+    """
+    logging.basicConfig(level=logging.INFO)
+    shared_dir = Path(tempfile.mkdtemp(prefix="ipca-table-"))
+    os.environ["IPCA_SHARED_TABLE_DIR"] = str(shared_dir)
+    os.environ["WEB_SUPERVISED_WORKER"] = "1"
+    # Divide os núcleos entre os pools de extração de PDF dos servidores
+    os.environ.setdefault("PDF_POOL_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_WORKERS)))
+
+    if not _publish_ipca_table(shared_dir):
+        logging.warning("Servidores iniciando sem a tabela compartilhada; cada um buscará o IPCA até a publicação.")
+    stop = threading.Event()
+    threading.Thread(target=_refresh_ipca_table, args=(shared_dir, stop), name="ipca-publisher", daemon=True).start()
+
+    # Um único monitor do registro de cálculos para todos os servidores
+    from app.services.repricing_ledger import start_repricing_monitor
+    start_repricing_monitor()
+
+    listen_socket = socket.create_server((WEB_HOST, WEB_PORT), backlog=1024)
+    context = multiprocessing.get_context("spawn")
+    workers = [_start_worker(context, listen_socket) for _ in range(WEB_WORKERS)]
+    logging.info(f"Servindo em http://{WEB_HOST}:{WEB_PORT} com {WEB_WORKERS} processos de {WEB_THREADS} threads.")
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            wait([worker.sentinel for worker in workers])
+            for position, worker in enumerate(workers):
+                if not worker.is_alive():
+                    logging.error(f"Processo servidor {worker.pid} terminou (código {worker.exitcode}); substituindo.")
+                    time.sleep(1)
+                    workers[position] = _start_worker(context, listen_socket)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join(10)
+        listen_socket.close()
+        shutil.rmtree(shared_dir, ignore_errors=True)
 
 
+if __name__ == "__main__":
+    run_multiprocess()
+elif __name__ != "__mp_main__":
+    # waitress-serve main:app. Processos filhos (servidores e extração de PDF)
+    # importam este arquivo como __mp_main__ e não criam a aplicação aqui.
+    app = create_app()
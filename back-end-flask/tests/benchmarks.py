@@ -0,0 +1,200 @@
+# back-end-flask/tests/benchmarks.py
+#
+# Microbenchmarks dos caminhos críticos: extração do PDF, correção pelo IPCA,
+# cálculo completo e montagem do e-mail. Uso (na pasta back-end-flask):
+#
+#     python -m tests.benchmarks --output resultados.json
+#     python -m tests.benchmarks --compare resultados.json
+#
+# Tudo roda offline: os PDFs e a série do IPCA são sintéticos e o SMTP é
+# substituído por um stub que apenas serializa a mensagem.
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import timeit
+from pathlib import Path
+from unittest import mock
+
+import pypdf
+
+from app.services import email_service
+from app.services.pdf_parser import extract_data_from_pdf
+from app.services.value_calculator import ValueCalculator
+from tests.helpers import SAMPLE_INPUT, build_ipca_series, build_synthetic_pdf
+
+PAGE_COUNTS = (1, 5, 20, 50, 100)
+YEARS_BACK = (1, 2, 5, 10, 20, 30)
+CALCULATE_LOOP_SIZE = 1000
+REFERENCE_YEAR = 2026
+
+def _measure(name: str, params: dict, func, repeat: int) -> dict:
+    """Executa `func` o bastante para ~0,2 s por rodada e resume o tempo por chamada."""
+    timer = timeit.Timer(func)
+    iterations, _ = timer.autorange()
+    samples = [elapsed / iterations for elapsed in timer.repeat(repeat=repeat, number=iterations)]
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": iterations,
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+    }
+    print(f"{name:<40} {json.dumps(params, ensure_ascii=False):<36} mediana {result['median_s'] * 1000:10.3f} ms")
+    return result
+
+
+def bench_pdf_parser(repeat: int) -> list:
+    results = []
+    for num_pages in PAGE_COUNTS:
+        pdf_bytes = build_synthetic_pdf(num_pages)
+        extracted = extract_data_from_pdf(pdf_bytes)
+        assert extracted.numero_oficio == SAMPLE_INPUT["numero_oficio"], "PDF sintético não foi lido corretamente"
+        for early_exit in (True, False):
+            results.append(_measure(
+                "extract_data_from_pdf",
+                {"pages": num_pages, "early_exit": early_exit, "bytes": len(pdf_bytes)},
+                lambda: extract_data_from_pdf(pdf_bytes, early_exit=early_exit),
+                repeat
+            ))
+    return results
+
+
+def bench_gross_value_correction(calculator: ValueCalculator, repeat: int) -> list:
+    results = []
+    for years in YEARS_BACK:
+        base_date_str = f"01/01/{REFERENCE_YEAR - years}"
+        results.append(_measure(
+            "_calculate_updated_gross_value",
+            {"years_back": years},
+            lambda: calculator._calculate_updated_gross_value(650266.04, base_date_str),
+            repeat
+        ))
+        results.append(_measure(
+            "_calculate_updated_gross_value_decimal",
+            {"years_back": years},
+            lambda: calculator._calculate_updated_gross_value_decimal(650266.04, base_date_str),
+            repeat
+        ))
+    return results
+
+
+def bench_calculate_values_loop(calculator: ValueCalculator, repeat: int) -> list:
+    rng = random.Random(2024)
+    items = [
+        (round(rng.uniform(100, 5_000_000), 2), f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1995, 2025)}")
+        for _ in range(CALCULATE_LOOP_SIZE)
+    ]
+
+    def run_loop():
+        for gross_value, base_date_str in items:
+            calculator.calculate_values(gross_value, base_date_str)
+
+    return [
+        _measure("calculate_values_loop", {"items": CALCULATE_LOOP_SIZE}, run_loop, repeat),
+        _measure("calculate_values_batch", {"items": CALCULATE_LOOP_SIZE},
+                 lambda: calculator.calculate_values_batch(items), repeat),
+    ]
+
+
+class _StubSmtpPool:
+    """Substitui o pool SMTP: serializa as mensagens, como no envio real, sem abrir conexão."""
+    username = "calculadora@example.com"
+
+    def send_messages(self, messages):
+        for _, message in messages:
+            message.as_string()
+        return [None] * len(messages)
+
+
+def bench_email_rendering(calculator: ValueCalculator, repeat: int) -> list:
+    results = calculator.calculate_values(SAMPLE_INPUT["valor_bruto"], SAMPLE_INPUT["data_base_calculo"])
+    with mock.patch.object(email_service, "_get_smtp_pool", return_value=_StubSmtpPool()):
+        return [
+            _measure(
+                "build_calculation_message",
+                {},
+                lambda: email_service.build_calculation_message(
+                    _StubSmtpPool.username, "destinatario@example.com", SAMPLE_INPUT, results
+                ),
+                repeat
+            ),
+            _measure(
+                "send_calculation_email",
+                {"smtp": "stub"},
+                lambda: email_service.send_calculation_email("destinatario@example.com", SAMPLE_INPUT, results),
+                repeat
+            ),
+        ]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(current: list, baseline_path: Path):
+    baseline = {
+        (item["name"], json.dumps(item["params"], sort_keys=True)): item
+        for item in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    }
+    print(f"\n--- Comparação com {baseline_path} (mediana atual / mediana anterior) ---")
+    for item in current:
+        previous = baseline.get((item["name"], json.dumps(item["params"], sort_keys=True)))
+        if previous:
+            ratio = item["median_s"] / previous["median_s"]
+            print(f"{item['name']:<40} {json.dumps(item['params'], ensure_ascii=False):<36} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks do parser, da calculadora e do e-mail.")
+    parser.add_argument("--output", type=Path, help="Arquivo JSON onde gravar os resultados.")
+    parser.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparação.")
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas por medição (padrão: 5).")
+    parser.add_argument("--only", choices=("pdf", "correction", "calculate", "email"), action="append",
+                        help="Executa apenas os grupos indicados; repita a opção para escolher vários.")
+    args = parser.parse_args()
+    groups = set(args.only or ("pdf", "correction", "calculate", "email"))
+
+    calculator = ValueCalculator(build_ipca_series())
+    results = []
+    if "pdf" in groups:
+        results += bench_pdf_parser(args.repeat)
+    if "correction" in groups:
+        results += bench_gross_value_correction(calculator, args.repeat)
+    if "calculate" in groups:
+        results += bench_calculate_values_loop(calculator, args.repeat)
+    if "email" in groups:
+        results += bench_email_rendering(calculator, args.repeat)
+
+    report = {
+        "metadata": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "pypdf": pypdf.__version__,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nResultados gravados em {args.output}")
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# back-end-flask/tests/helpers.py
+#
+# Geradores de dados sintéticos compartilhados pelos testes, pelos
+# microbenchmarks e pelo teste de carga: a série do IPCA e os PDFs de ofício.
+
+import io
+import random
+from datetime import date
+from decimal import Decimal
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+
+# Inflação anual aproximada do IPCA antes do Plano Real, usada para dar à série
+# sintética a mesma forma da série 433 do BACEN, que começa em 1980
+_ANNUAL_INFLATION_BEFORE_REAL = {
+    1980: 0.99, 1981: 0.95, 1982: 1.04, 1983: 1.64, 1984: 2.15, 1985: 2.42, 1986: 0.79, 1987: 3.63,
+    1988: 9.80, 1989: 19.72, 1990: 16.21, 1991: 4.72, 1992: 11.20, 1993: 24.77,
+}
+_REAL_WORLD_MONTHS = {date(1990, 3, 1): Decimal("82.39"), date(1994, 6, 1): Decimal("47.43"), date(1994, 7, 1): Decimal("6.84")}
+
+
+def build_ipca_series(seed: int = 433, last_month: date = date(2026, 12, 1)) -> dict:
+    """
+    Série sintética do IPCA no formato da série 433 do BACEN: de 01/1980 até
+    `last_month`, com a hiperinflação anterior ao Plano Real e meses de
+    deflação depois dele. Os valores a partir de 1995 dependem só de `seed`.
+    """
+    history_rng = random.Random(seed + 1980)
+    rng = random.Random(seed)
+    series = {}
+    for year in range(1980, max(last_month.year, 2026) + 1):
+        for month in range(1, 13):
+            if year < 1994:
+                monthly = ((1 + _ANNUAL_INFLATION_BEFORE_REAL[year]) ** (1 / 12) - 1) * 100
+                value = Decimal(f"{monthly * history_rng.uniform(0.7, 1.3):.2f}")
+            elif year == 1994:
+                value = Decimal(f"{history_rng.uniform(38, 47) if month < 7 else history_rng.uniform(0.5, 3.5):.2f}")
+            else:
+                value = Decimal(f"{rng.uniform(-0.6, 2.5):.2f}")
+            if date(year, month, 1) <= last_month:
+                series[date(year, month, 1)] = _REAL_WORLD_MONTHS.get(date(year, month, 1), value)
+    return series
+
+
+# Dados do ofício sintético gerado por `build_synthetic_pdf`
+SAMPLE_INPUT = {
+    "numero_oficio": "2024.23055/OFREQ",
+    "nome_beneficiario": "BENEFICIÁRIO DE TESTE",
+    "cpf_beneficiario": "12345678909",
+    "valor_bruto": 650266.04,
+    "data_base_calculo": "01/01/2024",
+}
+
+
+def _pdf_escape(text: str) -> bytes:
+    encoded = text.encode("cp1252")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _page_content(lines: list) -> bytes:
+    body = b"BT /F1 10 Tf 12 TL 50 800 Td " + b" T* ".join(b"(" + _pdf_escape(line) + b") Tj" for line in lines) + b" ET"
+    return body
+
+
+def build_pdf(pages: list) -> bytes:
+    """Gera um PDF com uma página por item de `pages`, cada um uma lista de linhas de texto."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+        NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+    }))
+    for lines in pages:
+        page = writer.add_blank_page(595, 842)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        content = DecodedStreamObject()
+        content.set_data(_page_content(lines))
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def build_synthetic_pdf(num_pages: int) -> bytes:
+    """
+    Gera um ofício sintético com `num_pages` páginas. O título fica na
+    primeira página e os campos buscados na última, de forma que a leitura
+    percorra o documento inteiro.
+    """
+    filler = [f"Linha de texto de preenchimento número {number} do requisitório." for number in range(50)]
+    pages = []
+    for page_number in range(num_pages):
+        lines = list(filler)
+        if page_number == 0:
+            lines.insert(0, "OFÍCIO REQUISITÓRIO DE PAGAMENTO DE PRECATÓRIO")
+        if page_number == num_pages - 1:
+            lines += [
+                f"Definitivo OFÍCIO Nº: {SAMPLE_INPUT['numero_oficio']}",
+                "III - BENEFICIÁRIO",
+                f"Nome: {SAMPLE_INPUT['nome_beneficiario']}",
+                "CPF: 123.456.789-09",
+                "Valor bruto da requisição: R$ 650.266,04",
+                f"Data base do cálculo: {SAMPLE_INPUT['data_base_calculo']}",
+            ]
+        pages.append(lines)
+    return build_pdf(pages)
@@ -1,66 +1,466 @@
 # back-end-flask/tests/load_test.py
+#
+# Teste de carga do endpoint /api/calculate, independente do BACEN e do
+# servidor de e-mail reais. Por padrão, o script:
+#   1. sobe um stub HTTP da API do IPCA e um "SMTP sink" locais;
+#   2. inicia o backend (Waitress) apontando para eles;
+#   3. envia uma mistura de PDFs em malha fechada (concorrência fixa) ou
+#      aberta (taxa de chegada fixa) e mede p50/p95/p99 das latências.
+#   4. separa as recusas por sobrecarga (503) em uma série própria, contada
+#      na vazão oferecida e na taxa de erro.
+#
+# Exemplos (na pasta back-end-flask):
+#   python -m tests.load_test --mode closed --concurrency 20 --requests 500
+#   python -m tests.load_test --mode open --rate 30 --duration 60
+#   python -m tests.load_test --server waitress --server uvicorn --output carga.json
+#   python -m tests.load_test --server none --url http://127.0.0.1:5001/api/calculate
 
+import argparse
 import asyncio
-import httpx
+import json
+import os
+import random
+import socket
+import socketserver
+import statistics
+import subprocess
+import sys
+import threading
 import time
+from collections import Counter, defaultdict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from tests.helpers import build_ipca_series, build_synthetic_pdf
+
+BACKEND_DIR = Path(__file__).parent.parent
+RECIPIENT_EMAIL = "teste@example.com"
+CLIENT_TIMEOUT_SECONDS = 120
+
+SERVER_COMMANDS = {
+    "waitress": lambda port, threads: [sys.executable, "-m", "waitress", f"--port={port}", f"--threads={threads}", "main:app"],
+    "uvicorn": lambda port, threads: [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"],
+}
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Acima desta fração de 503, o resultado mede a admissão, não o processamento
+REJECT_WARNING_RATE = 0.05
+
+
+# --- Stub da API do IPCA (BACEN, série 433) -------------------------------------------
+
+def _bacen_rows() -> list:
+    """Série do IPCA de 01/1980 até o mês anterior ao atual, no formato JSON do BACEN."""
+    today = date.today()
+    last_month = date(today.year - 1, 12, 1) if today.month == 1 else date(today.year, today.month - 1, 1)
+    return [
+        {"data": month.strftime("%d/%m/%Y"), "valor": str(value)}
+        for month, value in sorted(build_ipca_series(last_month=last_month).items())
+    ]
+
+
+def start_ipca_stub(latency_seconds: float) -> ThreadingHTTPServer:
+    series = _bacen_rows()
+
+    class IpcaHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency_seconds)
+            start = parse_qs(urlparse(self.path).query).get("dataInicial", [None])[0]
+            rows = series
+            if start:
+                day, month, year = (int(part) for part in start.split("/"))
+                rows = [row for row in series
+                        if (int(row["data"][6:]), int(row["data"][3:5])) >= (year, month)]
+            body = json.dumps(rows).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), IpcaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- SMTP sink ------------------------------------------------------------------------
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo (sem TLS) que aceita qualquer login e apenas conta as mensagens."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpSinkHandler)
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class _SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self._reply("220 sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-sink")
+                self._reply("250 AUTH PLAIN LOGIN")
+            elif command.startswith("AUTH LOGIN"):
+                self._reply("334 VXNlcm5hbWU6")
+                self.rfile.readline()
+                self._reply("334 UGFzc3dvcmQ6")
+                self.rfile.readline()
+                self._reply("235 Authentication successful")
+            elif command.startswith("AUTH"):
+                self._reply("235 Authentication successful")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            elif command.split(" ")[0] in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            else:
+                self._reply("502 Command not implemented")
+
+
+def start_smtp_sink() -> SmtpSink:
+    sink = SmtpSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink
+
+
+# --- Backend --------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
 
-API_URL = "http://127.0.0.1:5001/api/calculate"
-PDF_PATH = Path(__file__).parent.parent / 'Exemplo2.pdf'
 
-NUM_REQUESTS = 50  # Número total de requisições a serem feitas
-CONCURRENCY_LEVEL = 10 # Quantas requisições fazer em paralelo
+def start_backend(server: str, ipca_url: str, smtp_port: int, threads: int, result_cache: bool, admitted: int):
+    """
+    Inicia o backend em um subprocesso apontando para os stubs locais. Retorna (processo, URL).
+    Salvo se PDF_PARSE_QUEUE_SIZE ou PDF_PARSE_QUEUE_TIMEOUT_SECONDS vierem do ambiente, a
+    fila de extração comporta `admitted` requisições simultâneas e espera tanto quanto o
+    cliente, para que o teste meça o processamento e não as recusas da admissão.
+    """
+    port = _free_port()
+    env = dict(
+        os.environ,
+        PDF_PARSE_QUEUE_SIZE=os.getenv("PDF_PARSE_QUEUE_SIZE") or str(admitted),
+        PDF_PARSE_QUEUE_TIMEOUT_SECONDS=os.getenv("PDF_PARSE_QUEUE_TIMEOUT_SECONDS", str(CLIENT_TIMEOUT_SECONDS)),
+        IPCA_API_URL=ipca_url,
+        IPCA_STORE_PATH="",
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=str(smtp_port),
+        MAIL_USE_SSL="false",
+        MAIL_USERNAME="calculadora@example.com",
+        MAIL_PASSWORD="teste",
+        RESULT_CACHE_MAX_MB=os.getenv("RESULT_CACHE_MAX_MB", "16") if result_cache else "0",
+        RESULT_CACHE_DIR="",
+    )
+    process = subprocess.Popen(SERVER_COMMANDS[server](port, threads), cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}/api"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O servidor {server} terminou durante a inicialização.")
+        try:
+            # Como o healthcheck do docker-compose: pronto só com a série do IPCA validada
+            if httpx.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return process, f"{base_url}/calculate"
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"O servidor {server} não respondeu em 60 segundos.")
 
 
-async def make_request(client: httpx.AsyncClient, pdf_data: dict):
-    """Faz uma única requisição para a API e retorna se foi bem-sucedida."""
+def stop_backend(process: subprocess.Popen):
+    process.terminate()
     try:
-        response = await client.post(API_URL, files=pdf_data)
-        response.raise_for_status() # Lança um erro para status 4xx ou 5xx
-        print(f"Sucesso! Status: {response.status_code}")
-        return True
-    except Exception as e:
-        print(f"--- Falha na requisição: {type(e).__name__} ---")
-        return False
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- Fixtures -------------------------------------------------------------------------
+
+def load_fixtures(mix: str) -> list:
+    """
+    Lê a mistura no formato "nome:peso,nome:peso". Nomes são PDFs da pasta
+    back-end-flask (ex.: Exemplo1.pdf) ou "sintetico-N" (PDF gerado com N
+    páginas). Retorna uma lista de (nome, bytes, peso).
+    """
+    fixtures = []
+    for entry in mix.split(","):
+        name, _, weight = entry.strip().partition(":")
+        if name.startswith("sintetico-"):
+            pdf_bytes = build_synthetic_pdf(int(name.split("-", 1)[1]))
+        else:
+            pdf_bytes = (BACKEND_DIR / name).read_bytes()
+        fixtures.append((name, pdf_bytes, float(weight or 1)))
+    return fixtures
+
+
+# --- Geração de carga -----------------------------------------------------------------
+
+async def send_request(client: httpx.AsyncClient, api_url: str, fixture: tuple, results: list,
+                       scheduled_at: float):
+    """Envia um PDF e registra (fixture, status, latência). A latência conta a partir do horário agendado."""
+    name, pdf_bytes, _ = fixture
+    try:
+        response = await client.post(
+            api_url,
+            files={"pdf_file": (name if name.endswith(".pdf") else f"{name}.pdf", pdf_bytes, "application/pdf")},
+            data={"recipient_email": RECIPIENT_EMAIL}
+        )
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    results.append((name, status, time.monotonic() - scheduled_at))
+
+
+async def closed_loop(api_url: str, fixtures: list, concurrency: int, total_requests: int, duration: float) -> list:
+    """Malha fechada: `concurrency` clientes enviando em sequência até o total ou o tempo acabar."""
+    rng = random.Random(17)
+    weights = [weight for _, _, weight in fixtures]
+    results = []
+    remaining = [total_requests]
+    deadline = time.monotonic() + duration if duration else None
+
+    async def client_loop(client):
+        while remaining[0] > 0 and (deadline is None or time.monotonic() < deadline):
+            remaining[0] -= 1
+            fixture = rng.choices(fixtures, weights)[0]
+            await send_request(client, api_url, fixture, results, time.monotonic())
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=CLIENT_TIMEOUT_SECONDS, limits=limits) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return results
+
+
+async def open_loop(api_url: str, fixtures: list, rate: float, duration: float, max_inflight: int,
+                    poisson: bool) -> tuple:
+    """
+    Malha aberta: chegadas a `rate` req/s durante `duration` segundos,
+    independentemente das respostas. Chegadas acima de `max_inflight`
+    requisições em curso são descartadas e contadas.
+    """
+    rng = random.Random(17)
+    weights = [weight for _, _, weight in fixtures]
+    results = []
+    tasks = set()
+    dropped = 0
+    start = time.monotonic()
+    next_arrival = start
+
+    limits = httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+    async with httpx.AsyncClient(timeout=CLIENT_TIMEOUT_SECONDS, limits=limits) as client:
+        while next_arrival - start < duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+            if len(tasks) >= max_inflight:
+                dropped += 1
+            else:
+                fixture = rng.choices(fixtures, weights)[0]
+                task = asyncio.create_task(send_request(client, api_url, fixture, results, next_arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_arrival += rng.expovariate(rate) if poisson else 1 / rate
+        await asyncio.gather(*tasks)
+    return results, dropped
+
+
+# --- Relatório ------------------------------------------------------------------------
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(results: list, elapsed: float, dropped: int = 0) -> dict:
+    """
+    Latências das respostas 200 e, em série separada, das recusas 503. A vazão
+    conta só os sucessos; a vazão oferecida e a taxa de erro incluem as recusas
+    (e, na malha aberta, as chegadas descartadas).
+    """
+    latencies = sorted(latency * 1000 for _, status, latency in results if status == 200)
+    rejected = sorted(latency * 1000 for _, status, latency in results if status == 503)
+    by_fixture = defaultdict(list)
+    for name, status, latency in results:
+        if status == 200:
+            by_fixture[name].append(latency * 1000)
+
+    histogram = Counter()
+    for latency in latencies:
+        bucket = next((bound for bound in LATENCY_BUCKETS_MS if latency <= bound), "inf")
+        histogram[bucket] += 1
+
+    def stats(values: list) -> dict:
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "p50_ms": _percentile(values, 0.50),
+            "p95_ms": _percentile(values, 0.95),
+            "p99_ms": _percentile(values, 0.99),
+            "max_ms": values[-1] if values else float("nan"),
+            "mean_ms": statistics.fmean(values) if values else float("nan"),
+        }
+
+    attempts = len(results) + dropped
+    return {
+        "elapsed_s": elapsed,
+        "requests": len(results),
+        "successes": len(latencies),
+        "rejected": len(rejected),
+        "dropped": dropped,
+        "status_counts": {str(status): count for status, count in Counter(status for _, status, _ in results).items()},
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0,
+        "offered_rps": attempts / elapsed if elapsed > 0 else 0,
+        "reject_rate": len(rejected) / attempts if attempts else 0,
+        "error_rate": (attempts - len(latencies)) / attempts if attempts else 0,
+        "latency": stats(latencies),
+        "latency_rejected": stats(rejected),
+        "latency_by_fixture": {name: stats(values) for name, values in sorted(by_fixture.items())},
+        "histogram_ms": {str(bound): histogram[bound] for bound in LATENCY_BUCKETS_MS + ("inf",)},
+    }
+
+
+def print_summary(label: str, summary: dict):
+    latency = summary["latency"]
+    print("\n" + "=" * 60)
+    print(f"  Resultados: {label}")
+    print("=" * 60)
+    print(f"Tempo total: {summary['elapsed_s']:.2f} s")
+    print(f"Requisições: {summary['requests']} (sucesso: {summary['successes']}, recusadas (503): "
+          f"{summary['rejected']}, descartadas: {summary['dropped']})")
+    print(f"Status: {summary['status_counts']}")
+    print(f"Vazão (RPS): {summary['throughput_rps']:.2f} com sucesso | {summary['offered_rps']:.2f} oferecida")
+    print(f"Taxa de erro: {summary['error_rate']:.1%} (recusas: {summary['reject_rate']:.1%})")
+    print(f"Latência (ms): p50 {latency['p50_ms']:.1f} | p95 {latency['p95_ms']:.1f} | "
+          f"p99 {latency['p99_ms']:.1f} | máx {latency['max_ms']:.1f}")
+    if summary["rejected"]:
+        rejected = summary["latency_rejected"]
+        print(f"Latência das recusas (ms): p50 {rejected['p50_ms']:.1f} | p95 {rejected['p95_ms']:.1f} | "
+              f"p99 {rejected['p99_ms']:.1f} | máx {rejected['max_ms']:.1f}")
+    if summary["reject_rate"] > REJECT_WARNING_RATE:
+        print(f"AVISO: {summary['reject_rate']:.1%} das requisições foram recusadas com 503; as latências acima "
+              f"medem só as admitidas. Aumente PDF_PARSE_QUEUE_SIZE ou reduza a concorrência.")
+
+    print("\nHistograma de latência (ms):")
+    largest = max(summary["histogram_ms"].values()) or 1
+    for bound, count in summary["histogram_ms"].items():
+        print(f"  <= {bound:>6} | {'#' * round(40 * count / largest):<40} {count}")
+
+    print("\nPor fixture:")
+    for name, stats in summary["latency_by_fixture"].items():
+        print(f"  {name:<16} n={stats['count']:<5} p50 {stats['p50_ms']:8.1f} | p95 {stats['p95_ms']:8.1f} | "
+              f"p99 {stats['p99_ms']:8.1f}")
+
 
-async def run_test():
-    """Orquestra o teste de carga, controlando a concorrência."""
-    print(f"--- Iniciando teste de carga com concorrência de {CONCURRENCY_LEVEL} (total de {NUM_REQUESTS} reqs) ---")
+async def run_target(label: str, api_url: str, fixtures: list, args) -> dict:
+    print(f"\n--- {label}: aquecimento com {args.warmup} requisições ---")
+    await closed_loop(api_url, fixtures, 1, args.warmup, 0)
 
-    if not PDF_PATH.exists():
-        print(f"ERRO: Arquivo PDF de teste não encontrado em '{PDF_PATH}'")
-        return
+    print(f"--- {label}: malha {'fechada' if args.mode == 'closed' else 'aberta'} ---")
+    started_at = time.monotonic()
+    if args.mode == "closed":
+        total_requests = sys.maxsize if args.duration else args.requests
+        results = await closed_loop(api_url, fixtures, args.concurrency, total_requests, args.duration)
+        dropped = 0
+    else:
+        results, dropped = await open_loop(api_url, fixtures, args.rate, args.duration or 30,
+                                           args.max_inflight, args.poisson)
+    summary = summarize(results, time.monotonic() - started_at, dropped)
+    print_summary(label, summary)
+    return summary
 
-    with open(PDF_PATH, "rb") as f:
-        pdf_bytes = f.read()
 
-    files_payload = {"pdf_file": (PDF_PATH.name, pdf_bytes, "application/pdf")}
+async def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do endpoint /api/calculate.")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed",
+                        help="closed: concorrência fixa; open: taxa de chegada fixa.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Clientes simultâneos (malha fechada).")
+    parser.add_argument("--requests", type=int, default=200, help="Total de requisições (malha fechada).")
+    parser.add_argument("--rate", type=float, default=20, help="Chegadas por segundo (malha aberta).")
+    parser.add_argument("--poisson", action="store_true", help="Intervalos exponenciais entre chegadas (malha aberta).")
+    parser.add_argument("--max-inflight", type=int, default=200, help="Limite de requisições em curso (malha aberta).")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Duração em segundos (malha aberta: padrão 30; malha fechada: substitui --requests).")
+    parser.add_argument("--warmup", type=int, default=5, help="Requisições de aquecimento, fora das estatísticas.")
+    parser.add_argument("--mix", default="Exemplo1.pdf:1,Exemplo2.pdf:1,sintetico-5:1,sintetico-20:1",
+                        help="Mistura de PDFs com pesos, ex.: 'Exemplo1.pdf:3,sintetico-50:1'.")
+    parser.add_argument("--server", action="append", choices=tuple(SERVER_COMMANDS) + ("none",),
+                        help="Servidor iniciado pelo teste (padrão: waitress); repita para comparar. "
+                             "Use 'none' com --url para testar um backend já em execução.")
+    parser.add_argument("--url", action="append", dest="urls", default=[],
+                        help="Endpoint externo a testar (com --server none); pode ser repetido.")
+    parser.add_argument("--threads", type=int, default=16, help="Threads do Waitress iniciado pelo teste.")
+    parser.add_argument("--ipca-latency", type=float, default=0.2, help="Latência simulada do stub do IPCA (s).")
+    parser.add_argument("--result-cache", action="store_true",
+                        help="Mantém o cache de resultados do backend (por padrão desativado para medir o fluxo completo).")
+    parser.add_argument("--output", type=Path, help="Grava os resultados em JSON.")
+    args = parser.parse_args()
 
-    overall_start_time = time.monotonic()
+    fixtures = load_fixtures(args.mix)
+    ipca_stub = start_ipca_stub(args.ipca_latency)
+    smtp_sink = start_smtp_sink()
+    ipca_url = f"http://127.0.0.1:{ipca_stub.server_address[1]}/dados?formato=json"
+    print(f"Stub do IPCA: {ipca_url}")
+    print(f"SMTP sink: 127.0.0.1:{smtp_sink.server_address[1]} (sem TLS; use MAIL_USE_SSL=false)")
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        # Cria uma lista de "tarefas" a serem executadas
-        tasks = [make_request(client, files_payload) for _ in range(NUM_REQUESTS)]
+    servers = args.server or (["none"] if args.urls else ["waitress"])
+    report = {}
+    for server in servers:
+        if server == "none":
+            for api_url in args.urls:
+                report[api_url] = await run_target(api_url, api_url, fixtures, args)
+            continue
+        admitted = args.concurrency if args.mode == "closed" else args.max_inflight
+        process, api_url = start_backend(server, ipca_url, smtp_sink.server_address[1], args.threads,
+                                         args.result_cache, admitted)
+        try:
+            report[server] = await run_target(server, api_url, fixtures, args)
+        finally:
+            stop_backend(process)
 
-        results = await asyncio.gather(*tasks)
+    print(f"\nE-mails recebidos pelo SMTP sink: {smtp_sink.messages}")
+    if len(report) > 1:
+        print("\n      Comparativo")
+        for label, summary in report.items():
+            print(f"{label}: {summary['throughput_rps']:.2f} RPS | p95 {summary['latency']['p95_ms']:.1f} ms | "
+                  f"p99 {summary['latency']['p99_ms']:.1f} ms | recusas {summary['reject_rate']:.1%}")
 
-    overall_end_time = time.monotonic()
-    total_time = overall_end_time - overall_start_time
+    if args.output:
+        args.output.write_text(json.dumps({"args": vars(args) | {"output": str(args.output)}, "results": report},
+                                          ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        print(f"Resultados gravados em {args.output}")
 
-    success_count = sum(1 for r in results if r)
-    failure_count = NUM_REQUESTS - success_count
+    ipca_stub.shutdown()
+    smtp_sink.shutdown()
 
-    print("\n" + "="*30)
-    print("      Resultados do Teste")
-    print("="*30)
-    print(f"Tempo total: {total_time:.2f} segundos")
-    print(f"Total de requisições: {NUM_REQUESTS}")
-    print(f"Requisições bem-sucedidas: {success_count}")
-    print(f"Requisições com falha: {failure_count}")
-    if total_time > 0:
-        rps = success_count / total_time
-        print(f"Requisições por segundo (RPS): {rps:.2f}")
-    print("="*30)
 
 if __name__ == "__main__":
-    asyncio.run(run_test())
\ No newline at end of file
+    asyncio.run(main())
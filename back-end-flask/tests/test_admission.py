@@ -0,0 +1,150 @@
+import asyncio
+import contextvars
+import threading
+import time
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from app.api.main_routes import api_bp
+from app.services import admission
+from app.services.admission import ServerBusyError, StageLimiter
+from app.services.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTS
+
+
+def _rejects(stage: str, reason: str) -> float:
+    return ADMISSION_REJECTS._values.get((stage, reason), 0)
+
+
+def _use_slot(limiter: StageLimiter):
+    with limiter.slot():
+        pass
+
+
+def _run_fail_fast(func, *args):
+    """Executa `func` em um contexto separado, marcado com `fail_fast`, como uma requisição síncrona."""
+    def run():
+        admission.fail_fast()
+        return func(*args)
+    return contextvars.copy_context().run(run)
+
+
+class StageLimiterTest(unittest.TestCase):
+
+    def _hold_slot(self, limiter: StageLimiter):
+        """Ocupa uma vaga do limitador em outra thread até `release` ser sinalizado."""
+        acquired, release = threading.Event(), threading.Event()
+
+        def hold():
+            with limiter.slot():
+                acquired.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        acquired.wait(5)
+        return release, thread
+
+    def _wait_for_waiters(self, limiter: StageLimiter, count: int):
+        deadline = time.monotonic() + 5
+        while limiter._waiting < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(limiter._waiting, count)
+
+    def test_acquires_up_to_the_limit_without_waiting(self):
+        limiter = StageLimiter("teste_vagas", limit=2, max_waiting=0, wait_timeout=0)
+        with limiter.slot(), limiter.slot():
+            self.assertEqual(limiter._waiting, 0)
+
+    def test_fail_fast_request_waits_for_a_released_slot(self):
+        limiter = StageLimiter("teste_espera", limit=1, max_waiting=1, wait_timeout=5)
+        release, holder = self._hold_slot(limiter)
+        threading.Timer(0.2, release.set).start()
+
+        started_at = time.monotonic()
+        _run_fail_fast(_use_slot, limiter)
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.15)
+        holder.join()
+        self.assertEqual(ADMISSION_QUEUE_DEPTH._values[("teste_espera",)], 0)
+
+    def test_fail_fast_request_is_rejected_when_queue_is_full(self):
+        limiter = StageLimiter("teste_fila", limit=1, max_waiting=1, wait_timeout=5)
+        release, holder = self._hold_slot(limiter)
+        waiter = threading.Thread(target=_run_fail_fast, args=(_use_slot, limiter))
+        waiter.start()
+        self._wait_for_waiters(limiter, 1)
+
+        with self.assertRaises(ServerBusyError) as raised:
+            _run_fail_fast(_use_slot, limiter)
+        self.assertEqual((raised.exception.stage, raised.exception.reason), ("teste_fila", "queue_full"))
+        self.assertEqual(_rejects("teste_fila", "queue_full"), 1)
+        release.set()
+        holder.join()
+        waiter.join()
+
+    def test_fail_fast_request_is_rejected_after_timeout(self):
+        limiter = StageLimiter("teste_timeout", limit=1, max_waiting=5, wait_timeout=0.1)
+        release, holder = self._hold_slot(limiter)
+        with self.assertRaises(ServerBusyError) as raised:
+            _run_fail_fast(_use_slot, limiter)
+        self.assertEqual(raised.exception.reason, "timeout")
+        self.assertEqual(limiter._waiting, 0)
+        release.set()
+        holder.join()
+
+    def test_request_without_fail_fast_waits_beyond_queue_and_timeout(self):
+        limiter = StageLimiter("teste_sem_fail_fast", limit=1, max_waiting=0, wait_timeout=0.01)
+        release, holder = self._hold_slot(limiter)
+        threading.Timer(0.2, release.set).start()
+        with limiter.slot():
+            pass
+        holder.join()
+        self.assertEqual(_rejects("teste_sem_fail_fast", "queue_full") + _rejects("teste_sem_fail_fast", "timeout"), 0)
+
+    def test_slot_is_released_when_block_raises(self):
+        limiter = StageLimiter("teste_erro", limit=1, max_waiting=0, wait_timeout=0)
+        with self.assertRaises(ValueError):
+            with limiter.slot():
+                raise ValueError()
+        with limiter.slot():
+            pass
+
+
+class FailFastContextTest(unittest.TestCase):
+
+    def test_flag_does_not_leak_out_of_the_request_context(self):
+        self.assertTrue(contextvars.copy_context().run(lambda: (admission.fail_fast(), admission._fail_fast.get())[1]))
+        self.assertFalse(admission._fail_fast.get())
+
+    def test_flag_reaches_threads_and_coroutines_started_by_the_request(self):
+        async def in_coroutine():
+            return await asyncio.to_thread(admission._fail_fast.get)
+
+        def request():
+            admission.fail_fast()
+            return asyncio.run(in_coroutine())
+
+        self.assertTrue(contextvars.copy_context().run(request))
+
+
+class ServerBusyResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(api_bp)
+        self.client = app.test_client()
+
+    def test_full_email_queue_answers_503_with_retry_after(self):
+        with mock.patch("app.services.email_queue.EmailDeliveryQueue.is_full", return_value=True):
+            response = self.client.post("/api/calculate", data={
+                "pdf_file": (open(__file__, "rb"), "documento.pdf"),
+                "recipient_email": "destinatario@example.com",
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], str(admission.ADMISSION_RETRY_AFTER_SECONDS))
+        self.assertIn("error", response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
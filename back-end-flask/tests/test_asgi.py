@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from flask import Flask, Response
+
+from app.asgi import AsgiApp
+
+
+def _scope(path: str, headers=()) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": list(headers), "server": ("testserver", 80), "client": ("127.0.0.1", 50000),
+    }
+
+
+async def _call(app: AsgiApp, path: str, headers=()) -> tuple:
+    """Executa uma requisição no adaptador e devolve (status, corpo)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(_scope(path, headers), receive, send)
+    status = next(message["status"] for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return status, body
+
+
+class AsgiAdapterTest(unittest.TestCase):
+    """Cobre os internos do asgiref usados por `_ThreadedWsgiInstance`."""
+
+    def setUp(self):
+        flask_app = Flask(__name__)
+        self.threads = set()
+        self.closed = threading.Event()
+
+        @flask_app.route("/lento")
+        def slow():
+            self.threads.add(threading.current_thread().name)
+            time.sleep(0.3)
+            return "pronto"
+
+        @flask_app.route("/streaming")
+        def streaming():
+            return Response((f"parte {number};" for number in range(3)), mimetype="text/plain")
+
+        @flask_app.teardown_request
+        def teardown(e):
+            self.closed.set()
+
+        self.app = AsgiApp(flask_app, threads=4)
+        self.addCleanup(self.app._executor.shutdown)
+
+    def test_response_is_forwarded_and_wsgi_response_is_closed(self):
+        self.assertEqual(asyncio.run(_call(self.app, "/lento")), (200, b"pronto"))
+        self.assertTrue(self.closed.is_set())
+
+    def test_requests_run_in_parallel_threads(self):
+        async def run_concurrently():
+            return await asyncio.gather(*(_call(self.app, "/lento") for _ in range(3)))
+
+        started_at = time.monotonic()
+        results = asyncio.run(run_concurrently())
+        self.assertLess(time.monotonic() - started_at, 0.8)
+        self.assertEqual(results, [(200, b"pronto")] * 3)
+        self.assertEqual(len(self.threads), 3)
+
+    def test_streamed_response_is_forwarded_in_order(self):
+        self.assertEqual(asyncio.run(_call(self.app, "/streaming")), (200, b"parte 0;parte 1;parte 2;"))
+
+    def test_too_many_duplicate_headers_are_rejected(self):
+        headers = [(b"x-repetido", b"1")] * (self.app.duplicate_header_limit + 1)
+        status, _ = asyncio.run(_call(self.app, "/lento", headers))
+        self.assertEqual(status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
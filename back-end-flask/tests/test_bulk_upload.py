@@ -0,0 +1,65 @@
+import io
+import unittest
+import zipfile
+from unittest import mock
+
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+from app.api import main_routes
+from app.api.main_routes import BulkLimitExceeded, _collect_bulk_pdfs
+
+
+def _zip(entries: dict) -> FileStorage:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return FileStorage(io.BytesIO(buffer.getvalue()), filename="lote.zip")
+
+
+def _corrupt_second_entry(upload: FileStorage, offset: int, value: int) -> FileStorage:
+    """Altera um byte do cabeçalho da segunda entrada no diretório central do ZIP."""
+    data = bytearray(upload.stream.getvalue())
+    first = data.find(b"PK\x01\x02")
+    second = data.find(b"PK\x01\x02", first + 4)
+    data[second + offset] = value
+    return FileStorage(io.BytesIO(bytes(data)), filename="lote.zip")
+
+
+class CollectBulkPdfsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
+        self.context = self.app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        self.context.pop()
+
+    def test_unreadable_entries_become_error_results(self):
+        upload = _zip({"bom.pdf": b"%PDF bom", "ruim.pdf": b"%PDF ruim"})
+        for name, offset, value in (("criptografado", 8, 1), ("compressão desconhecida", 10, 99)):
+            with self.subTest(name):
+                documents, failures = _collect_bulk_pdfs([_corrupt_second_entry(upload, offset, value)])
+                self.assertEqual(documents, [("bom.pdf", b"%PDF bom")])
+                self.assertEqual([(failure["file"], failure["status"]) for failure in failures], [("ruim.pdf", "error")])
+
+    def test_total_decompressed_size_is_bounded_by_upload_limit(self):
+        upload = _zip({f"d{number}.pdf": b"\0" * (400 * 1024) for number in range(3)})
+        self.assertLess(len(upload.stream.getvalue()), 10 * 1024)
+        with self.assertRaises(BulkLimitExceeded):
+            _collect_bulk_pdfs([upload])
+
+    def test_file_count_is_checked_before_decompressing(self):
+        upload = _zip({f"d{number}.pdf": b"%PDF" for number in range(5)})
+        with mock.patch.object(main_routes, "BULK_MAX_FILES", 3), \
+                mock.patch.object(zipfile.ZipFile, "read", return_value=b"%PDF") as read:
+            with self.assertRaises(BulkLimitExceeded):
+                _collect_bulk_pdfs([upload])
+        self.assertEqual(read.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import io
+import unittest
+
+from app.services.csv_repricing import CsvRepricing, CsvFormatError
+from app.services.value_calculator import ValueCalculator
+from tests.helpers import build_ipca_series
+
+
+class CsvRepricingTest(unittest.TestCase):
+    """Garante que a correção em blocos do CSV dá o mesmo resultado de `calculate_values`."""
+
+    def setUp(self):
+        self.calculator = ValueCalculator(build_ipca_series())
+
+    def _run(self, text: str, chunk_rows: int = 2) -> list:
+        repricing = CsvRepricing(io.StringIO(text), chunk_rows)
+        output = "".join(repricing.iter_csv(self.calculator))
+        return [line.split(repricing.delimiter) for line in output.splitlines()]
+
+    def test_rows_match_single_calculation(self):
+        rows = self._run(
+            "numero_oficio,valor_bruto,data_base_calculo,cpf\n"
+            "1,650266.04,01/01/2024,123\n"
+            "2,1500.5,15/07/2010,456\n"
+            "3,99.995,01/01/1995,789\n"
+        )
+        self.assertEqual(len(rows), 4)
+        for row in rows[1:]:
+            expected = self.calculator.calculate_values(float(row[1]), row[2])
+            self.assertEqual(float(row[4]), expected["valor_bruto_corrigido"])
+            self.assertEqual(float(row[5]), expected["valor_liquido_final_ir"])
+            self.assertEqual(row[6:8], [expected["ultimo_mes_corrigido"], "ok"])
+
+    def test_invalid_rows_are_reported_in_place(self):
+        rows = self._run(
+            "numero_oficio;valor_bruto;data_base_calculo;cpf\n"
+            "1;abc;01/01/2020;1\n"
+            "2;R$ 650.266,04;01/01/2024;2\n"
+            "3;100;2020-01-01;3\n"
+            "4;;01/01/2020;4\n"
+        )
+        self.assertEqual([row[7] for row in rows[1:]], ["erro", "ok", "erro", "erro"])
+        self.assertEqual(float(rows[2][4]), self.calculator.calculate_values(650266.04, "01/01/2024")["valor_bruto_corrigido"])
+
+    def test_ambiguous_amounts_are_rejected_per_row(self):
+        rows = self._run(
+            "numero_oficio;valor_bruto;data_base_calculo;cpf\n"
+            "1;1,234.56;01/01/2020;1\n"
+            "2;1,234;01/01/2020;2\n"
+            "3;1.23,45;01/01/2020;3\n"
+            "4;1234,5;01/01/2020;4\n"
+            "5;R$ 1.234,56;01/01/2020;5\n"
+            "6;1234.567;01/01/2020;6\n"
+        )
+        self.assertEqual([row[7] for row in rows[1:]], ["erro", "erro", "erro", "ok", "ok", "ok"])
+        self.assertIn("ambíguo", rows[1][8])
+        for row, amount in zip(rows[4:], (1234.5, 1234.56, 1234.567)):
+            expected = self.calculator.calculate_values(amount, "01/01/2020")["valor_bruto_corrigido"]
+            self.assertEqual(float(row[4]), expected)
+
+    def test_missing_columns(self):
+        with self.assertRaises(CsvFormatError):
+            CsvRepricing(io.StringIO("numero_oficio,valor_bruto\n1,2\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
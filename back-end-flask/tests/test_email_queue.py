@@ -0,0 +1,95 @@
+import smtplib
+import unittest
+from unittest import mock
+
+from app.services import email_queue
+from app.services.email_queue import EmailDeliveryQueue, STATUS_FAILED, STATUS_QUEUED, STATUS_SENT
+
+RESULTS = {"valor_bruto_corrigido": 1000.0}
+
+
+class EmailDeliveryQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outcomes = []
+        self.history = []
+        self.sleep = mock.patch.object(email_queue.time, "sleep").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _send(self, deliveries):
+        """Envio falso: devolve o próximo resultado de `outcomes` e guarda o status visto a cada tentativa."""
+        self.history.append(self.queue.get_status(self.email_id))
+        return [self.outcomes.pop(0) for _ in deliveries]
+
+    def _deliver_one(self, *outcomes, max_attempts: int = 3) -> dict:
+        """Enfileira um envio sem workers e o processa na thread do teste."""
+        self.outcomes = list(outcomes)
+        self.queue = EmailDeliveryQueue(self._send, workers=0, max_attempts=max_attempts, backoff_seconds=2)
+        self.email_id = self.queue.submit("destinatario@example.com", {}, RESULTS)["id"]
+        self.queue._deliver([self.queue._queue.get_nowait()])
+        return self.queue.get_status(self.email_id)
+
+    def _backoffs(self) -> list:
+        return [call.args[0] for call in self.sleep.call_args_list]
+
+    def test_full_queue_fails_new_deliveries_immediately(self):
+        queue = EmailDeliveryQueue(self._send, max_size=2, workers=0)
+        accepted = [queue.submit(f"destinatario{number}@example.com", {}, RESULTS) for number in range(2)]
+        self.assertTrue(queue.is_full())
+
+        rejected = queue.submit("excedente@example.com", {}, RESULTS)
+        self.assertEqual([status["status"] for status in accepted], [STATUS_QUEUED, STATUS_QUEUED])
+        self.assertEqual(rejected["status"], STATUS_FAILED)
+        self.assertEqual(rejected["error"], "Fila de envio de e-mails cheia.")
+        self.assertEqual(queue._queue.qsize(), 2)
+
+    def test_temporary_errors_are_retried_with_growing_backoff(self):
+        error = smtplib.SMTPServerDisconnected("conexão perdida")
+        final = self._deliver_one(error, error, None)
+
+        self.assertEqual(self._backoffs(), [2, 4])
+        self.assertEqual(
+            [(status["status"], status["attempts"], status["error"]) for status in self.history],
+            [(STATUS_QUEUED, 0, None), (STATUS_QUEUED, 1, repr(error)), (STATUS_QUEUED, 2, repr(error))]
+        )
+        self.assertEqual((final["status"], final["attempts"]), (STATUS_SENT, 3))
+
+    def test_last_attempt_marks_delivery_as_failed(self):
+        error = smtplib.SMTPResponseException(421, b"servico indisponivel")
+        final = self._deliver_one(error, error, error)
+
+        self.assertEqual(self._backoffs(), [2, 4])
+        self.assertEqual((final["status"], final["attempts"], final["error"]), (STATUS_FAILED, 3, repr(error)))
+
+    def test_permanent_errors_are_not_retried(self):
+        permanent = (
+            smtplib.SMTPRecipientsRefused({"destinatario@example.com": (550, b"caixa inexistente")}),
+            smtplib.SMTPDataError(554, b"mensagem recusada"),
+            smtplib.SMTPSenderRefused(553, b"remetente recusado", "calculadora@example.com"),
+            smtplib.SMTPAuthenticationError(535, b"credenciais invalidas"),
+            ValueError("Credenciais de e-mail não configuradas nas variáveis de ambiente."),
+        )
+        for error in permanent:
+            with self.subTest(error=type(error).__name__):
+                self.sleep.reset_mock()
+                final = self._deliver_one(error)
+                self.assertEqual((final["status"], final["attempts"]), (STATUS_FAILED, 1))
+                self.sleep.assert_not_called()
+
+    def test_temporary_recipient_refusal_is_retried(self):
+        greylisted = smtplib.SMTPRecipientsRefused({"destinatario@example.com": (450, b"tente mais tarde")})
+        final = self._deliver_one(greylisted, None)
+        self.assertEqual((final["status"], final["attempts"]), (STATUS_SENT, 2))
+        self.assertEqual(self._backoffs(), [2])
+
+    def test_worker_delivers_queued_messages(self):
+        sent = []
+        queue = EmailDeliveryQueue(lambda deliveries: sent.extend(deliveries) or [None] * len(deliveries), workers=1)
+        email_id = queue.submit("destinatario@example.com", {}, RESULTS)["id"]
+        queue._queue.join()
+        self.assertEqual(queue.get_status(email_id)["status"], STATUS_SENT)
+        self.assertEqual(sent, [("destinatario@example.com", {}, RESULTS)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+from app.services import value_calculator
+from app.services.event_loop import run_coroutine
+from app.services.ipca_cache import IpcaCache
+from app.services.ipca_store import IpcaStore
+from app.services.value_calculator import ValueCalculator
+
+OLD_DATA = {date(2026, 7, 1): Decimal("0.26")}
+NEW_DATA = {date(2026, 7, 1): Decimal("0.26"), date(2026, 8, 1): Decimal("0.11")}
+
+
+class FakeFetcher:
+    """Busca falsa do BACEN: conta as chamadas e só termina quando `release` é sinalizado."""
+
+    def __init__(self, result=NEW_DATA, error: Exception = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        self.started.set()
+        await asyncio.to_thread(self.release.wait, 5)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def _get_concurrently(cache: IpcaCache, callers: int) -> list:
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        return list(executor.map(lambda _: run_coroutine(cache.get()), range(callers)))
+
+
+def _wait_refresh(cache: IpcaCache):
+    inflight = cache._inflight
+    if inflight is not None:
+        inflight.result(5)
+
+
+class IpcaCacheTest(unittest.TestCase):
+
+    def test_first_load_waits_for_a_single_fetch(self):
+        fetcher = FakeFetcher()
+        cache = IpcaCache(fetcher, ttl_seconds=3600)
+        threading.Timer(0.2, fetcher.release.set).start()
+
+        started_at = time.monotonic()
+        results = _get_concurrently(cache, 8)
+
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.15)
+        self.assertEqual(results, [NEW_DATA] * 8)
+        self.assertEqual(fetcher.calls, 1)
+
+    def test_stale_data_is_served_while_one_refresh_runs(self):
+        fetcher = FakeFetcher()
+        cache = IpcaCache(fetcher, ttl_seconds=3600, initial_data=OLD_DATA)
+
+        self.assertEqual(_get_concurrently(cache, 8), [OLD_DATA] * 8)
+        self.assertTrue(fetcher.started.wait(5))
+        self.assertEqual(fetcher.calls, 1)
+
+        fetcher.release.set()
+        _wait_refresh(cache)
+        self.assertEqual(run_coroutine(cache.get()), NEW_DATA)
+        self.assertEqual(fetcher.calls, 1)
+
+    def test_failed_refresh_keeps_old_data_until_retry_interval(self):
+        for fetcher in (FakeFetcher(error=httpx.ConnectError("sem rede")), FakeFetcher(result={})):
+            with self.subTest(error=fetcher.error):
+                fetcher.release.set()
+                cache = IpcaCache(fetcher, ttl_seconds=3600, retry_seconds=30, initial_data=OLD_DATA)
+                self.assertEqual(run_coroutine(cache.get()), OLD_DATA)
+                _wait_refresh(cache)
+
+                # Dados antigos servidos sem nova busca até o fim do intervalo de retentativa
+                self.assertEqual(run_coroutine(cache.get()), OLD_DATA)
+                self.assertEqual(fetcher.calls, 1)
+                expires_in = cache._loaded_at + 3600 - time.monotonic()
+                self.assertTrue(29 < expires_in <= 30, expires_in)
+
+                cache._loaded_at -= 30
+                run_coroutine(cache.get())
+                _wait_refresh(cache)
+                self.assertEqual(fetcher.calls, 2)
+
+    def test_invalidate_forces_a_new_fetch(self):
+        fetcher = FakeFetcher()
+        fetcher.release.set()
+        cache = IpcaCache(fetcher, ttl_seconds=3600)
+        run_coroutine(cache.get())
+        cache.invalidate()
+        run_coroutine(cache.get())
+        _wait_refresh(cache)
+        self.assertEqual(fetcher.calls, 2)
+
+
+class IpcaStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "dados" / "ipca.sqlite3"
+        self.store = IpcaStore(str(self.path))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_empty_store(self):
+        self.assertEqual(self.store.load(), {})
+        self.assertIsNone(self.store.last_date())
+
+    def test_save_and_load_keep_exact_values(self):
+        self.store.save({date(2026, 8, 1): Decimal("0.11"), date(1990, 3, 1): Decimal("82.39")})
+        self.store.save({date(2026, 8, 1): Decimal("0.12"), date(2026, 9, 1): Decimal("-0.0500")})
+
+        self.assertEqual(self.store.load(), {
+            date(1990, 3, 1): Decimal("82.39"),
+            date(2026, 8, 1): Decimal("0.12"),
+            date(2026, 9, 1): Decimal("-0.0500"),
+        })
+        self.assertEqual(str(self.store.load()[date(2026, 9, 1)]), "-0.0500")
+        self.assertEqual(self.store.last_date(), date(2026, 9, 1))
+
+    def test_unreadable_file_loads_as_empty(self):
+        self.path.write_bytes(b"nao e um banco sqlite" * 100)
+        self.assertEqual(self.store.load(), {})
+
+
+class IpcaDeltaSyncTest(unittest.TestCase):
+    """`_load_ipca_data` busca no BACEN apenas a partir do último mês salvo."""
+
+    API_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.433/dados?formato=json"
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = IpcaStore(str(Path(self.temp_dir.name) / "ipca.sqlite3"))
+        self.requested = []
+        self.response_rows = []
+        self.fetch_error = None
+        mock.patch.object(ValueCalculator, "IPCA_API_URL", self.API_URL).start()
+        mock.patch.object(value_calculator, "get_http_client", return_value=self).start()
+        self.addCleanup(mock.patch.stopall)
+        self.addCleanup(self.temp_dir.cleanup)
+
+    async def get(self, url):
+        """Cliente HTTP falso: guarda a URL e devolve `response_rows` no formato do BACEN."""
+        self.requested.append(url)
+        if self.fetch_error:
+            raise self.fetch_error
+        return httpx.Response(200, json=self.response_rows, request=httpx.Request("GET", url))
+
+    def _load(self, store) -> dict:
+        with mock.patch.object(ValueCalculator, "_ipca_store", store):
+            return asyncio.run(ValueCalculator._load_ipca_data())
+
+    def test_only_months_after_the_stored_ones_are_requested(self):
+        self.store.save({date(2026, 6, 1): Decimal("0.24"), date(2026, 7, 1): Decimal("0.26")})
+        self.response_rows = [{"data": "01/07/2026", "valor": "0.26"}, {"data": "01/08/2026", "valor": "0.11"}]
+
+        ipca_data = self._load(self.store)
+
+        self.assertEqual(len(self.requested), 1)
+        self.assertEqual(self.requested[0].params["dataInicial"], "01/07/2026")
+        self.assertEqual(self.requested[0].params["formato"], "json")
+        self.assertEqual(ipca_data, {
+            date(2026, 6, 1): Decimal("0.24"), date(2026, 7, 1): Decimal("0.26"), date(2026, 8, 1): Decimal("0.11"),
+        })
+        self.assertEqual(self.store.load(), ipca_data)
+
+    def test_empty_store_downloads_the_whole_series(self):
+        self.response_rows = [{"data": "01/01/1980", "valor": "6.62"}]
+        self.assertEqual(self._load(self.store), {date(1980, 1, 1): Decimal("6.62")})
+        self.assertNotIn("dataInicial", self.requested[0].params)
+
+    def test_without_network_the_stored_series_is_returned(self):
+        self.store.save({date(2026, 7, 1): Decimal("0.26")})
+        self.fetch_error = httpx.ConnectError("sem rede")
+        self.assertEqual(self._load(self.store), {date(2026, 7, 1): Decimal("0.26")})
+
+    def test_without_store_the_whole_series_is_downloaded(self):
+        self.response_rows = [{"data": "01/08/2026", "valor": "0.11"}]
+        with mock.patch.object(ValueCalculator, "IPCA_STORE_PATH", ""):
+            self.assertEqual(self._load(None), {date(2026, 8, 1): Decimal("0.11")})
+        self.assertNotIn("dataInicial", self.requested[0].params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import tempfile
+import threading
+import unittest
+from datetime import date
+from pathlib import Path
+
+from app.services import ipca_shared_table
+from app.services.ipca_shared_table import SharedIpcaTableReader, open_shared_table, write_shared_table
+from app.services.ipca_table import IpcaTable
+from app.services.value_calculator import ValueCalculator
+from tests.helpers import build_ipca_series
+
+
+def _tables() -> list:
+    """Duas versões da série: a segunda ganha um mês novo."""
+    return [
+        IpcaTable.from_dict(build_ipca_series(last_month=date(2026, 8, 1))),
+        IpcaTable.from_dict(build_ipca_series(last_month=date(2026, 9, 1))),
+    ]
+
+
+class SharedIpcaTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+        self.old_table, self.new_table = _tables()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _published_files(self) -> list:
+        return sorted(path.name for path in self.directory.iterdir())
+
+    def assertSameTable(self, shared: IpcaTable, expected: IpcaTable):
+        self.assertEqual(shared.version, expected.version)
+        self.assertEqual(list(shared.ordinals), list(expected.ordinals))
+        self.assertEqual(list(shared.factors), list(expected.factors))
+        self.assertEqual(shared.denominator, expected.denominator)
+
+    def test_published_table_matches_the_original(self):
+        shared = open_shared_table(write_shared_table(self.directory, self.old_table))
+
+        self.assertSameTable(shared, self.old_table)
+        original, mapped = ValueCalculator(None, self.old_table), ValueCalculator(None, shared)
+        for base_date_str in ("01/01/1990", "15/07/2010", "01/08/2026"):
+            self.assertEqual(mapped.calculate_values(650266.04, base_date_str),
+                             original.calculate_values(650266.04, base_date_str))
+
+    def test_new_version_swaps_pointer_and_removes_old_file(self):
+        old_path = write_shared_table(self.directory, self.old_table)
+        old_shared = open_shared_table(old_path)
+        new_path = write_shared_table(self.directory, self.new_table)
+
+        self.assertEqual(self._published_files(), sorted([ipca_shared_table._POINTER_NAME, new_path.name]))
+        self.assertEqual((self.directory / ipca_shared_table._POINTER_NAME).read_text(), new_path.name)
+        # Quem já mapeou a versão antiga continua lendo-a depois da troca
+        self.assertSameTable(old_shared, self.old_table)
+
+    def test_republishing_same_version_keeps_the_file(self):
+        path = write_shared_table(self.directory, self.old_table)
+        modified_at = path.stat().st_mtime_ns
+        write_shared_table(self.directory, self.old_table)
+        self.assertEqual(path.stat().st_mtime_ns, modified_at)
+
+    def test_invalid_file_is_rejected(self):
+        path = write_shared_table(self.directory, self.old_table)
+        data = path.read_bytes()
+        for name, content in (("assinatura", b"XXXXXXXX" + data[8:]), ("truncado", data[:-8])):
+            with self.subTest(name):
+                broken = self.directory / f"{name}.bin"
+                broken.write_bytes(content)
+                with self.assertRaises(ValueError):
+                    open_shared_table(broken)
+
+
+class SharedIpcaTableReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+        self.reader = SharedIpcaTableReader(self.directory, check_interval=0)
+        self.old_table, self.new_table = _tables()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reader_follows_published_versions(self):
+        self.assertIsNone(self.reader.get())
+        write_shared_table(self.directory, self.old_table)
+        old_shared = self.reader.get()
+        self.assertEqual(old_shared.version, self.old_table.version)
+
+        write_shared_table(self.directory, self.new_table)
+        self.assertEqual(self.reader.get().version, self.new_table.version)
+        self.assertEqual(old_shared.last_date, date(2026, 8, 1))
+
+    def test_check_interval_limits_pointer_reads(self):
+        reader = SharedIpcaTableReader(self.directory, check_interval=3600)
+        write_shared_table(self.directory, self.old_table)
+        self.assertEqual(reader.get().version, self.old_table.version)
+        write_shared_table(self.directory, self.new_table)
+        self.assertEqual(reader.get().version, self.old_table.version)
+
+    def test_pointer_to_a_removed_version_keeps_the_current_table(self):
+        # O leitor leu o ponteiro, mas o supervisor publicou outra versão e
+        # apagou o arquivo antes de ele ser aberto.
+        write_shared_table(self.directory, self.old_table)
+        self.assertEqual(self.reader.get().version, self.old_table.version)
+        pointer = self.directory / ipca_shared_table._POINTER_NAME
+        pointer.write_text("ipca_table-removida.bin", encoding="ascii")
+
+        self.assertEqual(self.reader.get().version, self.old_table.version)
+        write_shared_table(self.directory, self.new_table)
+        self.assertEqual(self.reader.get().version, self.new_table.version)
+
+    def test_readers_always_see_a_complete_version_while_pointer_is_swapped(self):
+        expected = {table.version: list(table.factors) for table in (self.old_table, self.new_table)}
+        write_shared_table(self.directory, self.old_table)
+        stop = threading.Event()
+        problems = []
+
+        def publish():
+            while not stop.is_set():
+                for table in (self.new_table, self.old_table):
+                    write_shared_table(self.directory, table)
+
+        def read():
+            reader = SharedIpcaTableReader(self.directory, check_interval=0)
+            for _ in range(300):
+                table = reader.get()
+                if table is None or list(table.factors) != expected.get(table.version):
+                    problems.append(table and table.version)
+
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        stop.set()
+        publisher.join()
+        self.assertEqual(problems, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
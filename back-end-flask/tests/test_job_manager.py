@@ -0,0 +1,98 @@
+import asyncio
+import io
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from app.services import job_manager
+from app.services.job_manager import CallbackUrlError, JobManager, check_callback_url
+
+
+def _resolves_to(*addresses):
+    """Substitui o DNS: qualquer host resolve para os endereços indicados."""
+    infos = [(socket.AF_INET6 if ":" in address else socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, 443))
+             for address in addresses]
+    return mock.patch.object(job_manager.socket, "getaddrinfo", return_value=infos)
+
+
+class CheckCallbackUrlTest(unittest.TestCase):
+
+    def test_public_address_is_accepted(self):
+        with _resolves_to("93.184.216.34", "2606:2800:220:1:248:1893:25c8:1946"):
+            check_callback_url("https://example.com/retorno")
+
+    def test_internal_addresses_are_rejected(self):
+        for address in ("127.0.0.1", "10.0.0.5", "172.16.3.4", "192.168.1.10", "169.254.169.254",
+                        "100.64.0.1", "0.0.0.0", "::1", "fe80::1", "fd00::1", "::ffff:127.0.0.1"):
+            with self.subTest(address), _resolves_to("93.184.216.34", address):
+                with self.assertRaises(CallbackUrlError):
+                    check_callback_url("http://callback.example.com/")
+
+    def test_invalid_urls_are_rejected(self):
+        for url in ("ftp://example.com/", "file:///etc/passwd", "http:///sem-host", "http://example.com:99999/"):
+            with self.subTest(url), _resolves_to("93.184.216.34"):
+                with self.assertRaises(CallbackUrlError):
+                    check_callback_url(url)
+
+    def test_unresolvable_host_is_rejected(self):
+        with mock.patch.object(job_manager.socket, "getaddrinfo", side_effect=socket.gaierror()):
+            with self.assertRaises(CallbackUrlError):
+                check_callback_url("https://inexistente.example/")
+
+    def test_allowlist_restricts_hosts_and_trusts_listed_ones(self):
+        with mock.patch.object(job_manager, "JOB_CALLBACK_ALLOWED_HOSTS", {"erp.interno"}), _resolves_to("10.0.0.5"):
+            check_callback_url("http://ERP.interno:8080/retorno")
+            with self.assertRaises(CallbackUrlError):
+                check_callback_url("https://example.com/retorno")
+
+
+class JobManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = JobManager(workers=1, max_pending=1)
+        self.received = []
+
+    def tearDown(self):
+        self.manager._executor.shutdown(wait=True)
+
+    def _fake_pipeline(self, release: threading.Event = None):
+        """Substitui o cálculo: guarda o conteúdo recebido e, se pedido, espera `release`."""
+        async def process_calculation(pdf_source, recipient_email):
+            self.received.append(pdf_source.read())
+            if release:
+                await asyncio.to_thread(release.wait, 5)
+            return {"ok": True}, 200
+
+        return mock.patch.multiple(job_manager, process_calculation=process_calculation, run_coroutine=asyncio.run)
+
+    def test_pdf_is_spooled_and_the_upload_can_be_discarded(self):
+        upload = io.BytesIO(b"%PDF conteudo")
+        with self._fake_pipeline():
+            job = self.manager.submit(upload, "destinatario@example.com")
+            upload.close()
+            self.manager._executor.shutdown(wait=True)
+
+        self.assertEqual(self.received, [b"%PDF conteudo"])
+        self.assertEqual(self.manager.get(job["id"])["status"], job_manager.JOB_DONE)
+
+    def test_full_queue_rejects_and_slot_is_released_after_the_job(self):
+        release = threading.Event()
+        with self._fake_pipeline(release):
+            self.assertIsNotNone(self.manager.submit(io.BytesIO(b"%PDF"), "a@example.com"))
+            self.assertIsNone(self.manager.submit(io.BytesIO(b"%PDF"), "b@example.com"))
+            release.set()
+            self.manager._executor.shutdown(wait=True)
+        self.assertTrue(self.manager._slots.acquire(blocking=False))
+
+    def test_callback_to_internal_address_is_not_posted(self):
+        with self._fake_pipeline(), \
+                mock.patch.object(job_manager.httpx, "post") as post, _resolves_to("169.254.169.254"):
+            job = self.manager.submit(io.BytesIO(b"%PDF"), "a@example.com", "http://metadata.example/")
+            self.manager._executor.shutdown(wait=True)
+        post.assert_not_called()
+        self.assertEqual(self.manager.get(job["id"])["callback_status"], "rejected")
+
+
+if __name__ == '__main__':
+    unittest.main()
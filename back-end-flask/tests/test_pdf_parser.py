@@ -0,0 +1,57 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.services import pdf_parser
+from app.services.pdf_parser import extract_data_from_pdf
+from tests.helpers import build_pdf
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+EXAMPLES = ("Exemplo1.pdf", "Exemplo2.pdf")
+
+
+class EarlyExitEquivalenceTest(unittest.TestCase):
+    """
+    Garante que a leitura página a página (`early_exit=True`) devolve os
+    mesmos dados que a extração do texto completo, qualquer que seja a ordem
+    sugerida pelas dicas de página.
+    """
+
+    def _hinted_extraction(self, pdf_source, hinted_page: int):
+        hints = pdf_parser._PageHints()
+        with mock.patch.object(pdf_parser, "page_hints", hints):
+            document_type = pdf_parser._detect_document_type(
+                pdf_parser._page_text(pdf_parser._open_reader(pdf_source).pages[0])
+            )
+            hints.record(document_type, {field: hinted_page for field in pdf_parser.FIELD_PATTERNS})
+            return extract_data_from_pdf(pdf_source, early_exit=True)
+
+    def test_examples_match_full_text_extraction(self):
+        for name in EXAMPLES:
+            path = BASE_DIR / name
+            expected = extract_data_from_pdf(path, early_exit=False)
+            self.assertIsNotNone(expected.valor_bruto, name)
+            for hinted_page in range(3):
+                with self.subTest(pdf=name, hinted_page=hinted_page):
+                    self.assertEqual(self._hinted_extraction(path, hinted_page), expected)
+
+    def test_first_occurrence_wins_over_hinted_page(self):
+        fields = [
+            "Definitivo OFÍCIO Nº: 2024.23055/OFREQ",
+            "III - BENEFICIÁRIO",
+            "Nome: BENEFICIÁRIO DE TESTE",
+            "CPF: 123.456.789-09",
+        ]
+        pdf = build_pdf([
+            ["OFÍCIO REQUISITÓRIO DE PAGAMENTO DE PRECATÓRIO", *fields,
+             "Valor bruto da requisição: R$ 650.266,04", "Data base do cálculo: 01/01/2024"],
+            ["Linha de preenchimento."],
+            [*fields, "Valor bruto da requisição: R$ 1.000,00", "Data base do cálculo: 01/01/2020"],
+        ])
+        expected = extract_data_from_pdf(pdf, early_exit=False)
+        self.assertEqual(expected.valor_bruto, 650266.04)
+        self.assertEqual(self._hinted_extraction(pdf, hinted_page=2), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
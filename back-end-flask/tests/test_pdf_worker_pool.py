@@ -0,0 +1,86 @@
+import sys
+import time
+import unittest
+from unittest import mock
+
+from app.services import pdf_worker_pool
+from app.services.pdf_worker_pool import PdfParsingPool, PdfTimeoutError, PdfWorkerCrashedError, resource
+from tests.helpers import SAMPLE_INPUT, build_synthetic_pdf
+
+PDF = build_synthetic_pdf(2)
+
+
+def _hanging_worker(connection, max_memory_bytes):
+    """Processo de extração que recebe o PDF e nunca responde, como um leitor travado."""
+    connection.send(("ready",))
+    connection.recv()
+    time.sleep(60)
+
+
+def _address_space_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        line = next(line for line in status if line.startswith("VmPeak:"))
+    return int(line.split()[1])
+
+
+class PdfParsingPoolTest(unittest.TestCase):
+
+    def _pool(self, **options) -> PdfParsingPool:
+        pool = PdfParsingPool(workers=1, **options)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def _idle_pids(self, pool: PdfParsingPool) -> list:
+        return [worker.process.pid for worker in pool._idle]
+
+    def test_hanging_worker_is_killed_and_replaced(self):
+        pool = self._pool(timeout_seconds=0.5, max_memory_mb=None)
+        with mock.patch.object(pdf_worker_pool, "_worker_main", _hanging_worker):
+            pool.warm_up()
+        hanging = pool._idle[0]
+
+        started_at = time.monotonic()
+        with self.assertRaises(PdfTimeoutError):
+            pool.extract(PDF)
+        self.assertLess(time.monotonic() - started_at, 5)
+        self.assertFalse(hanging.process.is_alive())
+        self.assertEqual(pool._idle, [])
+
+        self.assertEqual(pool.extract(PDF).numero_oficio, SAMPLE_INPUT["numero_oficio"])
+
+    def test_worker_is_recycled_after_max_documents(self):
+        pool = self._pool(max_memory_mb=None, max_documents=2)
+        pool.extract(PDF)
+        [first_pid] = self._idle_pids(pool)
+        first = pool._idle[0]
+
+        pool.extract(PDF)
+        self.assertEqual(pool._idle, [])
+        self.assertFalse(first.process.is_alive())
+
+        self.assertEqual(pool.extract(PDF).numero_oficio, SAMPLE_INPUT["numero_oficio"])
+        [second_pid] = self._idle_pids(pool)
+        self.assertNotEqual(second_pid, first_pid)
+
+    @unittest.skipUnless(resource is not None and sys.platform.startswith("linux"), "RLIMIT_AS e /proc do Linux")
+    def test_address_space_limit_is_applied_to_workers(self):
+        unlimited = self._pool(max_memory_mb=None)
+        unlimited.warm_up()
+        baseline_mb = _address_space_kb(unlimited._idle[0].process.pid) / 1024
+        unlimited.shutdown()
+
+        limit_mb = int(baseline_mb) + 48
+        pool = self._pool(max_memory_mb=limit_mb)
+        pool.warm_up()
+        limit_bytes = limit_mb * 1024 * 1024
+        self.assertEqual(resource.prlimit(pool._idle[0].process.pid, resource.RLIMIT_AS), (limit_bytes, limit_bytes))
+        self.assertEqual(pool.extract(PDF).numero_oficio, SAMPLE_INPUT["numero_oficio"])
+
+        # Um documento maior que o limite derruba só o processo, que é substituído
+        with self.assertRaises(PdfWorkerCrashedError):
+            pool.extract(b"%PDF" + b"\0" * limit_bytes)
+        self.assertEqual(pool.extract(PDF).numero_oficio, SAMPLE_INPUT["numero_oficio"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import random
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from app.services.ipca_table import IpcaTable
+from app.services.repricing_ledger import RepricingLedger
+from app.services.value_calculator import ValueCalculator
+from tests.helpers import build_ipca_series
+
+
+class RepricingLedgerTest(unittest.TestCase):
+    """
+    Garante que avançar o registro mês a mês dá exatamente o mesmo resultado
+    que recalcular tudo desde a data base com a série completa.
+    """
+
+    def setUp(self):
+        self.rng = random.Random(2025)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ledger = RepricingLedger(str(Path(self.temp_dir.name) / "ledger.sqlite3"), notify=True)
+        self.series = build_ipca_series()
+        self.first_months = {month: value for month, value in self.series.items() if month < date(2026, 1, 1)}
+        self.items = [
+            {
+                "numero_oficio": f"{number}/OFREQ",
+                "cpf_beneficiario": "12345678909",
+                "valor_bruto": round(self.rng.uniform(-1000, 2_000_000), self.rng.choice((2, 3))),
+                "data_base_calculo": f"{self.rng.randint(1, 28):02d}/{self.rng.randint(1, 12):02d}/{self.rng.randint(1994, 2026)}",
+            }
+            for number in range(300)
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _record_all(self, ipca_data: dict):
+        table = IpcaTable.from_dict(ipca_data)
+        for input_data in self.items:
+            self.ledger.record("destinatario@example.com", input_data, table)
+
+    def assertMatchesFullCalculation(self, ipca_data: dict):
+        calculator = ValueCalculator(ipca_data)
+        deliveries = {
+            input_data["numero_oficio"]: result
+            for _, input_data, result in self.ledger.claim_pending_notifications(limit=len(self.items))
+        }
+        for input_data in self.items:
+            expected = calculator.calculate_values(input_data["valor_bruto"], input_data["data_base_calculo"])
+            if input_data["numero_oficio"] in deliveries:
+                self.assertEqual(deliveries[input_data["numero_oficio"]], expected, input_data)
+
+    def test_new_months_are_applied_incrementally(self):
+        self._record_all(self.first_months)
+        ipca_data = dict(self.first_months)
+        for month in sorted(set(self.series) - set(self.first_months)):
+            ipca_data[month] = self.series[month]
+            self.assertGreater(self.ledger.advance(IpcaTable.from_dict(ipca_data)), 0)
+            self.assertMatchesFullCalculation(ipca_data)
+
+    def test_revised_month_recomputes_from_base_date(self):
+        self._record_all(self.first_months)
+        ipca_data = dict(self.first_months)
+        ipca_data[date(2010, 6, 1)] += Decimal("0.37")
+        ipca_data[date(2026, 1, 1)] = Decimal("0.5")
+        self.ledger.advance(IpcaTable.from_dict(ipca_data))
+        self.assertMatchesFullCalculation(ipca_data)
+
+    def test_record_does_not_advance_existing_entries(self):
+        self._record_all(self.first_months)
+        self.ledger.advance(IpcaTable.from_dict(self.first_months))
+        self.ledger.claim_pending_notifications(limit=len(self.items))
+        new_item = dict(self.items[0], numero_oficio="novo/OFREQ")
+        self.ledger.record("destinatario@example.com", new_item, IpcaTable.from_dict(self.series))
+        self.assertEqual(self.ledger.claim_pending_notifications(), [])
+
+        self.items.append(new_item)
+        self.ledger.advance(IpcaTable.from_dict(self.series))
+        self.assertMatchesFullCalculation(self.series)
+
+    def test_entry_recorded_with_revised_series_before_advance(self):
+        self._record_all(self.first_months)
+        self.ledger.advance(IpcaTable.from_dict(self.first_months))
+        ipca_data = dict(self.series)
+        ipca_data[date(2010, 6, 1)] += Decimal("0.37")
+        new_item = dict(self.items[0], numero_oficio="novo/OFREQ")
+        self.ledger.record("destinatario@example.com", new_item, IpcaTable.from_dict(ipca_data))
+        self.items.append(new_item)
+        self.ledger.advance(IpcaTable.from_dict(ipca_data))
+        self.assertMatchesFullCalculation(ipca_data)
+
+    def test_first_advance_recomputes_entries_recorded_with_other_series(self):
+        self._record_all(self.first_months)
+        ipca_data = dict(self.series)
+        ipca_data[date(2010, 6, 1)] += Decimal("0.37")
+        self.ledger.advance(IpcaTable.from_dict(ipca_data))
+        self.assertMatchesFullCalculation(ipca_data)
+
+    def test_older_series_is_ignored(self):
+        self._record_all(self.series)
+        self.ledger.advance(IpcaTable.from_dict(self.series))
+        self.ledger.claim_pending_notifications(limit=len(self.items))
+        self.assertEqual(self.ledger.advance(IpcaTable.from_dict(self.first_months)), 0)
+        self.assertEqual(self.ledger.claim_pending_notifications(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
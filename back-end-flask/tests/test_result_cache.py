@@ -0,0 +1,86 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.services.result_cache import ResultCache
+
+
+def _value(number: int) -> dict:
+    return {"result": {"valor_bruto_corrigido": number}, "input_data": {"numero_oficio": f"{number}/OFREQ"}}
+
+
+ENTRY_SIZE = len(json.dumps(_value(0), ensure_ascii=False))
+
+
+class ResultCacheEvictionTest(unittest.TestCase):
+
+    def test_least_recently_used_entries_are_evicted_by_size(self):
+        cache = ResultCache(max_bytes=3 * ENTRY_SIZE)
+        for number in range(3):
+            cache.put(f"pdf{number}", "2026-08-aaaa", _value(number))
+        # Usar "pdf0" o torna o mais recente; o próximo a sair é "pdf1"
+        self.assertEqual(cache.get("pdf0", "2026-08-aaaa"), _value(0))
+        cache.put("pdf3", "2026-08-aaaa", _value(3))
+
+        self.assertIsNone(cache.get("pdf1", "2026-08-aaaa"))
+        for number in (0, 2, 3):
+            self.assertEqual(cache.get(f"pdf{number}", "2026-08-aaaa"), _value(number))
+
+    def test_entry_larger_than_limit_is_not_stored(self):
+        cache = ResultCache(max_bytes=ENTRY_SIZE - 1)
+        cache.put("pdf0", "2026-08-aaaa", _value(0))
+        self.assertIsNone(cache.get("pdf0", "2026-08-aaaa"))
+
+
+class ResultCacheVersionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(max_bytes=1024 * 1024, disk_dir=self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_new_month_clears_previous_entries(self):
+        self.cache.put("pdf0", "2026-08-aaaa", _value(0))
+        self.cache.put("pdf1", "2026-09-bbbb", _value(1))
+
+        self.assertIsNone(self.cache.get("pdf0", "2026-09-bbbb"))
+        self.assertEqual([path.name for path in Path(self.temp_dir.name).iterdir()], ["2026-09-bbbb"])
+
+    def test_new_month_keeps_unrelated_directories(self):
+        for name in ("backup", "2026-08", "2026-08-aaaa-old", "2026-07-AAAA"):
+            (Path(self.temp_dir.name) / name).mkdir()
+        self.cache.put("pdf0", "2026-08-aaaa", _value(0))
+        self.cache.put("pdf1", "2026-09-bbbb", _value(1))
+
+        self.assertEqual(
+            sorted(path.name for path in Path(self.temp_dir.name).iterdir()),
+            ["2026-07-AAAA", "2026-08", "2026-08-aaaa-old", "2026-09-bbbb", "backup"]
+        )
+
+    def test_previous_month_is_ignored(self):
+        self.cache.put("pdf0", "2026-09-bbbb", _value(0))
+        self.cache.put("pdf1", "2026-08-aaaa", _value(1))
+
+        self.assertIsNone(self.cache.get("pdf1", "2026-08-aaaa"))
+        self.assertEqual(self.cache.get("pdf0", "2026-09-bbbb"), _value(0))
+
+    def test_revision_in_same_month_is_newer_regardless_of_hash_order(self):
+        self.cache.put("pdf0", "2026-09-ffff", _value(0))
+        self.cache.put("pdf1", "2026-09-0000", _value(1))
+
+        self.assertEqual(self.cache.get("pdf1", "2026-09-0000"), _value(1))
+        self.assertIsNone(self.cache.get("pdf0", "2026-09-0000"))
+
+    def test_disk_layer_survives_memory_eviction(self):
+        cache = ResultCache(max_bytes=ENTRY_SIZE, disk_dir=self.temp_dir.name)
+        cache.put("pdf0", "2026-08-aaaa", _value(0))
+        cache.put("pdf1", "2026-08-aaaa", _value(1))
+
+        self.assertEqual(cache.get("pdf0", "2026-08-aaaa"), _value(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import smtplib
+import socket
+import unittest
+from email.mime.text import MIMEText
+from unittest import mock
+
+from app.services.email_service import SmtpConnectionPool
+
+
+class FakeSmtp:
+    """Sessão SMTP falsa: `failures` define, por ordem de envio, o erro de cada `sendmail` (ou None)."""
+
+    def __init__(self, failures=(), noop_error=None):
+        self.failures = list(failures)
+        self.noop_error = noop_error
+        self.sent = []
+        self.closed = False
+
+    def sendmail(self, sender, recipient, body):
+        error = self.failures.pop(0) if self.failures else None
+        if error is not None:
+            raise error
+        self.sent.append(recipient)
+
+    def noop(self):
+        if self.noop_error is not None:
+            raise self.noop_error
+        return 250, b"OK"
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+def _messages(count: int) -> list:
+    return [(f"destinatario{number}@example.com", MIMEText("corpo")) for number in range(count)]
+
+
+class SmtpConnectionPoolTest(unittest.TestCase):
+
+    def _pool(self, *sessions, noop_after_seconds: float = 10) -> SmtpConnectionPool:
+        pool = SmtpConnectionPool("smtp.example.com", 465, "calculadora@example.com", "senha",
+                                  noop_after_seconds=noop_after_seconds)
+        self.connect = mock.patch.object(pool, "_connect", side_effect=list(sessions)).start()
+        self.addCleanup(mock.patch.stopall)
+        return pool
+
+    def test_session_is_reused_between_batches(self):
+        session = FakeSmtp()
+        pool = self._pool(session)
+        pool.send_messages(_messages(1))
+        pool.send_messages(_messages(1))
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual(len(session.sent), 2)
+
+    def test_idle_session_answering_noop_is_reused(self):
+        session = FakeSmtp()
+        pool = self._pool(session, noop_after_seconds=0)
+        pool.send_messages(_messages(1))
+        with mock.patch.object(session, "noop", wraps=session.noop) as noop:
+            pool.send_messages(_messages(1))
+        noop.assert_called_once()
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_idle_session_failing_noop_is_replaced(self):
+        stale, fresh = FakeSmtp(noop_error=smtplib.SMTPServerDisconnected()), FakeSmtp()
+        pool = self._pool(stale, fresh, noop_after_seconds=0)
+        pool.send_messages(_messages(1))
+        self.assertEqual(pool.send_messages(_messages(1)), [None])
+        self.assertTrue(stale.closed)
+        self.assertEqual(len(fresh.sent), 1)
+
+    def test_dropped_session_reconnects_once_and_continues(self):
+        for error in (smtplib.SMTPServerDisconnected(), ConnectionResetError(), socket.timeout()):
+            with self.subTest(error=type(error).__name__):
+                first, second = FakeSmtp([None, error]), FakeSmtp()
+                pool = self._pool(first, second)
+                self.assertEqual(pool.send_messages(_messages(4)), [None] * 4)
+                self.assertEqual((len(first.sent), len(second.sent)), (1, 3))
+                self.assertTrue(first.closed)
+
+    def test_second_drop_fails_the_remaining_messages(self):
+        error = smtplib.SMTPServerDisconnected()
+        pool = self._pool(FakeSmtp([None, error]), FakeSmtp([error]))
+        self.assertEqual(pool.send_messages(_messages(3)), [None, error, error])
+
+    def test_smtp_errors_do_not_trigger_reconnect(self):
+        for error in (smtplib.SMTPSenderRefused(553, b"remetente recusado", "calculadora@example.com"),
+                      smtplib.SMTPResponseException(421, b"limite de envios")):
+            with self.subTest(error=type(error).__name__):
+                pool = self._pool(FakeSmtp([None, error]), FakeSmtp())
+                self.assertEqual(pool.send_messages(_messages(3)), [None, error, error])
+                self.assertEqual(self.connect.call_count, 1)
+
+    def test_authentication_failure_is_reported_without_retry(self):
+        error = smtplib.SMTPAuthenticationError(535, b"credenciais invalidas")
+        pool = self._pool(error, FakeSmtp())
+        self.assertEqual(pool.send_messages(_messages(2)), [error, error])
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_refused_recipient_does_not_stop_the_batch(self):
+        refused = smtplib.SMTPRecipientsRefused({"destinatario0@example.com": (550, b"inexistente")})
+        pool = self._pool(FakeSmtp([refused]))
+        self.assertEqual(pool.send_messages(_messages(2)), [refused, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
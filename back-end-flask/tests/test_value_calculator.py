@@ -0,0 +1,93 @@
+import random
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.services.value_calculator import ValueCalculator
+from tests.helpers import build_ipca_series
+
+
+class IntegerEngineEquivalenceTest(unittest.TestCase):
+    """
+    Garante que o motor em centavos inteiros produz exatamente os mesmos
+    valores que a implementação de referência em Decimal.
+    """
+
+    def setUp(self):
+        self.rng = random.Random(2024)
+        self.calculator = ValueCalculator(build_ipca_series())
+
+    def _random_base_date(self) -> str:
+        year = self.rng.randint(1990, 2028)
+        return f"{self.rng.randint(1, 28):02d}/{self.rng.randint(1, 12):02d}/{year}"
+
+    def assertSameCorrection(self, gross_value: float, base_date_str: str):
+        expected = self.calculator._calculate_updated_gross_value_decimal(gross_value, base_date_str)
+        actual = self.calculator._calculate_updated_gross_value(gross_value, base_date_str)
+        self.assertEqual(actual, expected, f"{gross_value} desde {base_date_str}")
+        self.assertEqual(str(actual[0]), str(expected[0]))
+
+    def test_values_in_cents(self):
+        for _ in range(2000):
+            gross_value = round(self.rng.uniform(0, 5_000_000), 2)
+            self.assertSameCorrection(gross_value, self._random_base_date())
+
+    def test_values_with_more_than_two_decimals(self):
+        for gross_value in (0.1 + 0.2, 1234.5678, 99.995, 0.005, 1 / 3, 650266.045):
+            for base_date_str in ("01/01/1995", "15/07/2010", "31/12/2026"):
+                self.assertSameCorrection(gross_value, base_date_str)
+
+    def test_edge_values(self):
+        for gross_value in (0.0, 0.01, 1e-7, 1e12, 123456789012.34, -1500.75, 1000.0):
+            for base_date_str in ("01/01/1990", "01/06/2008", "01/12/2026"):
+                self.assertSameCorrection(gross_value, base_date_str)
+
+    def test_base_date_after_last_month(self):
+        self.assertSameCorrection(1000.0, "01/01/2027")
+        value, last_update_date = self.calculator._calculate_updated_gross_value(1000.0, "01/01/2027")
+        self.assertIsNone(last_update_date)
+        self.assertEqual(value, Decimal("1000.0"))
+
+    def test_indexes_with_more_decimals(self):
+        series = build_ipca_series(7)
+        series[date(2020, 5, 1)] = Decimal("0.375")
+        series[date(2021, 3, 1)] = Decimal("-0.1234")
+        self.calculator = ValueCalculator(series)
+        for _ in range(500):
+            gross_value = round(self.rng.uniform(0, 900_000), 2)
+            self.assertSameCorrection(gross_value, self._random_base_date())
+
+    def test_calculate_values_uses_integer_engine(self):
+        result = self.calculator.calculate_values(650266.04, "01/01/2024")
+        value, last_update_date = self.calculator._calculate_updated_gross_value_decimal(650266.04, "01/01/2024")
+        self.assertEqual(result["valor_bruto_corrigido"], float(value))
+        self.assertEqual(result["ultimo_mes_corrigido"], last_update_date.strftime('%m/%Y'))
+
+
+class BatchCalculationTest(unittest.TestCase):
+    """Garante que `calculate_values_batch` devolve o mesmo que `calculate_values`."""
+
+    def setUp(self):
+        self.rng = random.Random(303)
+        self.calculator = ValueCalculator(build_ipca_series())
+
+    def test_batch_matches_single_calculation(self):
+        items = []
+        for _ in range(3000):
+            gross_value = round(self.rng.uniform(0, 2_000_000), 2)
+            base_date_str = f"{self.rng.randint(1, 28):02d}/{self.rng.randint(1, 12):02d}/{self.rng.randint(1993, 2028)}"
+            items.append((gross_value, base_date_str))
+        items += [(0.1 + 0.2, "10/10/2010"), (-250.5, "01/01/2000"), (1000.0, "01/01/2030")]
+
+        batch_results = self.calculator.calculate_values_batch(items)
+
+        self.assertEqual(len(batch_results), len(items))
+        for (gross_value, base_date_str), batch_result in zip(items, batch_results):
+            self.assertEqual(batch_result, self.calculator.calculate_values(gross_value, base_date_str))
+
+    def test_empty_batch(self):
+        self.assertEqual(self.calculator.calculate_values_batch([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
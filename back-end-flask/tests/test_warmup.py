@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from app import create_app
+from app.services import warmup
+from app.services.ipca_shared_table import SharedIpcaTableReader, write_shared_table
+from app.services.ipca_table import IpcaTable
+from app.services.value_calculator import ValueCalculator
+from app.services.warmup import STATUS_READY, validate_ipca_series
+from tests.helpers import build_ipca_series
+
+# Meses reais da série 433 do BACEN, inclusive os de hiperinflação e de deflação
+REAL_WORLD_MONTHS = {
+    date(1980, 1, 1): Decimal("6.62"),
+    date(1990, 3, 1): Decimal("82.39"),
+    date(1994, 6, 1): Decimal("47.43"),
+    date(1994, 7, 1): Decimal("6.84"),
+    date(2022, 7, 1): Decimal("-0.68"),
+    date(2022, 8, 1): Decimal("-0.36"),
+}
+
+
+def _bacen_shaped_series() -> dict:
+    """Série consecutiva de 01/1980 a 08/2026, com os valores reais acima."""
+    series = build_ipca_series(last_month=date(2026, 8, 1))
+    series.update(REAL_WORLD_MONTHS)
+    return series
+
+
+class ValidateIpcaSeriesTest(unittest.TestCase):
+
+    def test_accepts_real_world_series_since_1980(self):
+        self.assertIsNone(validate_ipca_series(_bacen_shaped_series()))
+
+    def test_rejects_gap(self):
+        series = _bacen_shaped_series()
+        del series[date(2001, 5, 1)]
+        self.assertIn("lacuna", validate_ipca_series(series))
+
+    def test_rejects_variation_of_minus_100_percent_or_less(self):
+        series = _bacen_shaped_series()
+        series[date(2010, 1, 1)] = Decimal("-100")
+        self.assertIn("01/2010", validate_ipca_series(series))
+
+    def test_rejects_empty_series(self):
+        self.assertIsNotNone(validate_ipca_series({}))
+
+
+class SupervisedWorkerTest(unittest.TestCase):
+    """No modo multiprocesso, só o supervisor valida o IPCA e roda o monitor do registro."""
+
+    def _create_app(self, **environ):
+        with mock.patch.dict(os.environ, {"IPCA_WARMUP": "true", **environ}), \
+                mock.patch.object(warmup, "start_warmup") as start_warmup, \
+                mock.patch("app.services.repricing_ledger.start_repricing_monitor") as start_monitor:
+            create_app()
+        return start_warmup, start_monitor
+
+    def test_standalone_process_warms_up_ipca_and_starts_monitor(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("WEB_SUPERVISED_WORKER", None)
+            start_warmup, start_monitor = self._create_app()
+        start_warmup.assert_called_once_with(load_ipca=True)
+        start_monitor.assert_called_once()
+
+    def test_supervised_worker_skips_ipca_validation_and_monitor(self):
+        start_warmup, start_monitor = self._create_app(WEB_SUPERVISED_WORKER="1")
+        start_warmup.assert_called_once_with(load_ipca=False)
+        start_monitor.assert_not_called()
+
+    def test_supervised_worker_is_ready_once_the_table_is_published(self):
+        table = IpcaTable.from_dict(build_ipca_series(last_month=date(2026, 8, 1)))
+        with tempfile.TemporaryDirectory() as directory:
+            write_shared_table(Path(directory), table)
+            with mock.patch.object(warmup, "_state", {"status": warmup.STATUS_PENDING}), \
+                    mock.patch.object(ValueCalculator, "_get_shared_table_reader",
+                                      return_value=SharedIpcaTableReader(Path(directory))), \
+                    mock.patch.object(ValueCalculator, "create", side_effect=AssertionError("IPCA buscado no servidor")), \
+                    mock.patch("app.services.pdf_worker_pool.get_pdf_pool", return_value=None):
+                warmup._warm_up(load_ipca=False)
+                readiness = warmup.get_readiness()
+        self.assertEqual(readiness["status"], STATUS_READY)
+        self.assertEqual((readiness["ipca_last_month"], readiness["ipca_version"]), ("08/2026", table.version))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,10 @@ import streamlit as st
 import requests
 import pandas as pd
 from dotenv import load_dotenv
+import hashlib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 load_dotenv()
 
 # --- Configuração da Página ---
@@ -14,80 +17,208 @@ st.set_page_config(
 
 # --- Configuração da API ---
 API_URL = os.getenv("API_URL")
+# Quantidade de PDFs enviados ao backend ao mesmo tempo
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", 4))
+# Novas tentativas quando o backend responde 503 (ocupado), respeitando o Retry-After
+MAX_BUSY_RETRIES = 3
+
+STATUS_WAITING = "Na fila"
+STATUS_SENDING = "Enviando"
+STATUS_BUSY = "Servidor ocupado; aguardando"
+STATUS_DONE = "Concluído"
+STATUS_CACHED = "Concluído (resultado em cache)"
+STATUS_ERROR = "Erro"
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Sessão HTTP compartilhada: as conexões com o backend são reaproveitadas entre cliques e envios."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_UPLOADS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def format_brl(value: float) -> str:
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def result_key(pdf_bytes: bytes, recipient_email: str) -> str:
+    """Chave do cache de resultados: conteúdo do PDF + destinatário."""
+    return hashlib.sha256(pdf_bytes).hexdigest() + ":" + recipient_email.strip().lower()
+
+
+def submit_pdf(session: requests.Session, file_name: str, pdf_bytes: bytes, recipient_email: str,
+               statuses: dict) -> dict:
+    """
+    Envia um PDF ao backend (em uma thread do pool). Retorna o JSON da resposta
+    ou levanta RuntimeError com a mensagem de erro da API.
+    """
+    files = {"pdf_file": (file_name, pdf_bytes, "application/pdf")}
+    form_data = {"recipient_email": recipient_email}
+
+    for attempt in range(MAX_BUSY_RETRIES + 1):
+        statuses[file_name] = STATUS_SENDING
+        response = session.post(API_URL, files=files, data=form_data, timeout=(10, 300))
+        if response.status_code == 503 and attempt < MAX_BUSY_RETRIES:
+            statuses[file_name] = STATUS_BUSY
+            time.sleep(min(float(response.headers.get("Retry-After", 5)), 30))
+            continue
+        break
+
+    try:
+        data = response.json()
+    except ValueError:
+        raise RuntimeError(f"Resposta inválida da API (HTTP {response.status_code}).")
+    if response.status_code != 200:
+        raise RuntimeError(data.get("error", "Erro desconhecido."))
+    return data
+
+
+def progress_table(uploaded_files, statuses: dict, results: dict, errors: dict) -> pd.DataFrame:
+    rows = []
+    for uploaded_file in uploaded_files:
+        name = uploaded_file.name
+        result = results.get(name, {}).get("result", {})
+        rows.append({
+            "Arquivo": name,
+            "Status": statuses.get(name, STATUS_WAITING),
+            "Valor Bruto Corrigido": format_brl(result["valor_bruto_corrigido"]) if result else "",
+            "Valor Líquido Final (com IR)": format_brl(result["valor_liquido_final_ir"]) if result else "",
+            "Último Mês Corrigido": result.get("ultimo_mes_corrigido", ""),
+            "Mensagem": errors.get(name, ""),
+        })
+    return pd.DataFrame(rows).set_index("Arquivo")
+
+
+def process_files(uploaded_files, recipient_email: str):
+    """
+    Envia os PDFs em paralelo (no máximo MAX_CONCURRENT_UPLOADS por vez) e
+    atualiza a tabela de progresso enquanto as respostas chegam. PDFs já
+    calculados para o mesmo destinatário vêm do cache da sessão, sem novo envio.
+    """
+    cache = st.session_state.setdefault("result_cache", {})
+    statuses, results, errors = {}, {}, {}
+    table_placeholder = st.empty()
+
+    # Cada PDF distinto é enviado uma única vez; cópias no mesmo lote reaproveitam o resultado
+    pending, submitted = {}, {}
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_UPLOADS) as executor:
+        for uploaded_file in uploaded_files:
+            pdf_bytes = uploaded_file.getvalue()
+            key = result_key(pdf_bytes, recipient_email)
+            if key in cache:
+                statuses[uploaded_file.name] = STATUS_CACHED
+                results[uploaded_file.name] = cache[key]
+            elif key in submitted:
+                pending[submitted[key]][0].append(uploaded_file.name)
+            else:
+                future = executor.submit(submit_pdf, session, uploaded_file.name, pdf_bytes, recipient_email, statuses)
+                submitted[key] = future
+                pending[future] = ([uploaded_file.name], key)
+
+        while True:
+            table_placeholder.dataframe(progress_table(uploaded_files, statuses, results, errors))
+            if not pending:
+                break
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                names, key = pending.pop(future)
+                try:
+                    cache[key] = future.result()
+                    status, result, error = STATUS_DONE, cache[key], None
+                except requests.RequestException as e:
+                    status, result, error = STATUS_ERROR, None, f"Erro de conexão com a API. O servidor backend está rodando? Detalhe: {e}"
+                except RuntimeError as e:
+                    status, result, error = STATUS_ERROR, None, f"Erro retornado pela API: {e}"
+                for name in names:
+                    statuses[name] = status
+                    if result:
+                        results[name] = result
+                    if error:
+                        errors[name] = error
+
+    st.session_state["last_run"] = {
+        "table": progress_table(uploaded_files, statuses, results, errors),
+        "results": results,
+    }
+    table_placeholder.empty()
+
+
+def show_result(file_name: str, data: dict, expanded: bool):
+    with st.expander(file_name, expanded=expanded):
+        col1, col2 = st.columns(2)
+        col1.metric("Valor Bruto Corrigido", format_brl(data['result']['valor_bruto_corrigido']))
+        col2.metric("Valor Líquido Final (com IR)", format_brl(data['result']['valor_liquido_final_ir']))
+
+        st.subheader("Dados Extraídos do Documento")
+
+        input_data = data['input_data']
+        friendly_names = {
+            "numero_oficio": "Número do Ofício", "nome_beneficiario": "Nome do Beneficiário",
+            "cpf_beneficiario": "CPF do Beneficiário", "valor_bruto": "Valor Bruto (Original)",
+            "data_base_calculo": "Data Base do Cálculo"
+        }
+
+        # Este loop garante que todos os valores sejam formatados e convertidos para string
+        display_data = []
+        for key, value in input_data.items():
+            if value is None:
+                continue
+
+            if key == "valor_bruto":
+                formatted_value = format_brl(value)
+            elif key == "cpf_beneficiario" and isinstance(value, str) and len(value) == 11:
+                formatted_value = f"{value[:3]}.{value[3:6]}.{value[6:9]}-{value[9:]}"
+            else:
+                formatted_value = str(value)
+
+            display_data.append({"Campo": friendly_names.get(key, key), "Valor": formatted_value})
+
+        if display_data:
+            df = pd.DataFrame(display_data)
+            st.table(df.set_index('Campo'))
+
 
 # --- Interface do Usuário (UI) ---
 st.title("⚖️ Calculadora de Correção ")
-st.write("Faça o upload do arquivo PDF com as informações para calcular o valor corrigido e o valor líquido final com o desconto dos 3% do IR.")
+st.write("Faça o upload de um ou mais arquivos PDF com as informações para calcular o valor corrigido e o valor líquido final com o desconto dos 3% do IR.")
 
 st.divider()
 
-# 1. Inputs do Usuário
-uploaded_file = st.file_uploader(
-    "Selecione o arquivo PDF",
-    type="pdf"
-)
-recipient_email = st.text_input("Endereço de e-mail para envio do resultado")
+# 1. Inputs do Usuário (em um formulário: nada é enviado até o clique no botão)
+with st.form("calculation_form"):
+    uploaded_files = st.file_uploader(
+        "Selecione os arquivos PDF",
+        type="pdf",
+        accept_multiple_files=True
+    )
+    recipient_email = st.text_input("Endereço de e-mail para envio do resultado")
 
-# 2. Botão Único para Ação
-submit_button = st.button("Calcular e Enviar Resultado por E-mail")
+    # 2. Botão Único para Ação
+    submit_button = st.form_submit_button("Calcular e Enviar Resultado por E-mail")
 
 # --- Lógica de Processamento ---
 if submit_button:
-    if uploaded_file is not None and recipient_email:
-        with st.spinner("Analisando o PDF e conectando com a API... Por favor, aguarde."):
-            try:
-                files = {"pdf_file": (uploaded_file.name, uploaded_file.getvalue(), "application/pdf")}
-                form_data = {"recipient_email": recipient_email}
-
-                response = requests.post(API_URL, files=files, data=form_data)
-
-                if response.status_code != 200:
-                    error_data = response.json()
-                    st.error(f"Erro retornado pela API: {error_data.get('error', 'Erro desconhecido.')}")
-                else:
-                    data = response.json()
-                    st.success("Cálculo realizado com sucesso!")
-
-                    st.subheader("Resultados do Cálculo")
-                    col1, col2 = st.columns(2)
-                    valor_bruto_formatado = f"R$ {data['result']['valor_bruto_corrigido']:,.2f}".replace(",","X").replace( ".", ",").replace("X", ".")
-
-                    valor_liquido_formatado = f"R$ {data['result']['valor_liquido_final_ir']:,.2f}".replace(",","X").replace(".", ",").replace("X", ".")
-
-                    col1.metric("Valor Bruto Corrigido", valor_bruto_formatado)
-                    col2.metric("Valor Líquido Final (com IR)", valor_liquido_formatado)
-
-                    st.divider()
-                    st.subheader("Dados Extraídos do Documento")
-
-                    input_data = data['input_data']
-                    friendly_names = {
-                        "numero_oficio": "Número do Ofício", "nome_beneficiario": "Nome do Beneficiário",
-                        "cpf_beneficiario": "CPF do Beneficiário", "valor_bruto": "Valor Bruto (Original)",
-                        "data_base_calculo": "Data Base do Cálculo"
-                    }
-
-                    # Este loop garante que todos os valores sejam formatados e convertidos para string
-                    display_data = []
-                    for key, value in input_data.items():
-                        if value is None:
-                            continue
-
-                        if key == "valor_bruto":
-                            formatted_value = f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                        elif key == "cpf_beneficiario" and isinstance(value, str) and len(value) == 11:
-                            formatted_value = f"{value[:3]}.{value[3:6]}.{value[6:9]}-{value[9:]}"
-                        else:
-                            formatted_value = str(value)
-
-                        display_data.append({"Campo": friendly_names.get(key, key), "Valor": formatted_value})
-
-                    if display_data:
-                        df = pd.DataFrame(display_data)
-                        st.table(df.set_index('Campo'))
-
-            except requests.RequestException as e:
-                st.error(f"Erro de conexão com a API. O servidor backend está rodando? Detalhe: {e}")
-
+    if uploaded_files and recipient_email:
+        with st.spinner(f"Analisando {len(uploaded_files)} PDF(s) e conectando com a API... Por favor, aguarde."):
+            process_files(uploaded_files, recipient_email)
     else:
-        st.warning("Por favor, faça o upload de um arquivo PDF e preencha o campo de e-mail antes de calcular.")
\ No newline at end of file
+        st.warning("Por favor, faça o upload de ao menos um arquivo PDF e preencha o campo de e-mail antes de calcular.")
+
+# --- Resultados (mantidos entre as interações com a página) ---
+last_run = st.session_state.get("last_run")
+if last_run:
+    table = last_run["table"]
+    failures = int((table["Status"] == STATUS_ERROR).sum())
+    if failures:
+        st.error(f"{failures} de {len(table)} arquivo(s) não puderam ser calculados.")
+    else:
+        st.success("Cálculo realizado com sucesso!")
+
+    st.subheader("Resultados do Cálculo")
+    st.dataframe(table)
+    for file_name, data in last_run["results"].items():
+        show_result(file_name, data, expanded=len(last_run["results"]) == 1)